@@ -0,0 +1,377 @@
+"""
+End-to-End Conversation Benchmark
+
+Runs the real YenneferOrchestrator (Brain, Voice, memory store, tracing)
+through a scripted conversation against a local mock LLM server
+(benchmarks/mock_llm.py) and fake ElevenLabs + audio sink
+(benchmarks/mock_tts.py; with --tts-transport websocket, its mock
+multi-stream-input server). Per-turn stage latencies come from the
+orchestrator's own tracer; CPU time and memory are sampled between turns.
+
+Results are written as JSON. With --baseline, the run is compared with an
+earlier result and the script exits with status 1 if a key metric got
+worse by more than --tolerance.
+
+Usage: python benchmarks/e2e.py [--turns 20] [--ttft 0.2] [--tps 150] [--think-tokens 40]
+                                [--tts-transport websocket]
+                                [--output results.json] [--baseline old.json]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List, Optional
+
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jarvis.orchestrator import YenneferOrchestrator  # noqa: E402
+from jarvis.trace import SPANS  # noqa: E402
+
+from mock_llm import MockSettings, add_arguments, settings_from, start_process  # noqa: E402
+from mock_tts import ScriptedEars, install_fake_tts, start_socket_process  # noqa: E402
+
+console = Console()
+
+SCRIPT = Path(__file__).parent / "fixtures" / "conversation.json"
+RESULTS_DIR = Path(__file__).parent / "results"
+# Models the fake TTS tells apart with --tts-routing
+FAST_MODEL = 'eleven_flash_v2_5'
+QUALITY_MODEL = 'eleven_multilingual_v2'
+
+# Compared against --baseline (lower is better for all of them)
+KEY_METRICS = (
+    ('spans.response.p50', "Input → first audio p50 (ms)"),
+    ('spans.response.p95', "Input → first audio p95 (ms)"),
+    ('spans.turn.p95', "Whole turn p95 (ms)"),
+    ('spans.prepare.p95', "Input → LLM request p95 (ms)"),
+    ('cpu_ms_per_turn', "CPU per turn (ms)"),
+    ('rss_growth_mb_per_100_turns', "RSS growth per 100 turns (MB)"),
+)
+# Differences this small are noise whatever the ratio (ms, and MB per 100 turns)
+SLACK_MS = 5.0
+GROWTH_SLACK_MB = 1.0
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size in MB, if the platform can tell."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        return None
+
+
+def slope(xs: List[float], ys: List[float]) -> float:
+    """Least-squares slope of ys over xs."""
+    if len(xs) < 2:
+        return 0.0
+    mean_x, mean_y = statistics.fmean(xs), statistics.fmean(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)] if ordered else 0.0
+
+
+async def run_session(args, api_base: str, lines: List[str], workdir: Path,
+                      ws_url: Optional[str] = None) -> dict:
+    """Drive one scripted conversation; return raw traces and samples."""
+    config = {
+        'llm': {'api_base': api_base, 'context_limit': args.context_limit},
+        'voice_output': {
+            'cache': False,
+            'streaming': not args.no_streaming,
+            'routing': {'enabled': args.tts_routing, 'fast_model': FAST_MODEL, 'quality_model': QUALITY_MODEL},
+            'transport': args.tts_transport,
+            'ws_url': ws_url,
+            # Sent to the mock socket; the fake HTTP stream ignores them
+            'api_key': 'mock',
+            'voice_id': 'mock',
+        },
+        'memory': {
+            'enabled': not args.no_memory,
+            'path': str(workdir / "memory.db"),
+            'retrieval': {'enabled': args.retrieval, 'path': str(workdir / "recall")},
+        },
+        'tracing': {
+            'path': str(workdir / "traces.jsonl"),
+            'metrics_path': str(workdir / "metrics.prom"),
+            'window': max(args.turns, 500),
+        },
+    }
+    orchestrator = YenneferOrchestrator(config)
+    sink = install_fake_tts(orchestrator.voice, ttfb=args.tts_ttfb, playback_speed=args.playback_speed,
+                            model_ttfb={FAST_MODEL: args.tts_ttfb, QUALITY_MODEL: args.tts_quality_ttfb})
+    
+    samples = []
+    
+    def on_listen(turn: int):
+        heap = tracemalloc.get_traced_memory()[0] / 1e6 if tracemalloc.is_tracing() else None
+        samples.append({'turn': turn, 'time': time.perf_counter(), 'cpu': time.process_time(),
+                        'rss_mb': rss_mb(), 'heap_mb': heap})
+    
+    def interrupt(turn: int) -> bool:
+        return bool(args.interrupt_every) and turn % args.interrupt_every == 0
+    
+    orchestrator.ears = ScriptedEars(lines, args.think_time, interrupt, args.interrupt_after, on_listen)
+    await orchestrator.run()
+    
+    traces_path = workdir / "traces.jsonl"
+    traces = []
+    if traces_path.exists():
+        traces = [json.loads(line) for line in traces_path.read_text().splitlines() if line]
+    return {
+        'traces': traces,
+        'samples': samples,
+        'tts_characters': orchestrator.voice.characters_used_session,
+        'tts_connects': orchestrator.voice.socket.connects if orchestrator.voice.socket else None,
+        'tts_routes': orchestrator.voice.tts_router.stats() if orchestrator.voice.tts_router else None,
+        'audio_seconds': sink.seconds,
+        'history_messages': len(orchestrator.brain.history),
+        'compactions': orchestrator.brain.compaction_stats['runs'],
+    }
+
+
+def summarize(args, raw: dict) -> dict:
+    traces, samples = raw['traces'], raw['samples']
+    turns = []
+    for i, trace in enumerate(traces):
+        record = {'turn': trace['turn'], 'interrupted': trace['interrupted'], **trace['spans_ms']}
+        if i + 1 < len(samples):
+            record['cpu_ms'] = round((samples[i + 1]['cpu'] - samples[i]['cpu']) * 1000, 2)
+            record['rss_mb'] = samples[i + 1]['rss_mb']
+            if samples[i + 1]['heap_mb'] is not None:
+                record['heap_mb'] = round(samples[i + 1]['heap_mb'], 3)
+        turns.append(record)
+    
+    spans = {}
+    for name in SPANS:
+        values = [trace['spans_ms'][name] for trace in traces if name in trace['spans_ms']]
+        if values:
+            spans[name] = {
+                'p50': round(percentile(values, 0.50), 2),
+                'p95': round(percentile(values, 0.95), 2),
+                'p99': round(percentile(values, 0.99), 2),
+                'mean': round(statistics.fmean(values), 2),
+                'n': len(values),
+            }
+    
+    wall = samples[-1]['time'] - samples[0]['time'] if len(samples) > 1 else 0.0
+    cpu = samples[-1]['cpu'] - samples[0]['cpu'] if len(samples) > 1 else 0.0
+    # Skip the first 10% of turns (imports, caches, first allocations)
+    steady = samples[max(len(samples) // 10, 1):] if len(samples) > 2 else samples
+    rss = [s for s in steady if s['rss_mb'] is not None]
+    heap = [s for s in steady if s['heap_mb'] is not None]
+    tokens_per_reply = args.think_tokens + args.reply_tokens + (2 if args.think_tokens else 0)
+    generation = spans.get('generation', {}).get('p50')
+    
+    return {
+        'turns': len(traces),
+        'interrupted': sum(trace['interrupted'] for trace in traces),
+        'wall_seconds': round(wall, 3),
+        'turns_per_minute': round(len(traces) / wall * 60, 2) if wall else 0.0,
+        'cpu_seconds': round(cpu, 3),
+        'cpu_ms_per_turn': round(cpu / len(traces) * 1000, 2) if traces else 0.0,
+        'cpu_percent': round(cpu / wall * 100, 2) if wall else 0.0,
+        'llm_tokens_per_second': round((tokens_per_reply - 1) / (generation / 1000), 1) if generation else None,
+        'tts_characters': raw['tts_characters'],
+        'tts_connects': raw['tts_connects'],
+        'tts_routes': raw['tts_routes'],
+        'audio_seconds': round(raw['audio_seconds'], 2),
+        'rss_start_mb': round(samples[0]['rss_mb'], 2) if samples and samples[0]['rss_mb'] else None,
+        'rss_end_mb': round(samples[-1]['rss_mb'], 2) if samples and samples[-1]['rss_mb'] else None,
+        'rss_growth_mb_per_100_turns': round(
+            slope([s['turn'] for s in rss], [s['rss_mb'] for s in rss]) * 100, 3
+        ) if rss else None,
+        'heap_growth_mb_per_100_turns': round(
+            slope([s['turn'] for s in heap], [s['heap_mb'] for s in heap]) * 100, 3
+        ) if heap else None,
+        'history_messages': raw['history_messages'],
+        'compactions': raw['compactions'],
+        'spans': spans,
+        'per_turn': turns,
+    }
+
+
+def lookup(result: dict, path: str):
+    value = result['summary']
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> bool:
+    """Print current vs baseline; return True if anything regressed."""
+    table = Table(title=f"vs baseline {baseline.get('git') or ''} ({baseline.get('timestamp', '?')})")
+    table.add_column("Metric", style="cyan")
+    for column in ("Baseline", "Current", "Change", ""):
+        table.add_column(column, justify="right")
+    
+    regressed = False
+    for path, label in KEY_METRICS:
+        old, new = lookup(baseline, path), lookup(current, path)
+        if old is None or new is None:
+            continue
+        if path.startswith('rss_growth'):
+            worse = new - old > GROWTH_SLACK_MB
+            change = f"{new - old:+.2f}"
+        else:
+            worse = old > 0 and (new - old) / old > tolerance and new - old > SLACK_MS
+            change = f"{(new - old) / old:+.1%}" if old else "-"
+        regressed |= worse
+        table.add_row(label, f"{old:,.2f}", f"{new:,.2f}", change,
+                      "[red]regressed[/red]" if worse else "[green]ok[/green]")
+    console.print(table)
+    return regressed
+
+
+def print_summary(summary: dict):
+    table = Table(title=f"End-to-end: {summary['turns']} turns ({summary['interrupted']} interrupted)")
+    table.add_column("Stage", style="cyan")
+    for column in ("p50", "p95", "p99", "mean", "n"):
+        table.add_column(column, justify="right")
+    for name, (_, _, label) in SPANS.items():
+        stats = summary['spans'].get(name)
+        if stats:
+            table.add_row(label, *(f"{stats[key]:,.0f} ms" for key in ('p50', 'p95', 'p99', 'mean')),
+                          str(stats['n']))
+    console.print(table)
+    
+    rss = summary['rss_growth_mb_per_100_turns']
+    heap = summary['heap_growth_mb_per_100_turns']
+    console.print(
+        f"[cyan]Throughput:[/cyan] {summary['turns_per_minute']:.1f} turns/min • "
+        f"LLM {summary['llm_tokens_per_second'] or 0:.0f} tok/s • "
+        f"{summary['tts_characters']:,} TTS chars • {summary['audio_seconds']:.0f}s audio\n"
+        f"[cyan]CPU:[/cyan] {summary['cpu_seconds']:.2f}s ({summary['cpu_ms_per_turn']:.1f} ms/turn, "
+        f"{summary['cpu_percent']:.1f}% of wall)\n"
+        f"[cyan]Memory:[/cyan] RSS {summary['rss_start_mb'] or 0:.1f} → {summary['rss_end_mb'] or 0:.1f} MB"
+        + (f" ({rss:+.2f} MB/100 turns)" if rss is not None else "")
+        + (f" • heap {heap:+.3f} MB/100 turns" if heap is not None else "")
+        + f"\n[cyan]History:[/cyan] {summary['history_messages']} messages, {summary['compactions']} compactions"
+    )
+    if summary.get('tts_connects') is not None:
+        console.print(f"[cyan]TTS socket:[/cyan] {summary['tts_connects']} connection(s) over {summary['turns']} turns")
+    for route, stats in (summary['tts_routes'] or {}).items():
+        if stats['requests']:
+            console.print(
+                f"[cyan]TTS {route}:[/cyan] {stats['model']} • {stats['requests']} requests, "
+                f"{stats['characters']:,} chars, {stats['credits']:,.0f} credits • "
+                f"first audio p50 {stats['first_audio_p50_ms'] or 0:,.0f} ms / p95 {stats['first_audio_p95_ms'] or 0:,.0f} ms"
+            )
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=20, help="turns in the session (script repeats)")
+    parser.add_argument('--script', default=str(SCRIPT), help="JSON list of user lines")
+    parser.add_argument('--port', type=int, default=18081, help="port for the mock LLM server")
+    add_arguments(parser, MockSettings())
+    parser.add_argument('--tts-ttfb', type=float, default=0.15, help="fake TTS seconds to first audio")
+    parser.add_argument('--tts-routing', action='store_true',
+                        help="route sentences between a fast and a quality TTS model")
+    parser.add_argument('--tts-quality-ttfb', type=float, default=0.45,
+                        help="fake TTS seconds to first audio for the quality model (with --tts-routing)")
+    parser.add_argument('--tts-transport', choices=('http', 'websocket'), default='http',
+                        help="websocket streams replies to a mock multi-stream-input server")
+    parser.add_argument('--tts-port', type=int, default=18082, help="port for the mock TTS WebSocket server")
+    parser.add_argument('--playback-speed', type=float, default=8.0,
+                        help="fake sink plays this many times faster than real time")
+    parser.add_argument('--think-time', type=float, default=0.0, help="user pause between turns")
+    parser.add_argument('--interrupt-every', type=int, default=0, help="barge in on every Nth turn")
+    parser.add_argument('--interrupt-after', type=float, default=0.5, help="seconds into the reply")
+    parser.add_argument('--context-limit', type=int, default=32000)
+    parser.add_argument('--no-streaming', action='store_true', help="generate-then-speak mode")
+    parser.add_argument('--no-memory', action='store_true', help="disable the SQLite session store")
+    parser.add_argument('--retrieval', action='store_true', help="enable retrieval memory")
+    parser.add_argument('--tracemalloc', action='store_true', help="also track Python heap growth (slower)")
+    parser.add_argument('--verbose', action='store_true', help="show the conversation")
+    parser.add_argument('--output', help="result JSON (default: benchmarks/results/e2e-<time>.json)")
+    parser.add_argument('--baseline', help="earlier result JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="allowed relative regression")
+    args = parser.parse_args()
+    
+    script = json.loads(Path(args.script).read_text(encoding='utf-8'))
+    lines = [script[i % len(script)] for i in range(args.turns)]
+    settings = settings_from(args)
+    process, api_base = start_process(args.port, settings)
+    tts_process, ws_url = None, None
+    
+    if args.tracemalloc:
+        tracemalloc.start()
+    try:
+        if args.tts_transport == 'websocket':
+            tts_process, ws_url = start_socket_process(args.tts_port, ttfb=args.tts_ttfb)
+        with tempfile.TemporaryDirectory() as workdir:
+            output = io.StringIO()
+            with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                raw = asyncio.run(run_session(args, api_base, lines, Path(workdir), ws_url))
+    finally:
+        for child in (process, tts_process):
+            if child is not None:
+                child.terminate()
+                child.join()
+    
+    summary = summarize(args, raw)
+    result = {
+        'benchmark': 'e2e',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {key: value for key, value in vars(args).items()
+                   if key not in ('output', 'baseline', 'verbose')},
+        'summary': summary,
+    }
+    
+    print_summary(summary)
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"e2e-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(result, indent=2), encoding='utf-8')
+    console.print(f"[dim]Saved {output_path}[/dim]")
+    
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        if compare(result, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
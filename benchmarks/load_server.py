@@ -0,0 +1,302 @@
+"""
+Server Load Test
+
+Starts the mock LLM (benchmarks/mock_llm.py, with a fixed number of
+generation slots like a real LM Studio / llama.cpp box) and
+`python -m jarvis.server` against it, then ramps up concurrent sessions.
+Each simulated client opens a session and chats for --turns turns with
+--think-time pauses between them, over HTTP streaming or WebSocket.
+
+For every concurrency level it reports time to first text and whole-reply
+latency, throughput, errors, turns the server's LLM scheduler turned away
+(--llm-concurrent in flight, --llm-queue waiting for at most --llm-wait
+seconds), the scheduler's queue wait and the server's RSS, and finally the
+most concurrent sessions held with first-text p95 under --target-p95.
+
+Usage: python benchmarks/load_server.py [--levels 1,2,4,8,16,32] [--turns 5]
+                                        [--target-p95 1500] [--slots 4] [--transport http|ws]
+                                        [--llm-concurrent 4] [--llm-queue 32] [--llm-wait 30]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import httpx
+from rich.console import Console
+from rich.table import Table
+
+from mock_llm import MockSettings, add_arguments, settings_from, start_process
+
+console = Console()
+
+ROOT = Path(__file__).parent.parent
+SCRIPT = Path(__file__).parent / "fixtures" / "conversation.json"
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q * len(ordered)) - 1, 0)] if ordered else 0.0
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of another process in MB (Linux only)."""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def start_server(api_base: str, port: int, ws_port: int, args, workdir: str) -> subprocess.Popen:
+    """Run jarvis.server in its own process and wait until it answers."""
+    config = {
+        'llm': {
+            'api_base': api_base,
+            'scheduler': {
+                'max_concurrent': args.llm_concurrent,
+                'max_queue': args.llm_queue,
+                'max_wait': args.llm_wait,
+            },
+        },
+        'server': {
+            'host': '127.0.0.1',
+            'port': port,
+            'ws_port': ws_port,
+            'max_sessions': args.max_sessions,
+            'session_context_limit': args.session_context_limit,
+            'max_connections': args.max_connections,
+        },
+    }
+    # JSON is valid YAML
+    config_path = Path(workdir) / "server.yaml"
+    config_path.write_text(json.dumps(config), encoding='utf-8')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'jarvis.server', '--config', str(config_path)],
+        cwd=ROOT, stdout=subprocess.DEVNULL if not args.verbose else None
+    )
+    deadline = time.monotonic() + 20
+    while True:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return process
+        except OSError:
+            if time.monotonic() > deadline or process.poll() is not None:
+                process.terminate()
+                raise RuntimeError(f"server did not start on port {port}")
+            time.sleep(0.1)
+
+
+async def http_client(client: httpx.AsyncClient, base: str, lines: List[str], args,
+                      rng: random.Random) -> Tuple[List[Tuple[float, float]], int, int]:
+    """One user over HTTP: (first text, whole reply) per turn, errors and turned-away turns."""
+    samples, errors, overloaded = [], 0, 0
+    response = await client.post(f"{base}/sessions")
+    if response.status_code != 200:
+        return samples, args.turns, 0
+    session = response.json()['session']
+    
+    for i in range(args.turns):
+        started = time.perf_counter()
+        first = None
+        try:
+            async with client.stream('POST', f"{base}/chat",
+                                     json={'message': lines[i % len(lines)], 'session': session}) as response:
+                if response.status_code == 503:
+                    overloaded += 1
+                elif response.status_code != 200:
+                    errors += 1
+                if response.status_code != 200:
+                    await asyncio.sleep(args.think_time * rng.uniform(0.5, 1.5))
+                    continue
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    event = json.loads(line[5:])
+                    if event['type'] == 'text' and first is None:
+                        first = time.perf_counter() - started
+                    elif event['type'] == 'done':
+                        break
+            samples.append((first if first is not None else time.perf_counter() - started,
+                            time.perf_counter() - started))
+        except httpx.HTTPError:
+            errors += 1
+        await asyncio.sleep(args.think_time * rng.uniform(0.5, 1.5))
+    
+    await client.delete(f"{base}/sessions/{session}")
+    return samples, errors, overloaded
+
+
+async def ws_client(url: str, lines: List[str], args,
+                    rng: random.Random) -> Tuple[List[Tuple[float, float]], int, int]:
+    """One user over WebSocket: (first text, whole reply) per turn, errors and turned-away turns."""
+    import websockets
+    
+    samples, errors, overloaded = [], 0, 0
+    try:
+        async with websockets.connect(url, max_size=None) as ws:
+            await ws.recv()  # session id
+            for i in range(args.turns):
+                started = time.perf_counter()
+                first = None
+                await ws.send(json.dumps({'type': 'message', 'text': lines[i % len(lines)]}))
+                while True:
+                    event = json.loads(await ws.recv())
+                    if event['type'] == 'text' and first is None:
+                        first = time.perf_counter() - started
+                    elif event['type'] == 'error':
+                        if event.get('overloaded'):
+                            overloaded += 1
+                        else:
+                            errors += 1
+                        break
+                    elif event['type'] == 'done':
+                        samples.append((first if first is not None else time.perf_counter() - started,
+                                        time.perf_counter() - started))
+                        break
+                await asyncio.sleep(args.think_time * rng.uniform(0.5, 1.5))
+    except (OSError, websockets.exceptions.WebSocketException):
+        errors += args.turns - len(samples) - overloaded
+    return samples, errors, overloaded
+
+
+async def run_level(sessions: int, port: int, ws_port: int, lines: List[str], args) -> dict:
+    """sessions users at once; returns the level's latency summary."""
+    rng = random.Random(sessions)
+    started = time.perf_counter()
+    limits = httpx.Limits(max_connections=sessions * 2, max_keepalive_connections=sessions * 2)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(300.0)) as client:
+        if args.transport == 'ws':
+            url = f"ws://127.0.0.1:{ws_port}/"
+            users = [ws_client(url, lines, args, random.Random(rng.random())) for _ in range(sessions)]
+        else:
+            base = f"http://127.0.0.1:{port}"
+            users = [http_client(client, base, lines, args, random.Random(rng.random())) for _ in range(sessions)]
+        # Stagger arrivals, as real users don't all press Enter together
+        results = await asyncio.gather(*(
+            _after(rng.uniform(0, args.think_time), user) for user in users
+        ))
+        stats = (await client.get(f"http://127.0.0.1:{port}/stats")).json()
+    wall = time.perf_counter() - started
+    
+    first = [sample[0] * 1000 for samples, _, _ in results for sample in samples]
+    total = [sample[1] * 1000 for samples, _, _ in results for sample in samples]
+    return {
+        'sessions': sessions,
+        'turns': len(total),
+        'errors': sum(errors for _, errors, _ in results),
+        'overloaded': sum(overloaded for _, _, overloaded in results),
+        'first_text_p50_ms': round(percentile(first, 0.50), 1),
+        'first_text_p95_ms': round(percentile(first, 0.95), 1),
+        'turn_p50_ms': round(percentile(total, 0.50), 1),
+        'turn_p95_ms': round(percentile(total, 0.95), 1),
+        'turns_per_second': round(len(total) / wall, 2),
+        'server_sessions_evicted': stats['sessions_evicted'],
+        # Cumulative over the server's lifetime
+        'scheduler': stats['scheduler'],
+    }
+
+
+def _within(row: dict, args) -> bool:
+    """Level met the target with every turn answered."""
+    return row['first_text_p95_ms'] <= args.target_p95 and not row['errors'] and not row['overloaded']
+
+
+async def _after(delay: float, coro):
+    await asyncio.sleep(delay)
+    return await coro
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--levels', default='1,2,4,8,16,32', help="comma-separated concurrent session counts")
+    parser.add_argument('--turns', type=int, default=5, help="turns per session")
+    parser.add_argument('--think-time', type=float, default=1.0, help="mean user pause between turns (s)")
+    parser.add_argument('--target-p95', type=float, default=1500.0, help="first-text p95 target (ms)")
+    parser.add_argument('--transport', choices=('http', 'ws'), default='http')
+    parser.add_argument('--port', type=int, default=18180, help="mock LLM port")
+    parser.add_argument('--server-port', type=int, default=18181, help="HTTP port (WebSocket on the next one)")
+    parser.add_argument('--max-sessions', type=int, default=256)
+    parser.add_argument('--session-context-limit', type=int, default=8192)
+    parser.add_argument('--max-connections', type=int, default=64)
+    parser.add_argument('--llm-concurrent', type=int, default=4, help="server scheduler: LLM requests at once")
+    parser.add_argument('--llm-queue', type=int, default=32, help="server scheduler: requests waiting")
+    parser.add_argument('--llm-wait', type=float, default=30.0, help="server scheduler: longest wait (s)")
+    parser.add_argument('--verbose', action='store_true', help="show server output")
+    parser.add_argument('--output', help="result JSON (default: benchmarks/results/load-<time>.json)")
+    add_arguments(parser, MockSettings(ttft=0.2, tps=60.0, think_tokens=20, reply_tokens=40, slots=4))
+    args = parser.parse_args()
+    
+    lines = json.loads(SCRIPT.read_text(encoding='utf-8'))
+    levels = [int(level) for level in args.levels.split(',')]
+    mock, api_base = start_process(args.port, settings_from(args))
+    
+    table = Table(title=f"Server load ({args.transport}, {args.slots or 'unlimited'} LLM slots, "
+                        f"{args.turns} turns/session, target first-text p95 {args.target_p95:.0f} ms)")
+    for column in ("Sessions", "Turns", "Errors", "Busy", "First text p50", "First text p95",
+                   "Reply p50", "Reply p95", "Queue p95", "Turns/s", "Server RSS"):
+        table.add_column(column, justify="right")
+    
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            server = start_server(api_base, args.server_port, args.server_port + 1, args, workdir)
+            try:
+                for sessions in levels:
+                    row = asyncio.run(run_level(sessions, args.server_port, args.server_port + 1, lines, args))
+                    row['server_rss_mb'] = rss_mb(server.pid)
+                    rows.append(row)
+                    within = _within(row, args)
+                    style = "green" if within else "red"
+                    queue_p95 = row['scheduler']['wait']['interactive']['p95_ms']
+                    table.add_row(
+                        f"[{style}]{sessions}[/{style}]", str(row['turns']), str(row['errors']),
+                        str(row['overloaded']),
+                        f"{row['first_text_p50_ms']:,.0f} ms", f"{row['first_text_p95_ms']:,.0f} ms",
+                        f"{row['turn_p50_ms']:,.0f} ms", f"{row['turn_p95_ms']:,.0f} ms",
+                        f"{queue_p95:,.0f} ms" if queue_p95 is not None else "-",
+                        f"{row['turns_per_second']:.2f}",
+                        f"{row['server_rss_mb']:.0f} MB" if row['server_rss_mb'] else "-"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        mock.terminate()
+        mock.join()
+    
+    console.print(table)
+    held = [row['sessions'] for row in rows if _within(row, args)]
+    if held:
+        console.print(f"[green]✓[/green] Up to {max(held)} concurrent sessions within "
+                      f"first-text p95 ≤ {args.target_p95:.0f} ms")
+    else:
+        console.print(f"[red]✗[/red] No level met first-text p95 ≤ {args.target_p95:.0f} ms")
+    
+    result = {
+        'benchmark': 'load_server',
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'params': {key: value for key, value in vars(args).items() if key not in ('output', 'verbose')},
+        'max_sessions_within_target': max(held) if held else 0,
+        'levels': rows,
+    }
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"load-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(result, indent=2), encoding='utf-8')
+    console.print(f"[dim]Saved {output_path}[/dim]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Mock LLM Server
+
+A local OpenAI-compatible chat completions server with controllable
+timing, for benchmarks and load tests: time to first token, tokens per
+second, size of the <think> block and of the visible reply. Streams SSE
+like LM Studio / llama.cpp, including the final usage and timings chunk.
+With --slots, only that many replies generate at once and the rest wait,
+like llama.cpp's --parallel.
+
+Usage: python benchmarks/mock_llm.py [--port 18080] [--ttft 0.2] [--tps 150]
+                                     [--think-tokens 40] [--reply-tokens 50] [--slots 0]
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+WORDS = ("the spell was never meant for someone as impatient as you and yet here we are again "
+         "with a plan that has more holes than a Nilfgaardian promise so listen carefully "
+         "because I will only explain the sensible way of doing this once").split()
+THOUGHTS = ("the user wants an answer I should consider what they actually asked and keep "
+            "it short since this will be spoken aloud").split()
+
+
+class MockSettings:
+    """Timing and size of generated replies."""
+    
+    def __init__(self, ttft: float = 0.2, tps: float = 150.0, think_tokens: int = 40,
+                 reply_tokens: int = 50, sentence_words: int = 12, seed: int = 0,
+                 slots: int = 0):
+        self.ttft = ttft
+        self.tps = tps
+        self.think_tokens = think_tokens
+        self.reply_tokens = reply_tokens
+        self.sentence_words = sentence_words
+        self.seed = seed
+        # Replies generated at once; 0 is unlimited
+        self.slots = slots
+
+
+def make_reply(settings: MockSettings, rng: random.Random) -> Tuple[list, str]:
+    """Token list for one reply (think block included) and its visible text."""
+    tokens = []
+    if settings.think_tokens:
+        tokens.append('<think>')
+        tokens += [rng.choice(THOUGHTS) + ' ' for _ in range(settings.think_tokens)]
+        tokens.append('</think>\n\n')
+    visible = []
+    for i in range(settings.reply_tokens):
+        word = rng.choice(WORDS)
+        if i == 0 or visible[-1].endswith('. '):
+            word = word.capitalize()
+        end = (i + 1) % settings.sentence_words == 0 or i == settings.reply_tokens - 1
+        visible.append(word + ('. ' if end else ' '))
+    tokens += visible
+    return tokens, ''.join(visible).strip()
+
+
+def make_handler(settings: MockSettings):
+    rng = random.Random(settings.seed)
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(settings.slots) if settings.slots else None
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        
+        def log_message(self, *args):
+            pass
+        
+        def _json(self, body: dict, status: int = 200):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        
+        def do_GET(self):
+            if self.path.rstrip('/').endswith('/models'):
+                self._json({'data': [{'id': 'mock-model'}]})
+            else:
+                self._json({'error': 'not found'}, 404)
+        
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            with lock:
+                tokens, _ = make_reply(settings, rng)
+            prompt_tokens = len(json.dumps(request.get('messages', []))) // 4
+            usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(tokens),
+                     'total_tokens': prompt_tokens + len(tokens)}
+            started = time.perf_counter()
+            if slots is None:
+                self._reply(request, tokens, usage, prompt_tokens, started)
+            else:
+                with slots:
+                    self._reply(request, tokens, usage, prompt_tokens, started)
+        
+        def _reply(self, request: dict, tokens: list, usage: dict, prompt_tokens: int, started: float):
+            if not request.get('stream'):
+                time.sleep(settings.ttft + len(tokens) / settings.tps)
+                self._json({'choices': [{'message': {'role': 'assistant', 'content': ''.join(tokens)}}],
+                            'usage': usage})
+                return
+            
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            
+            def send(payload: str):
+                data = f"data: {payload}\n\n".encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            
+            try:
+                time.sleep(settings.ttft)
+                first = time.perf_counter()
+                for i, token in enumerate(tokens):
+                    # Paced against the start, so sleep overshoot doesn't add up
+                    delay = first + i / settings.tps - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    send(json.dumps({'choices': [{'index': 0, 'delta': {'content': token}}]}))
+                timings = {'prompt_ms': (first - started) * 1000, 'prompt_n': prompt_tokens,
+                           'predicted_n': len(tokens)}
+                send(json.dumps({'choices': [], 'usage': usage, 'timings': timings}))
+                send('[DONE]')
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # Client cancelled (interrupt)
+                pass
+    
+    return Handler
+
+
+def serve(port: int, settings: MockSettings, host: str = '127.0.0.1'):
+    """Run the server until the process is stopped."""
+    server = ThreadingHTTPServer((host, port), make_handler(settings))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def start_process(port: int, settings: MockSettings) -> Tuple[multiprocessing.Process, str]:
+    """Start the server in a child process (its CPU isn't counted against
+    the client) and wait until it answers. Returns (process, api_base).
+    """
+    process = multiprocessing.Process(target=serve, args=(port, settings), daemon=True)
+    process.start()
+    api_base = f"http://127.0.0.1:{port}/v1"
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            urllib.request.urlopen(f"{api_base}/models", timeout=1).read()
+            return process, api_base
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                raise RuntimeError(f"mock LLM server did not start on port {port}")
+            time.sleep(0.05)
+
+
+def add_arguments(parser: argparse.ArgumentParser, defaults: Optional[MockSettings] = None):
+    """The server's timing options, for scripts that start it themselves."""
+    defaults = defaults or MockSettings()
+    parser.add_argument('--ttft', type=float, default=defaults.ttft, help="seconds to first token")
+    parser.add_argument('--tps', type=float, default=defaults.tps, help="tokens per second")
+    parser.add_argument('--think-tokens', type=int, default=defaults.think_tokens,
+                        help="tokens inside <think> per reply")
+    parser.add_argument('--reply-tokens', type=int, default=defaults.reply_tokens,
+                        help="visible tokens per reply")
+    parser.add_argument('--slots', type=int, default=defaults.slots,
+                        help="replies generated at once (0: unlimited)")
+
+
+def settings_from(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(args.ttft, args.tps, args.think_tokens, args.reply_tokens, slots=args.slots)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=18080)
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(f"Mock LLM on http://127.0.0.1:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        serve(args.port, settings_from(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Mock TTS and Audio
+
+Stand-ins for ElevenLabs and the sound card, so Voice can run its real
+pipeline (sentence splitting, concurrent synthesis, chunked PCM handed to
+a sink, completion futures) without network access or audio hardware.
+Also runs standalone as a local ElevenLabs-style multi-stream-input
+WebSocket server, for voice_output.ws_url.
+
+Usage: python benchmarks/mock_tts.py [--port 18082] [--ttfb 0.15] [--realtime-factor 4]
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import multiprocessing
+import socket
+import sys
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jarvis.audio import AudioSink  # noqa: E402
+from jarvis.voice import AudioStream, Voice  # noqa: E402
+
+SAMPLE_RATE = 24000
+# Roughly how fast ElevenLabs voices speak
+CHARS_PER_SECOND = 15.0
+
+
+class FakeSink(AudioSink):
+    """Plays nothing, but takes as long as the audio would (divided by speed).
+    
+    Clips play back to back like the real sinks; on_start and the
+    completion future fire at the times a device would reach them.
+    """
+    
+    def __init__(self, sample_rate: int = SAMPLE_RATE, speed: float = 1.0):
+        self.sample_rate = sample_rate
+        self.speed = speed
+        self._loop = asyncio.get_running_loop()
+        self._timers: Deque[asyncio.TimerHandle] = deque()
+        self._futures: List[asyncio.Future] = []
+        self._ends_at = 0.0
+        self.clips = 0
+        self.seconds = 0.0
+    
+    def enqueue(self, pcm: bytes, on_start: Optional[Callable[[], None]] = None) -> asyncio.Future:
+        future = self._loop.create_future()
+        duration = len(pcm) / (2 * self.sample_rate)
+        start = max(self._loop.time(), self._ends_at)
+        self._ends_at = start + duration / self.speed
+        if on_start is not None:
+            self._timers.append(self._loop.call_at(start, on_start))
+        self._timers.append(self._loop.call_at(self._ends_at, self._finish, future))
+        self._futures.append(future)
+        self.clips += 1
+        self.seconds += duration
+        return future
+    
+    def _finish(self, future: asyncio.Future):
+        if not future.done():
+            future.set_result(None)
+        self._futures.remove(future)
+    
+    def stop(self):
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        for future in self._futures:
+            future.cancel()
+        self._futures.clear()
+        self._ends_at = 0.0
+
+
+def install_fake_tts(voice: Voice, ttfb: float = 0.15, realtime_factor: float = 4.0,
+                     playback_speed: float = 1.0, chunk_seconds: float = 0.1,
+                     model_ttfb: Optional[Dict[str, float]] = None) -> FakeSink:
+    """Make voice synthesize with fake ElevenLabs and play to a FakeSink.
+    
+    ttfb is the delay before the first audio chunk (per model in
+    model_ttfb, for model routing); audio then arrives realtime_factor
+    times faster than it plays. With voice_output.transport websocket,
+    replies go to the socket at ws_url instead and only single lines use
+    the fake HTTP stream. Call before initialize(), from inside the event
+    loop. Returns the sink (for its counters).
+    """
+    sink = FakeSink(SAMPLE_RATE, playback_speed)
+    
+    async def initialize(startup=None):
+        voice.engine = 'elevenlabs'
+        voice.output_format = f'pcm_{SAMPLE_RATE}'
+        voice.sink = sink
+        voice.initialized = True
+        # Replies then stream over voice_output.ws_url (see serve_socket)
+        if voice.transport == 'websocket':
+            await voice._init_socket()
+    
+    async def convert(text: str, model: Optional[str] = None) -> AudioStream:
+        delay = (model_ttfb or {}).get(model or voice.model, ttfb)
+        voice.characters_used_session += len(text)
+        stream = AudioStream()
+        voice._streams.add(stream)
+        stream.finished.add_done_callback(lambda _: voice._streams.discard(stream))
+        total = int(len(text) / CHARS_PER_SECOND * SAMPLE_RATE) * 2
+        chunk = int(SAMPLE_RATE * chunk_seconds) * 2
+        
+        async def download():
+            await asyncio.sleep(delay)
+            sent = 0
+            while sent < total and not stream.cancelled:
+                size = min(chunk, total - sent)
+                stream.feed(b'\0' * size)
+                sent += size
+                await asyncio.sleep(chunk_seconds / realtime_factor)
+            stream.close()
+        
+        asyncio.ensure_future(download())
+        return stream
+    
+    voice.initialize = initialize
+    voice._convert_elevenlabs = convert
+    voice.cache = None
+    return sink
+
+
+class ScriptedEars:
+    """Ears that replay a script instead of reading stdin.
+    
+    Listening between turns returns the next line after think_time (the
+    user's pause); listening during a reply (barge-in) waits until the
+    reply has run for interrupt_after seconds, on turns where interrupt()
+    says so. The script ends with 'quit'. on_listen is called before each
+    turn is read, for sampling process stats between turns.
+    """
+    
+    # Typed input as far as the orchestrator can tell
+    engine = 'text'
+    wake_word = None
+    
+    def __init__(self, lines: List[str], think_time: float = 0.0,
+                 interrupt: Optional[Callable[[int], bool]] = None, interrupt_after: float = 1.0,
+                 on_listen: Optional[Callable[[int], None]] = None):
+        self.lines = deque(lines)
+        self.think_time = think_time
+        self.interrupt = interrupt
+        self.interrupt_after = interrupt_after
+        self.on_listen = on_listen
+        self.turn = 0
+    
+    async def initialize(self):
+        pass
+    
+    async def listen(self, prompt: bool = True) -> str:
+        if not prompt:
+            if self.interrupt is not None and self.interrupt(self.turn):
+                await asyncio.sleep(self.interrupt_after)
+                return ''
+            # Never barge in: wait to be cancelled when the reply ends
+            await asyncio.Event().wait()
+        if self.on_listen is not None:
+            self.on_listen(self.turn)
+        if self.think_time:
+            await asyncio.sleep(self.think_time)
+        self.turn += 1
+        return self.lines.popleft() if self.lines else 'quit'
+    
+    def status(self):
+        pass
+    
+    def cleanup(self):
+        pass
+
+
+async def _generate(ws, context_id: str, texts: asyncio.Queue, ttfb: float,
+                    realtime_factor: float, chunk_seconds: float):
+    """Stream audio for a context's text, in order, then send isFinal."""
+    loop = asyncio.get_running_loop()
+    chunk_ms = chunk_seconds * 1000
+    char_ms = 1000 / CHARS_PER_SECOND
+    while True:
+        text, received_at = await texts.get()
+        if text is None:
+            await ws.send(json.dumps({'isFinal': True, 'contextId': context_id}))
+            return
+        # Generation of each piece starts when it arrives, like the real API
+        await asyncio.sleep(max(received_at + ttfb - loop.time(), 0.0))
+        total_ms = len(text) * char_ms
+        for index in range(max(math.ceil(total_ms / chunk_ms), 1)):
+            start_ms = index * chunk_ms
+            end_ms = min(start_ms + chunk_ms, total_ms)
+            chars = [i for i in range(len(text)) if start_ms <= i * char_ms < end_ms]
+            await ws.send(json.dumps({
+                'audio': base64.b64encode(b'\0' * (int((end_ms - start_ms) * SAMPLE_RATE / 1000) * 2)).decode(),
+                'contextId': context_id,
+                'alignment': {
+                    'chars': [text[i] for i in chars],
+                    'charStartTimesMs': [round(i * char_ms - start_ms) for i in chars],
+                    'charDurationsMs': [round(char_ms)] * len(chars),
+                },
+            }))
+            await asyncio.sleep(chunk_seconds / realtime_factor)
+
+
+def make_socket_handler(ttfb: float = 0.15, realtime_factor: float = 4.0, chunk_seconds: float = 0.1):
+    """Handler for one ElevenLabs multi-stream-input connection.
+    
+    Each context's text is voiced at CHARS_PER_SECOND as pcm at
+    SAMPLE_RATE, ttfb after it arrives, with per-character alignment.
+    Flushed contexts finish what they have before isFinal; a context
+    closed without a flush (an interrupt) is dropped.
+    """
+    async def handler(ws):
+        loop = asyncio.get_running_loop()
+        contexts: Dict[str, Tuple[asyncio.Queue, asyncio.Task]] = {}
+        flushed = set()
+        running = set()
+        try:
+            async for raw in ws:
+                message = json.loads(raw)
+                if message.get('close_socket'):
+                    break
+                context_id = message.get('context_id')
+                if context_id not in contexts:
+                    texts: asyncio.Queue = asyncio.Queue()
+                    task = asyncio.create_task(_generate(ws, context_id, texts, ttfb,
+                                                         realtime_factor, chunk_seconds))
+                    contexts[context_id] = (texts, task)
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                texts, task = contexts[context_id]
+                if message.get('text', '').strip():
+                    texts.put_nowait((message['text'], loop.time()))
+                if message.get('flush'):
+                    flushed.add(context_id)
+                if message.get('close_context'):
+                    del contexts[context_id]
+                    if context_id in flushed:
+                        flushed.discard(context_id)
+                        texts.put_nowait((None, 0.0))
+                    else:
+                        task.cancel()
+        finally:
+            for task in list(running):
+                task.cancel()
+    
+    return handler
+
+
+async def serve_socket(port: int, host: str = '127.0.0.1', **timing):
+    """Run the WebSocket server until cancelled."""
+    import websockets
+    
+    async with websockets.serve(make_socket_handler(**timing), host, port):
+        await asyncio.Event().wait()
+
+
+def _run_socket(port: int, timing: dict):
+    asyncio.run(serve_socket(port, **timing))
+
+
+def start_socket_process(port: int, **timing) -> Tuple[multiprocessing.Process, str]:
+    """Start the WebSocket server in a child process (its CPU isn't counted
+    against the client) and wait until it accepts connections. Returns
+    (process, ws_url) for voice_output.ws_url.
+    """
+    process = multiprocessing.Process(target=_run_socket, args=(port, timing), daemon=True)
+    process.start()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, f"ws://127.0.0.1:{port}/v1"
+        except OSError:
+            if time.monotonic() > deadline or not process.is_alive():
+                process.terminate()
+                raise RuntimeError(f"mock TTS server did not start on port {port}")
+            time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=18082)
+    parser.add_argument('--ttfb', type=float, default=0.15, help="seconds to first audio")
+    parser.add_argument('--realtime-factor', type=float, default=4.0,
+                        help="audio arrives this many times faster than it plays")
+    args = parser.parse_args()
+    print(f"Mock TTS on ws://127.0.0.1:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        asyncio.run(serve_socket(args.port, ttfb=args.ttfb, realtime_factor=args.realtime_factor))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Retrieval Memory Benchmark
+
+Builds jarvis/recall.py indexes of growing size from synthetic exchanges
+(a set of "fact" exchanges hidden among distractor small talk), then asks
+a paraphrased question about each fact and checks whether the exchange
+that stated it comes back in the top k. Reports build time, query
+latency, recall@k, index size, and the prompt tokens a turn would carry
+with retrieval versus resending the whole history.
+
+Usage: python benchmarks/recall.py [--sizes 1000,10000,100000] [--top-k 3] [--disk]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jarvis.memory import estimate_tokens  # noqa: E402
+from jarvis.recall import RecallIndex, create_embedder  # noqa: E402
+
+console = Console()
+
+SEED = 14
+FACTS = 200
+BATCH = 256
+
+PEOPLE = ["sister", "brother", "mother", "father", "boss", "landlord", "neighbour", "cousin",
+          "dentist", "trainer", "accountant", "flatmate", "mentor", "niece", "grandfather", "colleague"]
+THINGS = ["car", "dog", "cat", "birthday", "flight", "favourite band", "new job", "wedding",
+          "phone number", "garden", "allergy", "boat", "bakery", "thesis", "violin", "holiday"]
+VALUES = ["Novigrad", "Toussaint", "Kaer Morhen", "Oxenfurt", "Vizima", "Cintra", "Skellige",
+          "Beauclair", "Velen", "Aretuza", "Temeria", "Redania", "Nilfgaard", "Brokilon", "Mahakam"]
+DETAILS = ["crimson", "Tuesday", "seventeen", "terrier", "saxophone", "Volvo", "peanuts", "sourdough",
+           "marathon", "tulips", "quantum", "lighthouse", "espresso", "falcon", "origami", "tango"]
+FILLER = ("weather today looks grey again and the coffee machine at work broke so i walked "
+          "around the block listened to a podcast about history cooked pasta watched a film "
+          "answered emails cleaned the kitchen went running felt tired slept badly read a "
+          "chapter of my book talked about plans for the weekend the news was depressing").split()
+REPLY = "Noted. Try not to make a habit of it."
+
+
+def make_fact(rng: random.Random, person: str, thing: str):
+    """A statement exchange and a differently worded question about it."""
+    value, detail = rng.choice(VALUES), rng.choice(DETAILS)
+    statement = f"User: My {person}'s {thing} is from {value}, it has something to do with {detail}.\nYennefer: {REPLY}"
+    question = f"what did I tell you about the {thing} of my {person}?"
+    return statement, question
+
+
+def make_distractor(rng: random.Random) -> str:
+    words = rng.sample(FILLER, rng.randint(8, 20))
+    # Many distractors mention one of the same people or things, so a
+    # single shared keyword isn't enough to be recalled
+    roll = rng.random()
+    if roll < 0.4:
+        words.insert(rng.randrange(len(words)), rng.choice(PEOPLE))
+    elif roll < 0.7:
+        words.insert(rng.randrange(len(words)), rng.choice(THINGS))
+    return f"User: {' '.join(words)}.\nYennefer: {REPLY}"
+
+
+def build_corpus(size: int, rng: random.Random):
+    """size snippets with FACTS facts at random positions; returns (snippets, [(question, row)])."""
+    snippets = [make_distractor(rng) for _ in range(size)]
+    rows = rng.sample(range(size), min(FACTS, size))
+    # Each (person, thing) pair is stated once, so every question has one right answer
+    pairs = rng.sample([(person, thing) for person in PEOPLE for thing in THINGS], len(rows))
+    queries = []
+    for row, (person, thing) in zip(rows, pairs):
+        statement, question = make_fact(rng, person, thing)
+        snippets[row] = statement
+        queries.append((question, row))
+    return snippets, queries
+
+
+def run(size: int, top_k: int, embedder_spec: str, dim: int, disk: bool, window: int):
+    rng = random.Random(SEED + size)
+    snippets, queries = build_corpus(size, rng)
+    embedder = create_embedder(embedder_spec, dim)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        index = RecallIndex(embedder, directory if disk else None)
+        index.open()
+        started = time.perf_counter()
+        for i in range(0, size, BATCH):
+            index.add(snippets[i:i + BATCH])
+        build_seconds = time.perf_counter() - started
+        
+        hits = 0
+        latencies = []
+        recalled_tokens = []
+        for question, row in queries:
+            t0 = time.perf_counter()
+            results = index.search(question, top_k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += snippets[row] in [text for _, text in results]
+            recalled_tokens.append(sum(estimate_tokens(text) for _, text in results))
+        nbytes = index.nbytes
+        index.close()
+    
+    # Prompt a turn carries: the recent window plus what was recalled, versus everything
+    sample = snippets[:min(size, 2000)]
+    per_exchange = sum(estimate_tokens(text) for text in sample) / len(sample)
+    return {
+        'size': size,
+        'build_s': build_seconds,
+        'rate': size / build_seconds,
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'recall': hits / len(queries),
+        'mb': nbytes / 1e6,
+        'prompt': per_exchange * window / 2 + float(np.mean(recalled_tokens)),
+        'full': per_exchange * size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help="comma-separated exchange counts")
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--embedder', default='hashing', help="hashing or sentence-transformers:<model>")
+    parser.add_argument('--dim', type=int, default=1024, help="hashing embedder dimensions")
+    parser.add_argument('--window', type=int, default=12, help="recent messages kept in the prompt")
+    parser.add_argument('--disk', action='store_true', help="memory-mapped index in a temp directory")
+    args = parser.parse_args()
+    
+    table = Table(title=f"Retrieval memory ({args.embedder}, top {args.top_k}, {FACTS} queries)")
+    for column in ("Exchanges", "Build", "Exchanges/s", "Query p50", "Query p95",
+                   f"Recall@{args.top_k}", "Index", "Prompt/turn", "Full history"):
+        table.add_column(column, justify="right")
+    
+    for size in (int(s) for s in args.sizes.split(',')):
+        r = run(size, args.top_k, args.embedder, args.dim, args.disk, args.window)
+        table.add_row(
+            f"{r['size']:,}", f"{r['build_s']:.2f}s", f"{r['rate']:,.0f}",
+            f"{r['p50']:.2f} ms", f"{r['p95']:.2f} ms", f"{r['recall']:.1%}",
+            f"{r['mb']:.1f} MB", f"{r['prompt']:,.0f} tok", f"{r['full']:,.0f} tok"
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Speech Input Benchmark
+
+Plays WAV files through jarvis/speech.py exactly as `voice_input.engine:
+local` would hear the microphone (VAD segmentation, partial transcripts,
+faster-whisper on the CPU) and reports, per file and overall:
+
+- latency from the end of speech to the final transcript (p50/p95),
+  of which the silence_ms pause is the floor
+- how many finals were ready from a partial, with no extra transcription
+- real-time factor: CPU seconds transcribing per second of audio
+  transcribed (partials included)
+- word error rate, for files with a reference transcript next to them
+  (clip.wav + clip.txt)
+
+Files are played at real time by default so latencies mean what they
+would live; --fast reads them as quickly as the pipeline takes them
+(accuracy and real-time factor only).
+
+--synthetic generates a small clip set instead, so the benchmark runs
+from a clean checkout: a few spoken commands per clip with pauses
+between them, voiced by the system's speech synthesizer (macOS `say`,
+or espeak-ng/espeak) with reference transcripts for WER. Without one,
+the utterances are formant-synthesized syllables as in
+benchmarks/wakeword.py: latency and real-time factor still hold, but
+there are no words to score, and Whisper may hear nothing in some of
+them (counted as empty).
+
+Usage: python benchmarks/stt.py clips/ [more.wav ...] [--model base.en] [--fast]
+                                [--silence-ms 500] [--output results.json]
+       python benchmarks/stt.py --synthetic [--keep clips/]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jarvis.config import load_config  # noqa: E402
+from jarvis.speech import SpeechInput, load_wav  # noqa: E402
+from jarvis.trace import percentile  # noqa: E402
+from wakeword import SAMPLE_RATE, clip, random_word, save_wav, silence, synthesize  # noqa: E402
+
+console = Console()
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SEED = 21
+
+# --synthetic clips: the commands spoken in each, with a pause after every one
+COMMANDS = [
+    ["What time is it?", "Turn off the kitchen lights.", "Thank you."],
+    ["Remind me to call Ciri tomorrow morning.", "How long until the potion is ready?"],
+    ["What is seventeen times three?", "Play something quiet.", "Stop."],
+    ["Tell me a short story about a witcher and a griffin.", "Never mind."],
+]
+
+
+def words(text: str) -> List[str]:
+    return re.sub(r"[^\w\s']", ' ', text.lower()).split()
+
+
+def word_errors(reference: List[str], hypothesis: List[str]) -> int:
+    """Word-level Levenshtein distance (substitutions + deletions + insertions)."""
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref in enumerate(reference, 1):
+        current = [i]
+        for j, hyp in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref != hyp)))
+        previous = current
+    return previous[-1]
+
+
+def find_wavs(paths: List[str]) -> List[Path]:
+    wavs = []
+    for path in map(Path, paths):
+        wavs += sorted(path.glob('*.wav')) if path.is_dir() else [path]
+    return wavs
+
+
+def speak(text: str, path: Path) -> bool:
+    """Render text to a WAV with the system's speech synthesizer; False if there is none."""
+    if shutil.which('say'):
+        command = ['say', '-o', str(path), '--file-format=WAVE', '--data-format=LEI16@16000', text]
+    elif shutil.which('espeak-ng') or shutil.which('espeak'):
+        command = [shutil.which('espeak-ng') or shutil.which('espeak'), '-w', str(path), text]
+    else:
+        return False
+    subprocess.run(command, check=True, capture_output=True)
+    return True
+
+
+def make_synthetic(folder: Path) -> bool:
+    """Write the --synthetic clip set (see module docstring); True if it has real words."""
+    rng = np.random.default_rng(SEED)
+    folder.mkdir(parents=True, exist_ok=True)
+    voiced = True
+    for number, commands in enumerate(COMMANDS, 1):
+        parts = [silence(rng.uniform(0.5, 1.0))]
+        for command in commands:
+            rendered = folder / 'utterance.wav'
+            voiced = voiced and speak(command, rendered)
+            if voiced:
+                parts.append(load_wav(str(rendered), SAMPLE_RATE).astype(np.float64))
+                rendered.unlink()
+            else:
+                parts += [synthesize(random_word(rng), rng, 1.0, 140.0) for _ in range(len(command.split()))]
+            parts.append(silence(rng.uniform(1.0, 1.6)))
+        path = folder / f"clip{number:02d}.wav"
+        save_wav(path, clip(parts, rng, 30))
+        if voiced:
+            path.with_suffix('.txt').write_text(' '.join(commands), encoding='utf-8')
+    return voiced
+
+
+async def run_file(path: Path, section: dict, realtime: bool, transcriber=None):
+    """Feed one WAV through a fresh SpeechInput; returns (result, transcriber) so the model is reused."""
+    speech = SpeechInput.from_config(section, wav=str(path), realtime=realtime)
+    if speech is None:
+        raise SystemExit(1)
+    if transcriber is not None:
+        speech.transcriber = transcriber
+    
+    started = time.perf_counter()
+    await speech.start()
+    finals = []
+    while (transcript := await speech.next()) is not None:
+        if transcript.final:
+            finals.append(transcript)
+    wall = time.perf_counter() - started
+    speech.close()
+    
+    finals.sort(key=lambda transcript: transcript.utterance)
+    hypothesis = ' '.join(transcript.text for transcript in finals)
+    result = {
+        'file': str(path),
+        'duration': round(speech.source.duration, 2),
+        'wall_seconds': round(wall, 2),
+        'utterances': len(finals),
+        'empty': speech.stats['empty'],
+        'from_partial': speech.stats['from_partial'],
+        'partials': speech.stats['partials'],
+        'latencies_ms': [round(transcript.latency * 1000, 1) for transcript in finals],
+        'transcribe_seconds': round(speech.stats['transcribe_seconds'], 3),
+        'audio_seconds': round(speech.stats['audio_seconds'], 2),
+        'text': hypothesis,
+    }
+    
+    reference_path = path.with_suffix('.txt')
+    if reference_path.exists():
+        reference = words(reference_path.read_text(encoding='utf-8'))
+        result['reference_words'] = len(reference)
+        result['word_errors'] = word_errors(reference, words(hypothesis))
+    return result, speech.transcriber
+
+
+def summarize(results: List[dict], realtime: bool) -> dict:
+    latencies = sorted(latency for result in results for latency in result['latencies_ms'])
+    finals = sum(result['utterances'] for result in results)
+    audio = sum(result['audio_seconds'] for result in results)
+    reference = sum(result.get('reference_words', 0) for result in results)
+    return {
+        'files': len(results),
+        'utterances': finals,
+        'empty': sum(result['empty'] for result in results),
+        'latency_p50_ms': percentile(latencies, 0.50) if latencies and realtime else None,
+        'latency_p95_ms': percentile(latencies, 0.95) if latencies and realtime else None,
+        'from_partial': sum(result['from_partial'] for result in results) / finals if finals else None,
+        'real_time_factor': sum(result['transcribe_seconds'] for result in results) / audio if audio else None,
+        'wer': sum(result.get('word_errors', 0) for result in results) / reference if reference else None,
+    }
+
+
+def print_results(results: List[dict], summary: dict, spec: str, realtime: bool):
+    table = Table(title=f"Speech input: {spec}{'' if realtime else ' (--fast)'}")
+    table.add_column("File", style="cyan")
+    for column in ("Audio", "Utterances", "Latency p50", "From partials", "RTF", "WER"):
+        table.add_column(column, justify="right")
+    for result in results:
+        latencies = sorted(result['latencies_ms'])
+        wer = result['word_errors'] / result['reference_words'] if result.get('reference_words') else None
+        table.add_row(
+            Path(result['file']).name,
+            f"{result['duration']:.1f}s",
+            str(result['utterances']),
+            f"{percentile(latencies, 0.50):,.0f} ms" if latencies and realtime else "-",
+            f"{result['from_partial']}/{result['utterances']}",
+            f"{result['transcribe_seconds'] / result['audio_seconds']:.2f}" if result['audio_seconds'] else "-",
+            f"{wer:.1%}" if wer is not None else "-"
+        )
+    console.print(table)
+    
+    line = f"[cyan]Overall:[/cyan] {summary['utterances']} utterances"
+    if summary['empty']:
+        line += f" (+{summary['empty']} heard as nothing)"
+    if summary['latency_p50_ms'] is not None:
+        line += (f" • end of speech → text p50 {summary['latency_p50_ms']:,.0f} ms / "
+                 f"p95 {summary['latency_p95_ms']:,.0f} ms")
+    if summary['from_partial'] is not None:
+        line += f" • {summary['from_partial']:.0%} ready from partials"
+    if summary['real_time_factor'] is not None:
+        line += f" • {summary['real_time_factor']:.2f}× real time"
+    if summary['wer'] is not None:
+        line += f" • WER {summary['wer']:.1%}"
+    console.print(line)
+
+
+async def run(args) -> dict:
+    section = dict(load_config(args.config).get('voice_input', {}))
+    for key in ('model', 'compute_type', 'cpu_threads', 'workers', 'vad', 'silence_ms', 'partial_interval_ms'):
+        if getattr(args, key) is not None:
+            section[key] = getattr(args, key)
+    
+    results, transcriber = [], None
+    for path in find_wavs(args.paths):
+        console.print(f"[dim]{path}[/dim]")
+        result, transcriber = await run_file(path, section, not args.fast, transcriber)
+        results.append(result)
+    return {
+        'config': section,
+        'realtime': not args.fast,
+        'spec': transcriber.spec if transcriber else None,
+        'summary': summarize(results, not args.fast),
+        'files': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='*', help="WAV files or directories of them")
+    parser.add_argument('--synthetic', action='store_true', help="generate a small clip set")
+    parser.add_argument('--keep', help="with --synthetic: write the clips here instead of a temp folder")
+    parser.add_argument('--config', help="config file whose voice_input section is used")
+    parser.add_argument('--model', help="faster-whisper model, e.g. tiny.en, base.en, small.en")
+    parser.add_argument('--compute-type', dest='compute_type')
+    parser.add_argument('--cpu-threads', dest='cpu_threads', type=int)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--vad', choices=('energy', 'webrtc'))
+    parser.add_argument('--silence-ms', dest='silence_ms', type=int, help="pause that ends an utterance")
+    parser.add_argument('--partial-interval-ms', dest='partial_interval_ms', type=int)
+    parser.add_argument('--fast', action='store_true', help="don't pace the audio at real time")
+    parser.add_argument('--output', help="result JSON (default: benchmarks/results/stt-<time>.json)")
+    args = parser.parse_args()
+    
+    if importlib.util.find_spec('faster_whisper') is None:
+        console.print("[red]faster-whisper is not installed[/red]")
+        console.print("[dim]Run: pip install faster-whisper[/dim]")
+        sys.exit(1)
+    
+    temporary: Optional[tempfile.TemporaryDirectory] = None
+    if args.synthetic:
+        if args.keep:
+            folder = Path(args.keep)
+        else:
+            temporary = tempfile.TemporaryDirectory()
+            folder = Path(temporary.name)
+        if not make_synthetic(folder):
+            console.print("[yellow]No speech synthesizer (say, espeak-ng, espeak): "
+                          "formant-synthesized syllables, no WER[/yellow]")
+        args.paths = [str(folder)]
+    elif not args.paths:
+        parser.error("give WAV files or directories, or --synthetic")
+    if not find_wavs(args.paths):
+        console.print("[red]No WAV files found[/red]")
+        sys.exit(1)
+    
+    result = asyncio.run(run(args))
+    print_results(result['files'], result['summary'], result['spec'], result['realtime'])
+    if temporary is not None:
+        temporary.cleanup()
+    result['fixtures'] = 'synthetic' if args.synthetic else args.paths
+    
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"stt-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(result, indent=2), encoding='utf-8')
+    console.print(f"[dim]Saved {output_path}[/dim]")
+
+
+if __name__ == "__main__":
+    main()
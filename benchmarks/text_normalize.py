@@ -0,0 +1,185 @@
+"""
+Text Normalization Benchmark
+
+Checks jarvis/text.py against the fixture corpus (expected outputs were
+recorded from the previous per-rule regex implementations, kept below as
+the baseline) and times both on long reasoning-model replies.
+
+Usage: python benchmarks/text_normalize.py [--repeat N]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jarvis.text import ThinkingFilter, clean_for_speech, clean_markdown, strip_thinking  # noqa: E402
+
+console = Console()
+
+CORPUS = Path(__file__).parent / "fixtures" / "text_corpus.json"
+
+
+# --- Baseline: the implementations jarvis/text.py replaced ---------------
+
+def legacy_strip_thinking(text: str) -> str:
+    """brain.strip_thinking before jarvis/text.py."""
+    # Strip complete thinking blocks (standard format)
+    text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL)
+    # Strip <thinking>...</thinking> variant
+    text = re.sub(r'<thinking>.*?</thinking>', '', text, flags=re.DOTALL)
+    # Handle missing opening tag - strip everything before closing tag
+    if '</think>' in text:
+        text = text.split('</think>', 1)[-1]
+    if '</thinking>' in text:
+        text = text.split('</thinking>', 1)[-1]
+    # Handle unclosed tags (model cut off mid-thought)
+    if '<think>' in text:
+        text = text.split('<think>', 1)[0]
+    if '<thinking>' in text:
+        text = text.split('<thinking>', 1)[0]
+    # Clean up any orphan tags
+    text = re.sub(r'</?think(?:ing)?>', '', text)
+    return text.strip()
+
+
+def legacy_clean_for_speech(text: str) -> str:
+    """voice.clean_for_speech before jarvis/text.py."""
+    # Strip complete thinking blocks
+    text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL)
+    text = re.sub(r'<thinking>.*?</thinking>', '', text, flags=re.DOTALL)
+    # Handle missing opening tag - strip everything before closing tag
+    if '</think>' in text:
+        text = text.split('</think>', 1)[-1]
+    if '</thinking>' in text:
+        text = text.split('</thinking>', 1)[-1]
+    # Handle unclosed tags
+    if '<think>' in text:
+        text = text.split('<think>', 1)[0]
+    if '<thinking>' in text:
+        text = text.split('<thinking>', 1)[0]
+    # Clean up orphan tags
+    text = re.sub(r'</?think(?:ing)?>', '', text)
+    # Strip markdown
+    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Bold
+    text = re.sub(r'\*([^*]+)\*', r'\1', text)  # Italic
+    text = re.sub(r'_+', '', text)
+    text = re.sub(r'`+', '', text)
+    text = re.sub(r'^#+\s*', '', text, flags=re.MULTILINE)  # Headers
+    text = re.sub(r'^\s*[-*]\s+', '', text, flags=re.MULTILINE)  # Bullets
+    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)  # Numbered lists
+    text = re.sub(r'\n{2,}', '. ', text)  # Multiple newlines to pause
+    text = re.sub(r'\n', ' ', text)  # Single newlines to space
+    text = re.sub(r'  +', ' ', text)
+    return text.strip()
+
+
+# --- Workload -------------------------------------------------------------
+
+def reasoning_reply(think_words: int) -> str:
+    """A reasoning-model reply: a long <think> block, then a short markdown answer."""
+    thought = ' '.join(
+        f"step {i}: consider **option** {i % 7}, check `value_{i}` and compare." if i % 5 == 0
+        else f"hmm, {i} more things to weigh"
+        for i in range(think_words // 6)
+    )
+    answer = (
+        "Here's what I'd do:\n\n"
+        "1. **Measure** the `latency` first\n"
+        "2. *Then* fix the worst offender\n"
+        "- keep the cache\n"
+        "- drop the polling\n\n"
+        "That's all, dear."
+    )
+    return f"<think>\n{thought}\n</think>\n\n{answer}"
+
+
+def per_call_us(func, text: str, repeat: int) -> float:
+    """Best-of-5 average time per call, in microseconds."""
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func(text)
+        best = min(best, (time.perf_counter() - start) / repeat)
+    return best * 1e6
+
+
+def stream(text: str, chunk: int = 8) -> str:
+    """Feed text through ThinkingFilter in token-sized chunks."""
+    thinking_filter = ThinkingFilter()
+    parts = [thinking_filter.feed(text[i:i + chunk]) for i in range(0, len(text), chunk)]
+    parts.append(thinking_filter.flush())
+    return ''.join(parts)
+
+
+def check_corpus() -> bool:
+    """Compare against the recorded outputs; print any mismatch."""
+    cases = json.loads(CORPUS.read_text(encoding='utf-8'))
+    failures = 0
+    for case in cases:
+        for name, func in (('strip_thinking', strip_thinking), ('clean_for_speech', clean_for_speech)):
+            got = func(case['input'])
+            if got != case[name]:
+                failures += 1
+                console.print(f"[red]✗[/red] {case['name']} ({name})")
+                console.print(f"  [dim]expected:[/dim] {case[name]!r}")
+                console.print(f"  [dim]got:[/dim]      {got!r}")
+        # Brain output (thinking already removed) is what Voice speaks
+        if clean_markdown(case['strip_thinking']) != legacy_clean_for_speech(case['strip_thinking']):
+            failures += 1
+            console.print(f"[red]✗[/red] {case['name']} (clean_markdown)")
+    if failures:
+        console.print(f"[red]✗[/red] {failures} mismatches in {len(cases)} fixtures")
+    else:
+        console.print(f"[green]✓[/green] {len(cases)} fixtures match the previous behavior")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=50, help="calls per timing sample")
+    args = parser.parse_args()
+    
+    ok = check_corpus()
+    
+    table = Table(title="Text normalization (µs per reply)")
+    table.add_column("Think words", justify="right")
+    table.add_column("Task")
+    table.add_column("Before", justify="right")
+    table.add_column("After", justify="right")
+    table.add_column("Speedup", justify="right")
+    
+    for think_words in (200, 2000, 20000):
+        text = reasoning_reply(think_words)
+        visible = strip_thinking(text)
+        rows = [
+            ('strip_thinking', legacy_strip_thinking, strip_thinking, text),
+            ('clean_for_speech', legacy_clean_for_speech, clean_for_speech, text),
+            # What a turn used to cost (strip, then clean re-strips) vs now
+            ('reply → speech',
+             lambda t: legacy_clean_for_speech(legacy_strip_thinking(t)),
+             lambda t: clean_markdown(strip_thinking(t)), text),
+            ('speak visible text', legacy_clean_for_speech, clean_markdown, visible),
+        ]
+        for task, before_func, after_func, sample in rows:
+            before = per_call_us(before_func, sample, args.repeat)
+            after = per_call_us(after_func, sample, args.repeat)
+            table.add_row(f"{think_words:,}", task, f"{before:,.1f}", f"{after:,.1f}", f"{before / after:.1f}x")
+        if stream(text).strip() != visible:
+            ok = False
+            console.print(f"[red]✗[/red] ThinkingFilter disagrees with strip_thinking ({think_words} words)")
+    
+    console.print(table)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
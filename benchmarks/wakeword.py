@@ -0,0 +1,253 @@
+"""
+Wake Word Benchmark
+
+Runs jarvis/wakeword.py over WAV fixtures the way the local speech input
+does (30 ms blocks, energy VAD gating the matcher) and reports, for each
+threshold:
+
+- false-reject rate: positive clips in which the wake word was missed
+- false accepts per hour of negative audio, and negative clips with any
+- CPU cost per 20 ms feature frame (features and matching separately)
+  and as a share of one core, while idle (background noise only) and
+  over the fixtures
+
+Fixture layout (16 kHz mono WAVs work best, others are resampled):
+
+    fixtures/templates/*.wav   enrolled takes of the wake word
+    fixtures/positive/*.wav    clips with the wake word once, maybe followed by a command
+    fixtures/negative/*.wav    speech, TV, music... without it
+
+--synthetic generates a toy set instead (formant-synthesized "Hey
+Yennefer"-like syllables against other syllable sequences, at several
+speaking rates, pitches and noise levels) to check the pipeline end to
+end without recordings. The default threshold (0.135) comes from it: no
+misses from 0.13 up, no false accepts up to 0.14. Real recordings are
+what your own threshold should be tuned on.
+
+Usage: python benchmarks/wakeword.py fixtures/ [--thresholds 0.12,0.135,0.15] [--output results.json]
+       python benchmarks/wakeword.py --synthetic [--keep fixtures/]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+from rich.console import Console
+from rich.table import Table
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from jarvis.speech import EnergyVAD, load_wav  # noqa: E402
+from jarvis.wakeword import WakeWordDetector, trim_speech  # noqa: E402
+
+console = Console()
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SAMPLE_RATE = 16000
+BLOCK = 480  # 30 ms, as SpeechInput feeds it
+SEED = 22
+
+# (first formant, second formant) of a few vowels, Hz
+VOWELS = {'a': (750, 1200), 'e': (500, 1900), 'i': (300, 2300), 'o': (500, 900), 'u': (320, 800),
+          'ei': (450, 2100), 'er': (500, 1400), 'ae': (650, 1700)}
+# Syllables: (noise onset seconds, vowel, nasal onset)
+WAKE_WORD = [(0.06, 'ei', False), (0.0, 'e', False), (0.0, 'e', True), (0.07, 'er', False)]
+
+
+def synthesize(syllables, rng: np.random.Generator, rate: float = 1.0, pitch: float = 140.0) -> np.ndarray:
+    """Crude formant synthesis: a harmonic source shaped by the vowel's formants, with fricative noise."""
+    pieces = []
+    for noise, vowel, nasal in syllables:
+        if noise:
+            burst = rng.normal(0, 1, int(noise / rate * SAMPLE_RATE))
+            pieces.append(np.convolve(burst, [1, -0.9], mode='same') * 1500)
+        length = int(rng.uniform(0.13, 0.19) / rate * SAMPLE_RATE)
+        t = np.arange(length) / SAMPLE_RATE
+        f0 = pitch * (1 + 0.08 * np.sin(np.pi * t / t[-1]))
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        first, second = VOWELS[vowel]
+        if nasal:
+            first, second = first * 0.7, second * 0.8
+        voice = np.zeros(length)
+        for harmonic in range(1, int(4000 / pitch)):
+            frequency = harmonic * pitch
+            gain = 1 / (1 + ((frequency - first) / 90) ** 2) + 0.6 / (1 + ((frequency - second) / 120) ** 2)
+            voice += gain * np.sin(harmonic * phase)
+        envelope = np.minimum(1, np.minimum(t, t[-1] - t) / 0.02)
+        pieces.append(voice * envelope * 6000)
+    return np.concatenate(pieces)
+
+
+def random_word(rng: np.random.Generator) -> list:
+    names = list(VOWELS)
+    return [(float(rng.choice([0, 0, 0.05, 0.07])), names[rng.integers(len(names))], bool(rng.random() < 0.2))
+            for _ in range(rng.integers(1, 5))]
+
+
+def clip(parts: List[np.ndarray], rng: np.random.Generator, noise: float) -> np.ndarray:
+    audio = np.concatenate(parts)
+    audio = audio + rng.normal(0, noise, len(audio))
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def silence(seconds: float) -> np.ndarray:
+    return np.zeros(int(seconds * SAMPLE_RATE))
+
+
+def save_wav(path: Path, samples: np.ndarray):
+    with wave.open(str(path), 'wb') as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(samples.astype('<i2').tobytes())
+
+
+def make_synthetic(folder: Path, positives: int = 40, negatives: int = 40):
+    """A toy fixture set (see module docstring); one speaker, varied rate, pitch and noise."""
+    rng = np.random.default_rng(SEED)
+    for name in ('templates', 'positive', 'negative'):
+        (folder / name).mkdir(parents=True, exist_ok=True)
+    for number in range(3):
+        take = clip([synthesize(WAKE_WORD, rng, rng.uniform(0.95, 1.05), rng.uniform(135, 145))], rng, 30)
+        save_wav(folder / 'templates' / f"take{number + 1:02d}.wav", trim_speech(take, SAMPLE_RATE))
+    for number in range(positives):
+        rate, pitch, noise = rng.uniform(0.8, 1.25), rng.uniform(120, 165), rng.choice([30, 150, 400])
+        parts = [silence(rng.uniform(0.5, 1.5)), synthesize(WAKE_WORD, rng, rate, pitch), silence(rng.uniform(0, 0.3))]
+        parts += [synthesize(random_word(rng), rng, rate, pitch) for _ in range(rng.integers(0, 4))]
+        save_wav(folder / 'positive' / f"positive{number + 1:03d}.wav", clip(parts + [silence(1.0)], rng, noise))
+    for number in range(negatives):
+        rate, pitch, noise = rng.uniform(0.8, 1.25), rng.uniform(100, 220), rng.choice([30, 150, 400])
+        parts = []
+        for _ in range(rng.integers(4, 14)):
+            parts += [synthesize(random_word(rng), rng, rate, pitch), silence(rng.uniform(0.05, 0.6))]
+        save_wav(folder / 'negative' / f"negative{number + 1:03d}.wav", clip(parts, rng, noise))
+
+
+def run_clip(detector: WakeWordDetector, samples: np.ndarray) -> int:
+    """Detections in one clip, fed block by block from a cold start."""
+    detector.reset()
+    vad = EnergyVAD()
+    detections = 0
+    for offset in range(0, len(samples) - BLOCK + 1, BLOCK):
+        block = samples[offset:offset + BLOCK]
+        detections += detector.feed(block, vad.is_speech(block))
+    return detections
+
+
+def idle_cost(detector: WakeWordDetector, seconds: float = 60.0) -> float:
+    """Share of one core spent on background noise (VAD + features), as while asleep."""
+    rng = np.random.default_rng(SEED)
+    noise = rng.normal(0, 60, int(seconds * SAMPLE_RATE)).astype(np.int16)
+    vad = EnergyVAD()
+    detector.reset()
+    started = time.process_time()
+    for offset in range(0, len(noise) - BLOCK + 1, BLOCK):
+        block = noise[offset:offset + BLOCK]
+        detector.feed(block, vad.is_speech(block))
+    return (time.process_time() - started) / seconds
+
+
+def evaluate(folder: Path, threshold: float, clips: dict) -> dict:
+    detector = WakeWordDetector.from_wavs(sorted((folder / 'templates').glob('*.wav')), SAMPLE_RATE,
+                                          threshold=threshold)
+    started = time.process_time()
+    hits = [run_clip(detector, samples) for samples in clips['positive']]
+    accepts = [run_clip(detector, samples) for samples in clips['negative']]
+    cpu = time.process_time() - started
+    audio = sum(len(samples) for group in clips.values() for samples in group) / SAMPLE_RATE
+    negative_hours = sum(len(samples) for samples in clips['negative']) / SAMPLE_RATE / 3600
+    stats = detector.stats
+    return {
+        'threshold': threshold,
+        'false_reject_rate': hits.count(0) / len(hits) if hits else None,
+        'false_accepts': sum(accepts),
+        'false_accepts_per_hour': sum(accepts) / negative_hours if negative_hours else None,
+        'negative_clips_accepted': sum(count > 0 for count in accepts),
+        'repeat_detections': sum(max(count - 1, 0) for count in hits),
+        'feature_us_per_frame': stats['feature_seconds'] / stats['frames'] * 1e6 if stats['frames'] else None,
+        'match_us': stats['match_seconds'] / stats['matches'] * 1e6 if stats['matches'] else None,
+        'matches_per_frame': stats['matches'] / stats['frames'] if stats['frames'] else None,
+        'cpu_percent': cpu / audio * 100 if audio else None,
+    }
+
+
+def print_results(results: List[dict], idle: float, clips: dict, templates: int):
+    table = Table(title=f"Wake word: {len(clips['positive'])} positive, {len(clips['negative'])} negative clips, "
+                        f"{templates} takes")
+    table.add_column("Threshold", style="cyan")
+    for column in ("FRR", "FA/hour", "FA clips", "Features", "Match", "CPU"):
+        table.add_column(column, justify="right")
+    for result in results:
+        table.add_row(
+            f"{result['threshold']:.3f}",
+            f"{result['false_reject_rate']:.1%}" if result['false_reject_rate'] is not None else "-",
+            f"{result['false_accepts_per_hour']:.1f}" if result['false_accepts_per_hour'] is not None else "-",
+            str(result['negative_clips_accepted']),
+            f"{result['feature_us_per_frame']:.0f} µs" if result['feature_us_per_frame'] is not None else "-",
+            f"{result['match_us']:.0f} µs" if result['match_us'] is not None else "-",
+            f"{result['cpu_percent']:.2f}%" if result['cpu_percent'] is not None else "-"
+        )
+    console.print(table)
+    console.print("[dim]Features: per 20 ms frame • Match: per run, only around speech • "
+                  "CPU: share of a core over the fixtures[/dim]")
+    console.print(f"[cyan]Idle:[/cyan] {idle * 100:.2f}% of a core on background noise (VAD + features)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', nargs='?', help="folder with templates/, positive/ and negative/")
+    parser.add_argument('--synthetic', action='store_true', help="generate a toy fixture set")
+    parser.add_argument('--keep', help="with --synthetic: write the fixtures here instead of a temp folder")
+    parser.add_argument('--thresholds', default='0.12,0.135,0.15,0.2', help="comma-separated thresholds")
+    parser.add_argument('--output', help="result JSON (default: benchmarks/results/wakeword-<time>.json)")
+    args = parser.parse_args()
+    
+    temporary: Optional[tempfile.TemporaryDirectory] = None
+    if args.synthetic:
+        if args.keep:
+            folder = Path(args.keep)
+        else:
+            temporary = tempfile.TemporaryDirectory()
+            folder = Path(temporary.name)
+        make_synthetic(folder)
+    elif args.fixtures:
+        folder = Path(args.fixtures)
+    else:
+        parser.error("give a fixtures folder or --synthetic")
+    
+    templates = sorted((folder / 'templates').glob('*.wav'))
+    if not templates:
+        console.print(f"[red]No templates in {folder / 'templates'}[/red]")
+        sys.exit(1)
+    clips = {group: [load_wav(path, SAMPLE_RATE) for path in sorted((folder / group).glob('*.wav'))]
+             for group in ('positive', 'negative')}
+    
+    thresholds = [float(value) for value in args.thresholds.split(',')]
+    results = [evaluate(folder, threshold, clips) for threshold in thresholds]
+    idle = idle_cost(WakeWordDetector.from_wavs(templates, SAMPLE_RATE))
+    print_results(results, idle, clips, len(templates))
+    if temporary is not None:
+        temporary.cleanup()
+    
+    output = {
+        'fixtures': 'synthetic' if args.synthetic else str(folder),
+        'templates': len(templates),
+        'positive_clips': len(clips['positive']),
+        'negative_clips': len(clips['negative']),
+        'idle_cpu_percent': idle * 100,
+        'thresholds': results,
+    }
+    output_path = Path(args.output) if args.output else RESULTS_DIR / f"wakeword-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(output, indent=2), encoding='utf-8')
+    console.print(f"[dim]Saved {output_path}[/dim]")
+
+
+if __name__ == "__main__":
+    main()
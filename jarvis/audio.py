@@ -0,0 +1,269 @@
+"""
+Audio - Output Sinks with Completion Futures
+
+A sink plays buffers back to back (no gap between clips) and resolves a
+future when each buffer has finished playing, so nothing has to poll.
+
+Backends:
+- sounddevice (PortAudio callback stream, PCM only)
+- pygame (mixer channel + one timer per clip, also plays mp3)
+"""
+
+import asyncio
+import io
+import threading
+from collections import deque
+from typing import Callable, Deque, Optional
+
+from rich.console import Console
+
+console = Console()
+
+# Seconds of silence before the sounddevice stream is paused to save CPU
+IDLE_STOP_SECONDS = 2.0
+
+
+class _Clip:
+    """A queued buffer with its completion future."""
+    
+    __slots__ = ('data', 'offset', 'future', 'on_start', 'length')
+    
+    def __init__(self, data, future: asyncio.Future, on_start: Optional[Callable[[], None]],
+                 length: float = 0.0):
+        self.data = data
+        self.offset = 0
+        self.future = future
+        self.on_start = on_start
+        self.length = length
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AudioSink:
+    """Plays audio buffers in order; enqueue() returns a completion future."""
+    
+    def enqueue(self, pcm: bytes, on_start: Optional[Callable[[], None]] = None) -> asyncio.Future:
+        """Queue 16-bit mono PCM after everything already queued."""
+        raise NotImplementedError
+    
+    def enqueue_encoded(self, data: bytes, on_start: Optional[Callable[[], None]] = None) -> asyncio.Future:
+        """Queue an encoded clip (mp3)."""
+        raise NotImplementedError(f"{type(self).__name__} only plays PCM")
+    
+    def stop(self):
+        """Drop everything queued; pending futures are cancelled."""
+        raise NotImplementedError
+    
+    def close(self):
+        """Release the audio device."""
+        self.stop()
+
+
+class SoundDeviceSink(AudioSink):
+    """PortAudio output stream fed from a callback.
+    
+    The audio thread pulls queued buffers itself; a buffer's future is
+    resolved once it has been handed to the device plus the device's
+    output latency, i.e. when it has actually been heard.
+    """
+    
+    def __init__(self, sample_rate: int, latency: str = 'low'):
+        import sounddevice as sd
+        
+        self._sd = sd
+        self._loop = asyncio.get_running_loop()
+        self._lock = threading.Lock()
+        self._clips: Deque[_Clip] = deque()
+        self._idle_bytes = 0
+        self._idle_limit = int(sample_rate * 2 * IDLE_STOP_SECONDS)
+        self._stream = sd.RawOutputStream(
+            samplerate=sample_rate,
+            channels=1,
+            dtype='int16',
+            latency=latency,
+            callback=self._callback
+        )
+    
+    def _callback(self, outdata, frames, time_info, status):
+        needed = len(outdata)
+        pos = 0
+        with self._lock:
+            while pos < needed and self._clips:
+                clip = self._clips[0]
+                if clip.offset == 0 and clip.on_start is not None:
+                    self._loop.call_soon_threadsafe(clip.on_start)
+                take = min(needed - pos, len(clip.data) - clip.offset)
+                outdata[pos:pos + take] = clip.data[clip.offset:clip.offset + take]
+                clip.offset += take
+                pos += take
+                if clip.offset >= len(clip.data):
+                    self._clips.popleft()
+                    # Still in the device buffer for `latency` seconds
+                    self._loop.call_soon_threadsafe(
+                        self._loop.call_later, self._stream.latency, _resolve, clip.future
+                    )
+        if pos < needed:
+            outdata[pos:] = b'\x00' * (needed - pos)
+            self._idle_bytes += needed - pos
+            if self._idle_bytes >= self._idle_limit:
+                raise self._sd.CallbackStop
+        else:
+            self._idle_bytes = 0
+    
+    def enqueue(self, pcm: bytes, on_start: Optional[Callable[[], None]] = None) -> asyncio.Future:
+        future = self._loop.create_future()
+        with self._lock:
+            self._clips.append(_Clip(pcm, future, on_start))
+            self._idle_bytes = 0
+        if not self._stream.active:
+            # Paused after idling (or never started)
+            if not self._stream.stopped:
+                self._stream.stop()
+            self._stream.start()
+        return future
+    
+    def stop(self):
+        with self._lock:
+            clips = list(self._clips)
+            self._clips.clear()
+        for clip in clips:
+            clip.future.cancel()
+    
+    def close(self):
+        self.stop()
+        self._stream.close()
+
+
+class PygameSink(AudioSink):
+    """pygame mixer channel with gapless queueing.
+    
+    SDL holds one playing and one queued sound per channel; the next clip
+    is always queued ahead so it starts without a gap. Completion is
+    signalled by a single timer per clip at its known end time.
+    """
+    
+    def __init__(self, pcm_rate: Optional[int] = None):
+        import pygame
+        
+        self.init_mixer(pygame, pcm_rate)
+        self._pygame = pygame
+        self._loop = asyncio.get_running_loop()
+        self._channel = pygame.mixer.Channel(0)
+        self._pending: Deque[_Clip] = deque()
+        self._playing: Optional[_Clip] = None
+        self._queued: Optional[_Clip] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._ends_at = 0.0
+    
+    @staticmethod
+    def init_mixer(pygame, pcm_rate: Optional[int]):
+        """Open the mixer (a no-op if it is already open)."""
+        if pcm_rate:
+            # Raw PCM buffers are handed straight to the mixer, so match its format
+            pygame.mixer.init(frequency=pcm_rate, size=-16, channels=1)
+        else:
+            pygame.mixer.init()
+    
+    def enqueue(self, pcm: bytes, on_start: Optional[Callable[[], None]] = None) -> asyncio.Future:
+        return self._add(self._pygame.mixer.Sound(buffer=pcm), on_start)
+    
+    def enqueue_encoded(self, data: bytes, on_start: Optional[Callable[[], None]] = None) -> asyncio.Future:
+        return self._add(self._pygame.mixer.Sound(io.BytesIO(data)), on_start)
+    
+    def _add(self, sound, on_start) -> asyncio.Future:
+        future = self._loop.create_future()
+        self._pending.append(_Clip(sound, future, on_start, sound.get_length()))
+        self._pump()
+        return future
+    
+    def _pump(self):
+        if self._playing is None and self._pending:
+            clip = self._pending.popleft()
+            self._channel.play(clip.data)
+            self._started(clip, self._loop.time())
+        if self._playing is not None and self._queued is None and self._pending:
+            self._queued = self._pending.popleft()
+            self._channel.queue(self._queued.data)
+    
+    def _started(self, clip: _Clip, start: float):
+        self._playing = clip
+        if clip.on_start is not None:
+            clip.on_start()
+        # End times chain from the previous clip's end rather than from when
+        # the timer fired, so timer lateness doesn't accumulate; the slack
+        # makes sure SDL has really moved on before the next queue()
+        self._ends_at = start + clip.length
+        self._timer = self._loop.call_at(self._ends_at + 0.02, self._finished)
+    
+    def _finished(self):
+        clip, self._playing = self._playing, None
+        _resolve(clip.future)
+        if self._queued is not None:
+            # SDL already switched to the queued sound
+            queued, self._queued = self._queued, None
+            self._started(queued, self._ends_at)
+        self._pump()
+    
+    def stop(self):
+        self._channel.stop()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        clips = [self._playing, self._queued] + list(self._pending)
+        self._playing = self._queued = None
+        self._pending.clear()
+        for clip in clips:
+            if clip is not None:
+                clip.future.cancel()
+    
+    def close(self):
+        self.stop()
+        self._pygame.mixer.quit()
+
+
+def create_sink(backend: str, pcm_rate: Optional[int]) -> AudioSink:
+    """Pick an audio sink: 'sounddevice', 'pygame' or 'auto'.
+    
+    sounddevice only handles PCM; auto uses it when it is installed and
+    falls back to pygame otherwise.
+    """
+    if backend in ('auto', 'sounddevice') and pcm_rate:
+        try:
+            return SoundDeviceSink(pcm_rate)
+        except ImportError:
+            if backend == 'sounddevice':
+                console.print("[yellow]sounddevice not installed, using pygame[/yellow]")
+                console.print("[dim]Run: pip install sounddevice[/dim]")
+        except Exception as e:
+            console.print(f"[yellow]sounddevice unavailable ({e}), using pygame[/yellow]")
+    return PygameSink(pcm_rate)
+
+
+def _preload(backend: str, pcm_rate: Optional[int]):
+    """Import the backend and open the device, so create_sink() finds them ready."""
+    if backend in ('auto', 'sounddevice') and pcm_rate:
+        try:
+            import sounddevice  # noqa: F401
+            return
+        except Exception:
+            # Missing package or PortAudio; create_sink() reports it
+            pass
+    try:
+        import pygame
+        PygameSink.init_mixer(pygame, pcm_rate)
+    except Exception:
+        pass
+
+
+async def open_sink(backend: str, pcm_rate: Optional[int]) -> AudioSink:
+    """create_sink() without blocking the event loop.
+    
+    Importing pygame or sounddevice and opening the mixer take a few hundred
+    ms; that happens on a worker thread, and the sink itself is then built on
+    the loop (it needs the running loop for its futures).
+    """
+    await asyncio.get_running_loop().run_in_executor(None, _preload, backend, pcm_rate)
+    return create_sink(backend, pcm_rate)
@@ -0,0 +1,401 @@
+"""
+Batch - Headless Prompt Processing
+
+Runs prompts, or scripted conversations, from a JSONL file through
+Yennefer's persona with no voice and no panels. Each input line is one item:
+
+    {"id": "q1", "prompt": "What do you think of Geralt?"}
+    {"id": "c1", "turns": ["Hello.", "And who might you be?"]}
+    "A bare JSON string is a prompt too"
+
+Every item gets a fresh conversation (memory off, like server sessions);
+the turns of a scripted one are sent one after another in it. Up to
+batch.concurrency items run at once, sharing one pooled client, endpoint
+router and scheduler. Results are appended as each item finishes, one
+JSON line per item:
+
+    {"id", "line", "reply", "turns": [{"prompt", "reply", "first_token_ms",
+     "first_text_ms", "total_ms", "prompt_tokens", "completion_tokens",
+     "endpoint"}, ...], "total_ms", "prompt_tokens", "completion_tokens",
+     "attempts"}
+
+or {"id", "line", "error", "attempts"} once batch.retries are used up.
+
+Lines are flushed as they are written, so after a crash or Ctrl+C the
+same command picks up where it stopped: items already in the output file
+are skipped and failed ones are tried again (the last line per id wins).
+
+Usage: python -m jarvis.main batch prompts.jsonl [-o results.jsonl] [-c 4] [--config path]
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Set
+
+from rich.console import Console
+
+from .brain import Brain
+from .config import load_config
+from .router import LLMRouter
+from .scheduler import LLMScheduler, Overloaded
+from .tools import ToolRunner
+from .trace import percentile
+
+console = Console()
+
+
+class BatchError(Exception):
+    """The input file can't be run as a batch."""
+
+
+class TurnFailed(Exception):
+    """A turn got no reply, or only part of one."""
+
+
+class BatchItem:
+    """One prompt, or one scripted conversation, from the input file."""
+    
+    __slots__ = ('id', 'line', 'turns')
+    
+    def __init__(self, id: str, line: int, turns: List[str]):
+        self.id = id
+        self.line = line
+        self.turns = turns
+
+
+def parse_item(value: Any, line: int) -> BatchItem:
+    """Item for one decoded input line; raises ValueError if it is neither form."""
+    if isinstance(value, str):
+        value = {'prompt': value}
+    if not isinstance(value, dict):
+        raise ValueError("expected an object or a string")
+    if 'turns' in value:
+        turns = value['turns']
+        if not isinstance(turns, list) or not turns:
+            raise ValueError("'turns' must be a non-empty list")
+    elif 'prompt' in value:
+        turns = [value['prompt']]
+    else:
+        raise ValueError("needs 'prompt' or 'turns'")
+    if not all(isinstance(turn, str) and turn.strip() for turn in turns):
+        raise ValueError("prompts must be non-empty strings")
+    # Without an id the line number stands in, which stays put between runs
+    return BatchItem(str(value.get('id', line)), line, turns)
+
+
+def load_items(path: Path) -> List[BatchItem]:
+    """All items of the input file, checked before anything is sent."""
+    items: List[BatchItem] = []
+    ids: Set[str] = set()
+    with open(path, encoding='utf-8') as f:
+        for line, text in enumerate(f, 1):
+            if not text.strip():
+                continue
+            try:
+                item = parse_item(json.loads(text), line)
+            except ValueError as e:
+                raise BatchError(f"{path}:{line}: {e}")
+            if item.id in ids:
+                raise BatchError(f"{path}:{line}: duplicate id {item.id!r}")
+            ids.add(item.id)
+            items.append(item)
+    return items
+
+
+def read_done(path: Path) -> Set[str]:
+    """Ids with a result in an earlier run's output.
+    
+    A last line cut off mid-write by a crash is removed so new results
+    start on a line of their own.
+    """
+    if not path.exists():
+        return set()
+    data = path.read_bytes()
+    if data and not data.endswith(b'\n'):
+        data = data[:data.rfind(b'\n') + 1]
+        with open(path, 'r+b') as f:
+            f.truncate(len(data))
+    done: Set[str] = set()
+    for text in data.decode('utf-8', errors='replace').splitlines():
+        try:
+            record = json.loads(text)
+        except ValueError:
+            continue
+        if not isinstance(record, dict) or 'id' not in record:
+            continue
+        if record.get('error') is None:
+            done.add(record['id'])
+        else:
+            done.discard(record['id'])
+    return done
+
+
+def batch_config(config: dict, concurrency: int) -> dict:
+    """Config for an item's Brain: nothing persisted, a connection per item in flight."""
+    batch = copy.deepcopy(config)
+    llm = batch.setdefault('llm', {})
+    llm['max_connections'] = max(concurrency, llm.get('max_connections', 4))
+    llm['max_keepalive_connections'] = max(concurrency, llm.get('max_keepalive_connections', 2))
+    batch['memory'] = {'enabled': False, 'retrieval': {'enabled': False}}
+    return batch
+
+
+class BatchRunner:
+    """Runs items concurrently and appends their results to a JSONL file."""
+    
+    def __init__(self, config: dict, concurrency: int = 4, retries: int = 1,
+                 progress_interval: float = 5.0):
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.progress_interval = progress_interval
+        self.config = batch_config(config, self.concurrency)
+        
+        # Items only wait on each other for a slot, never get turned away
+        self.scheduler = LLMScheduler(max_concurrent=self.concurrency, max_queue=self.concurrency,
+                                      max_wait=None)
+        self.router = LLMRouter.from_config(config)
+        self.tools = ToolRunner.from_config(config)
+        # Checks LM Studio once and owns the HTTP client every item shares
+        self.brain = Brain(self.config, scheduler=self.scheduler, router=self.router, tools=self.tools)
+        
+        self.counts = {'done': 0, 'failed': 0, 'skipped': 0, 'retried': 0}
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._turn_seconds: List[float] = []
+        self._first_token: List[float] = []
+        self._started = 0.0
+        self._synced = 0.0
+    
+    async def run(self, items: List[BatchItem], output: Path) -> Optional[dict]:
+        """Run every item without a result in output yet; returns the summary."""
+        if not await self.brain.initialize():
+            return None
+        
+        done = read_done(output)
+        pending = [item for item in items if item.id not in done]
+        self.counts['skipped'] = len(items) - len(pending)
+        if self.counts['skipped']:
+            console.print(f"[dim]Resuming: {self.counts['skipped']:,} of {len(items):,} items already done[/dim]")
+        console.print(
+            f"[dim]Batch: {len(pending):,} items, {self.concurrency} at once → {output}[/dim]"
+        )
+        
+        self._started = time.perf_counter()
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'a', encoding='utf-8') as out:
+            # Workers share one iterator: each takes the next item when free
+            queue = iter(pending)
+            workers = [asyncio.create_task(self._worker(queue, out))
+                       for _ in range(min(self.concurrency, len(pending)))]
+            reporter = asyncio.create_task(self._report(len(pending)))
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                reporter.cancel()
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, reporter, return_exceptions=True)
+                out.flush()
+                os.fsync(out.fileno())
+        return self.summary()
+    
+    async def _worker(self, queue: Iterator[BatchItem], out):
+        for item in queue:
+            record = await self.run_item(item)
+            self._write(out, record)
+    
+    def _write(self, out, record: dict):
+        out.write(json.dumps(record, ensure_ascii=False) + '\n')
+        out.flush()
+        # A flushed line survives the process; fsync now and then so it
+        # survives the machine too
+        now = time.perf_counter()
+        if now - self._synced >= 1.0:
+            os.fsync(out.fileno())
+            self._synced = now
+    
+    async def run_item(self, item: BatchItem) -> dict:
+        """Result record for one item, trying it again from scratch if a turn fails."""
+        error = ''
+        for attempt in range(1, self.retries + 2):
+            if attempt > 1:
+                self.counts['retried'] += 1
+                await asyncio.sleep(attempt - 1)
+            brain = Brain(self.config, client=self.brain.client, scheduler=self.scheduler,
+                          session=item.id, router=self.router, tools=self.tools)
+            brain.model = self.router.primary.model
+            brain.busy_reply = None
+            started = time.perf_counter()
+            try:
+                turns = [await self._turn(brain, prompt) for prompt in item.turns]
+            except (TurnFailed, Overloaded) as e:
+                error = str(e)
+                continue
+            finally:
+                await brain.close()
+            
+            self.counts['done'] += 1
+            prompt_tokens = sum(turn['prompt_tokens'] or 0 for turn in turns)
+            completion_tokens = sum(turn['completion_tokens'] or 0 for turn in turns)
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            return {
+                'id': item.id,
+                'line': item.line,
+                'reply': turns[-1]['reply'],
+                'turns': turns,
+                'total_ms': round((time.perf_counter() - started) * 1000, 1),
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'attempts': attempt,
+            }
+        
+        self.counts['failed'] += 1
+        return {'id': item.id, 'line': item.line, 'error': error, 'attempts': self.retries + 1}
+    
+    async def _turn(self, brain: Brain, prompt: str) -> dict:
+        started = time.perf_counter()
+        first_text = None
+        async for _ in brain.think_stream(prompt, show_status=False):
+            if first_text is None:
+                first_text = time.perf_counter() - started
+        elapsed = time.perf_counter() - started
+        
+        stats = brain.last_stream_stats
+        if stats.get('error'):
+            raise TurnFailed(stats['error'])
+        self._turn_seconds.append(elapsed)
+        if stats.get('first_token') is not None:
+            self._first_token.append(stats['first_token'])
+        usage = stats.get('usage', {})
+        turn = {
+            'prompt': prompt,
+            # History holds the full-text cleanup of the reply
+            'reply': brain.history.messages[-1]['content'],
+            'first_token_ms': round(stats['first_token'] * 1000, 1) if stats.get('first_token') else None,
+            'first_text_ms': round((first_text or elapsed) * 1000, 1),
+            'total_ms': round(elapsed * 1000, 1),
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'endpoint': stats.get('endpoint'),
+        }
+        if stats.get('tools'):
+            turn['tools'] = stats['tools']['names']
+        return turn
+    
+    async def _report(self, total: int):
+        """Progress line every progress_interval seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            elapsed = time.perf_counter() - self._started
+            finished = self.counts['done'] + self.counts['failed']
+            console.print(
+                f"[dim]{finished:,}/{total:,} items • {self.counts['failed']} failed • "
+                f"{finished / elapsed:.1f} items/s • {self.completion_tokens / elapsed:,.0f} tokens/s[/dim]"
+            )
+    
+    def summary(self) -> dict:
+        """Counts, throughput and per-turn latency (ms) of this run."""
+        elapsed = time.perf_counter() - self._started
+        turns = sorted(self._turn_seconds)
+        first = sorted(self._first_token)
+        return {
+            **self.counts,
+            'seconds': round(elapsed, 2),
+            'items_per_second': round(self.counts['done'] / elapsed, 2) if elapsed else None,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'tokens_per_second': round(self.completion_tokens / elapsed, 1) if elapsed else None,
+            'turn_p50_ms': round(percentile(turns, 0.50) * 1000, 1) if turns else None,
+            'turn_p95_ms': round(percentile(turns, 0.95) * 1000, 1) if turns else None,
+            'first_token_p50_ms': round(percentile(first, 0.50) * 1000, 1) if first else None,
+            'first_token_p95_ms': round(percentile(first, 0.95) * 1000, 1) if first else None,
+        }
+    
+    async def close(self):
+        await self.router.close()
+        if self.tools is not None:
+            self.tools.close()
+        await self.brain.close()
+
+
+def print_summary(summary: dict):
+    line = f"[green]✓[/green] {summary['done']:,} done, {summary['failed']:,} failed"
+    if summary['skipped']:
+        line += f", {summary['skipped']:,} already done"
+    line += f" in {summary['seconds']:.1f}s"
+    if summary['done']:
+        line += (f" • {summary['items_per_second']:.1f} items/s, "
+                 f"{summary['tokens_per_second']:,.0f} tokens/s")
+    console.print(line)
+    if summary['turn_p50_ms'] is not None:
+        console.print(
+            f"[dim]Per turn: p50 {summary['turn_p50_ms']:,.0f} ms / p95 {summary['turn_p95_ms']:,.0f} ms"
+            + (f" • first token p50 {summary['first_token_p50_ms']:,.0f} ms / "
+               f"p95 {summary['first_token_p95_ms']:,.0f} ms" if summary['first_token_p50_ms'] is not None else '')
+            + "[/dim]"
+        )
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('input', help="JSONL file of prompts or scripted conversations")
+    parser.add_argument('-o', '--output', help="results JSONL (default: <input>.results.jsonl); "
+                                               "an existing file is resumed")
+    parser.add_argument('-c', '--concurrency', type=int, help="items in flight at once")
+    parser.add_argument('--retries', type=int, help="extra attempts for an item that fails")
+    parser.add_argument('--config', help="config file (default: config/jarvis.yaml)")
+
+
+async def run_batch(args) -> Optional[dict]:
+    config = load_config(args.config)
+    section = config.get('batch', {})
+    input_path = Path(args.input)
+    output = Path(args.output) if args.output else input_path.with_name(f"{input_path.stem}.results.jsonl")
+    
+    items = load_items(input_path)
+    runner = BatchRunner(
+        config,
+        concurrency=args.concurrency or section.get('concurrency', 4),
+        retries=args.retries if args.retries is not None else section.get('retries', 1),
+        progress_interval=section.get('progress_interval', 5.0)
+    )
+    try:
+        return await runner.run(items, output)
+    finally:
+        await runner.close()
+
+
+def main(args):
+    try:
+        summary = asyncio.run(run_batch(args))
+    except BatchError as e:
+        console.print(f"[red]{e}[/red]")
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        console.print("[yellow]Interrupted. Run the same command again to resume.[/yellow]")
+        raise SystemExit(130)
+    except FileNotFoundError as e:
+        console.print(f"[red]{e}[/red]")
+        raise SystemExit(1)
+    if summary is None:
+        console.print("[red]Failed to start. Is LM Studio running?[/red]")
+        raise SystemExit(1)
+    print_summary(summary)
+    if summary['failed']:
+        raise SystemExit(1)
+
+
+def cli(argv: Optional[List[str]] = None, prog: Optional[str] = None):
+    """Batch entry point (`python -m jarvis.main batch`)."""
+    parser = argparse.ArgumentParser(prog=prog, description="Run Yennefer over a JSONL file of prompts, headless")
+    add_arguments(parser)
+    main(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    cli()
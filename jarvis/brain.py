@@ -2,14 +2,31 @@
 Brain - LLM Integration Module (LM Studio)
 """
 
+import asyncio
+import importlib.util
+import json
 import os
-import re
-from typing import Any, Dict, List
+import time
+from contextlib import aclosing
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 from rich.console import Console
 from rich.panel import Panel
 
+from .memory import MESSAGE_OVERHEAD, ConversationHistory, TokenCounter
+from .prompt import PromptBuilder
+from .router import FAILOVER_ERRORS, Endpoint, EndpointError, LLMRouter, api_error
+from .scheduler import BACKGROUND, INTERACTIVE, LLMScheduler, Overloaded
+from .store import SessionStore
+from .text import ThinkingFilter, strip_thinking
+from .tools import ToolCall, ToolCallCollector, ToolRunner, parse_tool_calls
+from .trace import StartupProfile, Tracer
+
+if TYPE_CHECKING:
+    # Imported only when retrieval is enabled: it pulls in numpy
+    from .recall import RecallIndex
+
 console = Console()
 
 YENNEFER_SYSTEM_PROMPT = """You are Yennefer, an AI assistant inspired by Yennefer of Vengerberg from The Witcher.
@@ -40,99 +57,268 @@ You are a powerful advisor who happens to be an AI. Act like it.
 
 Respond as if speaking aloud. No formatting."""
 
+SUMMARY_PROMPT = """You maintain the long-term memory of a conversation between a user and Yennefer, an AI assistant.
 
-def estimate_tokens(text: str) -> int:
-    """Rough token estimate: ~4 chars per token for English."""
-    return len(text) // 4
-
+Merge the earlier summary (if any) and the new transcript into one updated summary.
+Keep names, facts about the user, decisions, commitments and open questions.
+Drop small talk. Write plain prose in the third person, at most {max_words} words.
+Output only the summary."""
 
-def strip_thinking(text: str) -> str:
-    """Remove <think>...</think> blocks from reasoning model output.
-    
-    Handles multiple edge cases:
-    - Complete <think>...</think> blocks
-    - <thinking>...</thinking> variant  
-    - Missing opening tag (strip everything before </think>)
-    - Unclosed tags (strip from <think> to end)
-    - Orphan tags
-    """
-    # Strip complete thinking blocks (standard format)
-    text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL)
-    # Strip <thinking>...</thinking> variant
-    text = re.sub(r'<thinking>.*?</thinking>', '', text, flags=re.DOTALL)
-    # Handle missing opening tag - strip everything before closing tag
-    if '</think>' in text:
-        text = text.split('</think>', 1)[-1]
-    if '</thinking>' in text:
-        text = text.split('</thinking>', 1)[-1]
-    # Handle unclosed tags (model cut off mid-thought)
-    if '<think>' in text:
-        text = text.split('<think>', 1)[0]
-    if '<thinking>' in text:
-        text = text.split('<thinking>', 1)[0]
-    # Clean up any orphan tags
-    text = re.sub(r'</?think(?:ing)?>', '', text)
-    return text.strip()
+# Said instead of a reply when the LLM scheduler turns the request away
+BUSY_REPLY = "I'm rather occupied at the moment. Ask me again in a few seconds."
 
 
 class Brain:
     """LM Studio powered reasoning engine for Yennefer."""
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, tracer: Optional[Tracer] = None,
+                 client: Optional[httpx.AsyncClient] = None,
+                 scheduler: Optional[LLMScheduler] = None, session: str = 'default',
+                 router: Optional[LLMRouter] = None, tools: Optional[ToolRunner] = None):
         self.config = config.get('llm', {})
-        self.api_base = self.config.get('api_base', 'http://localhost:1234/v1')
+        self.tracer = tracer or Tracer()
+        # Endpoints to send requests to (llm.endpoints, or just api_base);
+        # model is the one the preferred endpoint serves, for display
+        self.router = router or LLMRouter.from_config(config)
+        self._owns_router = router is None
         self.model = self.config.get('model', 'auto')
         self.max_tokens = self.config.get('max_tokens', 2048)
         self.temperature = self.config.get('temperature', 0.7)
         self.context_limit = self.config.get('context_limit', 32000)
+        self.stream_starts_in_think = self.config.get('stream_starts_in_think', False)
+        
+        # HTTP connection settings (one pooled client for the whole session)
+        self.connect_timeout = self.config.get('connect_timeout', 5.0)
+        self.read_timeout = self.config.get('read_timeout', 120.0)
+        self.max_connections = self.config.get('max_connections', 4)
+        self.max_keepalive_connections = self.config.get('max_keepalive_connections', 2)
+        self.keepalive_expiry = self.config.get('keepalive_expiry', 60.0)
+        self.http2 = self.config.get('http2', False)
+        # A client passed in is shared (server sessions) and closed by its owner
+        self.client: Optional[httpx.AsyncClient] = client
+        self._owns_client = client is None
+        
+        # Every request waits for a slot; the server shares one scheduler
+        # between sessions, keyed by session for fair ordering
+        self.scheduler = scheduler or LLMScheduler.from_config(config)
+        self.session = session
+        # None raises Overloaded to the caller instead of answering with it
+        self.busy_reply: Optional[str] = BUSY_REPLY
         
-        self.conversation_history: List[Dict[str, str]] = []
+        # Tool plugins offered to the model (tools:), None when off; shared
+        # by server sessions like the scheduler
+        self.tools = tools if tools is not None else ToolRunner.from_config(config)
+        self._owns_tools = tools is None
+        
+        # Trim when usage passes trim_threshold, down to trim_target (fractions of context)
+        self.trim_threshold = self.config.get('trim_threshold', 0.85)
+        self.trim_target = self.config.get('trim_target', 0.70)
+        
+        self.token_counter = TokenCounter(self.config.get('tokenizer'))
+        self.history = ConversationHistory(self.token_counter)
         self.total_tokens_used = 0
-        self.system_tokens = estimate_tokens(YENNEFER_SYSTEM_PROMPT)
+        self.system_tokens = self.token_counter.count(YENNEFER_SYSTEM_PROMPT) + MESSAGE_OVERHEAD
+        self.prompt_builder = PromptBuilder(YENNEFER_SYSTEM_PROMPT, self.token_counter)
+        self._turn_state = 'idle'  # 'open': user message added; 'answered': reply committed
         
-    async def initialize(self):
-        """Initialize LM Studio connection."""
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.api_base}/models", timeout=5.0)
-                
-                if response.status_code == 200:
-                    models = response.json().get('data', [])
-                    if models:
-                        if self.model == 'auto':
-                            self.model = models[0].get('id', 'local-model')
-                    console.print(f"[green]✓[/green] LM Studio connected ({self.model})")
-                    console.print(f"[dim]Context: {self.context_limit:,} tokens available[/dim]")
-                    return True
-                else:
-                    console.print(f"[red]✗[/red] LM Studio not responding")
-                    return False
-                    
-        except httpx.ConnectError:
-            console.print(f"[red]✗[/red] Cannot connect to LM Studio at {self.api_base}")
+        # Compaction: fold old exchanges into a rolling summary during idle time
+        compaction = self.config.get('compaction', {})
+        self.compaction_enabled = compaction.get('enabled', True)
+        self.compaction_threshold = compaction.get('threshold', 0.60)
+        self.compaction_keep_recent = compaction.get('keep_recent', 6)
+        self.summary_max_words = compaction.get('summary_max_words', 250)
+        self._compaction_task: Optional[asyncio.Task] = None
+        self.compaction_stats = {'runs': 0, 'tokens_saved': 0, 'seconds': 0.0}
+        
+        # Timing of the last streamed response (seconds from request sent),
+        # its token usage summed over requests, or why it was turned away
+        # ('overloaded') or failed ('error')
+        self.last_stream_stats: Dict[str, Any] = {}
+        
+        # Persistent memory: history is logged to SQLite and restored on start
+        memory = config.get('memory', {})
+        self.store: Optional[SessionStore] = None
+        if memory.get('enabled', True):
+            self.store = SessionStore(
+                memory.get('path') or None,
+                flush_interval=memory.get('flush_interval', 0.5)
+            )
+        
+        # Retrieval memory: the prompt carries only a recent window; older
+        # exchanges are indexed as they leave it and the most relevant few
+        # are recalled into each turn
+        retrieval = memory.get('retrieval', {})
+        self.recall: Optional['RecallIndex'] = None
+        self.recall_window = retrieval.get('window', 12)
+        self.recall_top_k = retrieval.get('top_k', 3)
+        self.recall_min_score = retrieval.get('min_score', 0.2)
+        self.recall_snippet_chars = retrieval.get('snippet_chars', 600)
+        self._recall_tasks: set = set()
+        if retrieval.get('enabled', False):
+            from . import recall
+            
+            embedder = recall.create_embedder(retrieval.get('embedder', 'hashing'), retrieval.get('dim', 1024))
+            # Kept next to the conversation log, or in memory when that is off
+            directory = (retrieval.get('path') or recall.DEFAULT_RECALL_DIR) if self.store else None
+            self.recall = recall.RecallIndex(embedder, directory)
+        
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, creating it on first use."""
+        if self.client is None or self.client.is_closed:
+            http2 = self.http2
+            if http2:
+                if importlib.util.find_spec('h2') is None:
+                    console.print("[yellow]HTTP/2 needs the h2 package, using HTTP/1.1[/yellow]")
+                    console.print("[dim]Run: pip install httpx\\[http2][/dim]")
+                    http2 = self.http2 = False
+            
+            self._owns_client = True
+            self.client = httpx.AsyncClient(
+                http2=http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry
+                ),
+                timeout=httpx.Timeout(
+                    self.read_timeout,
+                    connect=self.connect_timeout
+                )
+            )
+        return self.client
+    
+    async def initialize(self, startup: Optional[StartupProfile] = None):
+        """Initialize LM Studio connection.
+        
+        Restoring memory, opening the retrieval index and reaching LM Studio
+        don't depend on each other, so they run at the same time.
+        """
+        startup = startup or StartupProfile()
+        _, _, connected = await asyncio.gather(
+            startup.timed('brain: memory restore', self._restore_memory()),
+            startup.timed('brain: retrieval index', self._open_recall()),
+            startup.timed('brain: LM Studio', self._connect())
+        )
+        return connected
+    
+    async def _connect(self) -> bool:
+        """Check the LLM endpoints are up and pick the model."""
+        # Creating the client loads the CA bundle (~100 ms), so not on the loop
+        client = await asyncio.get_running_loop().run_in_executor(None, self._get_client)
+        endpoints = self.router.endpoints
+        if not await self.router.start(client):
+            for endpoint in endpoints:
+                console.print(f"[red]✗[/red] Cannot reach LM Studio at {endpoint.api_base} ({endpoint.error})")
             console.print("[dim]Make sure LM Studio is running with a model loaded[/dim]")
             return False
+        
+        self.model = self.router.primary.model
+        if len(endpoints) == 1:
+            console.print(f"[green]✓[/green] LM Studio connected ({self.model})")
+        else:
+            up = [endpoint for endpoint in endpoints if endpoint.healthy]
+            console.print(
+                f"[green]✓[/green] {len(up)}/{len(endpoints)} LLM endpoints up ("
+                + ", ".join(f"{endpoint.name}: {endpoint.model}" for endpoint in up) + ")"
+            )
+            for endpoint in endpoints:
+                if not endpoint.healthy:
+                    console.print(f"[yellow]✗ {endpoint.name}: {endpoint.error}[/yellow]")
+        console.print(f"[dim]Context: {self.context_limit:,} tokens available[/dim]")
+        return True
+    
+    async def _restore_memory(self):
+        """Open the memory store and reload the tail of the last conversation."""
+        if self.store is None or self.history.store is not None:
+            return
+        # Same budget trimming aims for, so a restored history never trims at once
+        budget = int(self.context_limit * self.trim_target) - self.system_tokens
+        loop = asyncio.get_running_loop()
+        
+        def load():
+            self.store.open(self.token_counter.spec)
+            return self.store.load(budget, self.token_counter)
+        
+        try:
+            restored = await loop.run_in_executor(None, load)
         except Exception as e:
-            console.print(f"[red]✗[/red] LM Studio error: {e}")
-            return False
+            console.print(f"[yellow]Memory store unavailable: {e}[/yellow]")
+            self.store = None
+            return
+        
+        self.history.restore(restored['messages'], restored['summary'], restored['summary_tokens'])
+        self.history.store = self.store
+        if restored['messages'] or restored['summary']:
+            console.print(
+                f"[green]✓[/green] Memory restored ({len(restored['messages'])} messages"
+                f"{' + summary' if restored['summary'] else ''}, "
+                f"{self.store.stats['load_ms']:.0f} ms)"
+            )
     
-    def _calculate_tokens(self) -> Dict[str, int]:
-        """Calculate current token usage."""
-        user_tokens = sum(
-            estimate_tokens(msg['content']) 
-            for msg in self.conversation_history 
-            if msg['role'] == 'user'
-        )
-        assistant_tokens = sum(
-            estimate_tokens(msg['content']) 
-            for msg in self.conversation_history 
-            if msg['role'] == 'assistant'
+    async def _open_recall(self):
+        """Open (or create) the retrieval index."""
+        if self.recall is None or self.recall.capacity:
+            return
+        try:
+            await self.recall.run(self.recall.open)
+        except Exception as e:
+            console.print(f"[yellow]Retrieval index unavailable: {e}[/yellow]")
+            self.recall = None
+            return
+        console.print(
+            f"[green]✓[/green] Retrieval memory ready ({self.recall.count:,} exchanges, "
+            f"{self.recall.embedder.spec})"
         )
+    
+    async def _recall_context(self, user_input: str) -> str:
+        """Earlier exchanges relevant to user_input, formatted for the prompt."""
+        if self.recall is None or not self.recall.count:
+            return ''
+        try:
+            hits = await self.recall.recall(user_input, self.recall_top_k, self.recall_min_score)
+        except Exception as e:
+            console.print(f"[yellow]Recall failed: {e}[/yellow]")
+            return ''
+        return "\n\n".join(snippet for _, snippet in hits)
+    
+    def _remember(self, evicted: List[Dict[str, str]]):
+        """Index exchanges that just left the prompt, in the background."""
+        if self.recall is None:
+            return
+        snippets = []
+        for msg in evicted:
+            speaker = 'User' if msg['role'] == 'user' else 'Yennefer'
+            line = f"{speaker}: {msg['content']}"
+            if msg['role'] == 'user' or not snippets:
+                snippets.append(line)
+            else:
+                snippets[-1] += "\n" + line
+        snippets = [
+            text if len(text) <= self.recall_snippet_chars
+            else text[:self.recall_snippet_chars].rsplit(' ', 1)[0] + '…'
+            for text in snippets
+        ]
+        task = asyncio.ensure_future(self.recall.remember(snippets))
+        self._recall_tasks.add(task)
+        task.add_done_callback(self._recall_tasks.discard)
+    
+    @property
+    def conversation_history(self) -> List[Dict[str, str]]:
+        """Conversation messages in API format (read-only snapshot)."""
+        return self.history.messages
+    
+    def _calculate_tokens(self) -> Dict[str, int]:
+        """Calculate current token usage from the running totals."""
+        system_tokens = self.token_counter.scaled(self.system_tokens)
+        summary_tokens = self.history.summary_tokens()
+        user_tokens = self.history.role_tokens('user')
+        assistant_tokens = self.history.role_tokens('assistant')
         
-        total = self.system_tokens + user_tokens + assistant_tokens
+        total = system_tokens + self.history.total()
         
         return {
-            'system': self.system_tokens,
+            'system': system_tokens,
+            'summary': summary_tokens,
             'user': user_tokens,
             'assistant': assistant_tokens,
             'total': total,
@@ -157,102 +343,595 @@ class Brain:
         else:
             color = "red"
         
-        # Estimate remaining conversation time
-        if len(self.conversation_history) > 0:
-            tokens_per_exchange = stats['total'] / (len(self.conversation_history) / 2)
+        # Estimate what is left from measured tokens and time per exchange
+        remaining = ""
+        if len(self.history) > 1:
+            tokens_per_exchange = stats['total'] / (len(self.history) / 2)
             remaining_exchanges = stats['remaining'] / max(tokens_per_exchange, 1)
-            remaining_minutes = (remaining_exchanges * 0.5)  # ~30 sec per exchange avg
-            time_str = f"~{int(remaining_minutes)} min"
-        else:
-            time_str = "~160 min"
+            pace = self.tracer.seconds_per_exchange()
+            if pace is not None:
+                remaining = f" • ~{int(remaining_exchanges * pace / 60)} min remaining"
+            else:
+                remaining = f" • ~{int(remaining_exchanges)} exchanges remaining"
         
         console.print(
             f"[dim]Tokens:[/dim] [{color}]{bar}[/{color}] "
-            f"[dim]{stats['total']:,}/{self.context_limit:,} ({stats['percent_used']:.1f}%) • {time_str} remaining[/dim]"
+            f"[dim]{stats['total']:,}/{self.context_limit:,} ({stats['percent_used']:.1f}%){remaining}[/dim]"
         )
     
+    def _build_messages(self, context: str = '') -> List[Dict[str, str]]:
+        """Assemble the request messages for the current history.
+        
+        The prompt is append-only between checkpoints (trim, compaction,
+        clear) so the server can reuse its KV cache for the prefix.
+        """
+        return self.prompt_builder.build(self.history, context)
+    
+    def _commit_response(self, text: str, usage: Optional[Dict[str, Any]] = None,
+                         show_status: bool = True):
+        """Record a cleaned assistant reply and trim history if needed."""
+        # Get actual token usage if API provides it
+        if usage:
+            self.total_tokens_used = usage.get('total_tokens', 0)
+            # Prompt tokens are exact - pull our estimates towards them
+            if usage.get('prompt_tokens'):
+                self.token_counter.calibrate(self.prompt_builder.prompt_estimate, usage['prompt_tokens'])
+        
+        # Add CLEANED response to history (no thinking tokens wasting context)
+        self.history.append('assistant', text)
+        self._turn_state = 'answered'
+        
+        # Trim history if approaching limit
+        stats = self._calculate_tokens()
+        if stats['percent_used'] > self.trim_threshold * 100:
+            budget = int(self.context_limit * self.trim_target) - stats['system']
+            before = self.history.messages
+            removed = self.history.trim_to(budget)
+            if removed:
+                self._remember(before[:removed])
+                self.prompt_builder.checkpoint('trim')
+                console.print(f"[yellow]⚠ Trimmed {removed} old messages to free memory[/yellow]")
+        elif self.recall is not None and len(self.history) > 2 * self.recall_window:
+            # Shrink back to the window in one step, so the prefix is rewritten
+            # once every window/2 exchanges rather than every turn
+            before = self.history.messages
+            removed = self.history.trim_to(0, keep_last=self.recall_window)
+            if removed:
+                self._remember(before[:removed])
+                self.prompt_builder.checkpoint('window')
+        
+        # Show token status
+        if show_status:
+            self.print_turn_status()
+    
     async def think(self, user_input: str) -> Dict[str, Any]:
         """Process user input and generate response."""
         
-        self.conversation_history.append({
-            'role': 'user',
-            'content': user_input
-        })
+        self.history.append('user', user_input)
+        self._turn_state = 'open'
+        self.last_stream_stats = {}
         
         try:
-            messages = [
-                {'role': 'system', 'content': YENNEFER_SYSTEM_PROMPT}
-            ] + self.conversation_history
+            messages = self._build_messages(await self._recall_context(user_input))
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.api_base}/chat/completions",
-                    json={
-                        'model': self.model,
-                        'messages': messages,
-                        'max_tokens': self.max_tokens,
-                        'temperature': self.temperature,
-                        'stream': False
-                    },
-                    timeout=120.0
-                )
-                
-                if response.status_code != 200:
-                    raise Exception(f"API error: {response.text}")
-                
-                data = response.json()
-                raw_text = data['choices'][0]['message']['content']
-                
-                # Strip thinking tags from reasoning models (Nemotron, Qwen3, DeepSeek-R1, etc.)
-                text = strip_thinking(raw_text)
-                
-                # Get actual token usage if API provides it
-                usage = data.get('usage', {})
-                if usage:
-                    self.total_tokens_used = usage.get('total_tokens', 0)
-                
-                # Add CLEANED response to history (no thinking tokens wasting context)
-                self.conversation_history.append({
-                    'role': 'assistant',
-                    'content': text
-                })
-                
-                # Trim history if approaching limit
-                stats = self._calculate_tokens()
-                if stats['percent_used'] > 85:
-                    # Remove oldest 20% of conversation
-                    trim_count = len(self.conversation_history) // 5
-                    self.conversation_history = self.conversation_history[trim_count:]
-                    console.print("[yellow]⚠ Trimmed old conversation to free memory[/yellow]")
-                
-                # Show token status
-                self._print_token_status()
-                
-                return {'text': text}
-                
+            first: Optional[Dict[str, Any]] = None
+            for tools_allowed in self._rounds():
+                async with self.scheduler.slot(self.session, INTERACTIVE):
+                    self.tracer.mark('llm_request')
+                    data = await self._complete(self._payload(messages, False, tools_allowed))
+                self.last_stream_stats['endpoint'] = data['endpoint']
+                first = first or data
+                self._add_usage(data.get('usage'))
+                message = data['choices'][0]['message']
+                calls = parse_tool_calls(message) if tools_allowed else []
+                if not calls:
+                    break
+                messages = messages + await self._run_tools(calls, message.get('content') or '')
+            
+            self.tracer.mark('first_token')
+            self.tracer.mark('last_token')
+            raw_text = message.get('content') or ''
+            
+            # Strip thinking tags from reasoning models (Nemotron, Qwen3, DeepSeek-R1, etc.)
+            text = strip_thinking(raw_text)
+            
+            # Usage of the first request: later ones also carry tool results
+            self.prompt_builder.record_timing(None, first.get('usage'), first.get('timings'))
+            self._commit_response(text, first.get('usage', {}))
+            
+            return {'text': text}
+            
+        except Overloaded as e:
+            return {'text': self._overloaded(e)}
         except Exception as e:
             console.print(f"[red]LLM error: {e}[/red]")
             return {
                 'text': "Something went wrong. Try again, and do be more careful this time."
             }
     
+    def _rounds(self) -> List[bool]:
+        """Whether each possible request of a turn may call tools.
+        
+        With tools, max_rounds requests may call them and one more must
+        answer. Tools stay listed in that last one (tool_choice none) so
+        the prompt prefix, and the server's cache of it, stays the same.
+        """
+        if self.tools is None:
+            return [False]
+        return [True] * self.tools.max_rounds + [False]
+    
+    def _payload(self, messages: List[Dict[str, Any]], stream: bool, tools_allowed: bool) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            'messages': messages,
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'stream': stream
+        }
+        if stream:
+            payload['stream_options'] = {'include_usage': True}
+        if self.tools is not None:
+            payload['tools'] = self.tools.definitions()
+            payload['tool_choice'] = 'auto' if tools_allowed else 'none'
+        return payload
+    
+    async def _run_tools(self, calls: List[ToolCall], content: str) -> List[Dict[str, Any]]:
+        """Run one reply's tool calls concurrently; returns the messages for the follow-up.
+        
+        Tool messages only live for the turn: history keeps the final reply.
+        """
+        self.tracer.mark('tools_start')
+        started = time.perf_counter()
+        follow_up = await self.tools.run(calls, content)
+        self.tracer.mark('tools_end')
+        used = self.last_stream_stats.setdefault('tools', {'names': [], 'seconds': 0.0})
+        used['names'] += [call.name for call in calls]
+        used['seconds'] += time.perf_counter() - started
+        return follow_up
+    
+    async def _complete(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Whole chat completion, shaped like a non-streamed response.
+        
+        It is streamed underneath and collected, so think() and compaction
+        get the same stall detection, failover and endpoint timing as
+        think_stream. The endpoint's name is added as 'endpoint'.
+        """
+        payload = {**payload, 'stream': True, 'stream_options': {'include_usage': True}}
+        error: Exception = EndpointError("no LLM endpoint configured")
+        for endpoint in self.router.candidates():
+            started = time.perf_counter()
+            first_token = None
+            parts: List[str] = []
+            meta: Dict[str, Any] = {}
+            try:
+                with self.router.request(endpoint):
+                    async with aclosing(self._stream_deltas(endpoint, payload, meta)) as deltas:
+                        async for delta in deltas:
+                            if first_token is None:
+                                first_token = time.perf_counter() - started
+                            parts.append(delta)
+            except FAILOVER_ERRORS as e:
+                self.router.failed(endpoint, e)
+                error = e
+                continue
+            
+            self._record_endpoint(endpoint, started, first_token, meta, len(parts))
+            message: Dict[str, Any] = {'role': 'assistant', 'content': ''.join(parts)}
+            if meta.get('tool_calls'):
+                message['tool_calls'] = [call.message() for call in meta['tool_calls'].calls()]
+            return {
+                'choices': [{'message': message}],
+                'usage': meta.get('usage', {}),
+                'timings': meta.get('timings', {}),
+                'endpoint': endpoint.name
+            }
+        raise error
+    
+    def _record_endpoint(self, endpoint: Endpoint, started: float, first_token: Optional[float],
+                         meta: Dict[str, Any], chunks: int):
+        """Add a finished request's time to first token and speed to the endpoint's stats."""
+        if first_token is not None:
+            tokens = meta.get('usage', {}).get('completion_tokens') or chunks
+            self.router.record(endpoint, first_token, tokens, time.perf_counter() - started - first_token)
+    
+    async def _stream_deltas(self, endpoint: Endpoint, payload: Dict[str, Any],
+                             meta: Dict[str, Any]) -> AsyncIterator[str]:
+        """Content deltas of one streamed completion; usage, timings and tool calls go into meta."""
+        async with self._get_client().stream(
+            'POST',
+            f"{endpoint.api_base}/chat/completions",
+            json={'model': endpoint.model, **payload},
+            timeout=self.router.stream_timeout(self.connect_timeout, self.read_timeout)
+        ) as response:
+            if response.status_code != 200:
+                body = await response.aread()
+                raise api_error(response.status_code, body.decode(errors='replace'))
+            
+            async for line in self.router.watch(response.aiter_lines()):
+                if not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                
+                data = json.loads(data)
+                if data.get('usage'):
+                    meta['usage'] = data['usage']
+                if data.get('timings'):
+                    # llama.cpp reports prefill/cache stats in the final chunk
+                    meta['timings'] = data['timings']
+                choices = data.get('choices') or []
+                if not choices:
+                    continue
+                delta = choices[0].get('delta') or {}
+                if delta.get('tool_calls'):
+                    meta.setdefault('tool_calls', ToolCallCollector()).feed(delta['tool_calls'])
+                if delta.get('content'):
+                    yield delta['content']
+    
+    async def think_stream(self, user_input: str, show_status: bool = True) -> AsyncIterator[str]:
+        """Stream the visible part of the response as it is generated.
+        
+        Yields text chunks with thinking blocks already filtered out. The
+        full cleaned reply is added to history once the stream ends, and
+        time-to-first-visible-token is kept in last_stream_stats. Pass
+        show_status=False when the caller is still printing the reply and
+        call print_turn_status() afterwards.
+        
+        An endpoint that fails or stalls before any visible text is replaced
+        by the next one; after that the reply ends where it was cut off.
+        
+        With tools, a reply that calls them is followed by one request with
+        all of their results (see _run_tools); text said before the calls
+        is kept and the follow-up's text continues it.
+        """
+        self.history.append('user', user_input)
+        self._turn_state = 'open'
+        
+        raw_parts: List[str] = []
+        earlier: List[str] = []  # raw text of rounds that ended in tool calls
+        meta: Dict[str, Any] = {}
+        first_meta: Dict[str, Any] = {}
+        emitted = False
+        started = time.perf_counter()
+        first_token = None
+        self.last_stream_stats = {'first_token': None, 'first_visible': None, 'total': None}
+        
+        try:
+            messages = self._build_messages(await self._recall_context(user_input))
+            for round_number, tools_allowed in enumerate(self._rounds()):
+                payload = self._payload(messages, True, tools_allowed)
+                error: Exception = EndpointError("no LLM endpoint configured")
+                async with self.scheduler.slot(self.session, INTERACTIVE):
+                    for endpoint in self.router.candidates():
+                        if round_number == 0:
+                            # Timings count from the request, not from the queue
+                            started = time.perf_counter()
+                            first_token = None
+                        round_started = time.perf_counter()
+                        round_first_token = None
+                        raw_parts, meta = [], {}
+                        thinking_filter = ThinkingFilter(in_think=self.stream_starts_in_think)
+                        self.tracer.mark('llm_request')
+                        try:
+                            with self.router.request(endpoint):
+                                async with aclosing(self._stream_deltas(endpoint, payload, meta)) as deltas:
+                                    async for delta in deltas:
+                                        if round_first_token is None:
+                                            round_first_token = time.perf_counter() - round_started
+                                        if first_token is None:
+                                            self.tracer.mark('first_token')
+                                            first_token = time.perf_counter() - started
+                                            self.last_stream_stats['first_token'] = first_token
+                                        raw_parts.append(delta)
+                                        
+                                        visible = thinking_filter.feed(delta)
+                                        if visible:
+                                            if not emitted:
+                                                self.last_stream_stats['first_visible'] = time.perf_counter() - started
+                                                emitted = True
+                                            yield visible
+                        except FAILOVER_ERRORS as e:
+                            self.router.failed(endpoint, e)
+                            error = e
+                            if emitted:
+                                # Already spoken: keep what was said rather than start over elsewhere
+                                console.print(f"[yellow]Reply cut off: {endpoint.error}[/yellow]")
+                                self.last_stream_stats['total'] = time.perf_counter() - started
+                                self.last_stream_stats['error'] = f"cut off: {endpoint.error}"
+                                self._commit_response(strip_thinking(''.join(earlier + raw_parts)), show_status=False)
+                                return
+                            continue
+                        
+                        self._record_endpoint(endpoint, round_started, round_first_token, meta, len(raw_parts))
+                        self.last_stream_stats['endpoint'] = endpoint.name
+                        break
+                    else:
+                        raise error
+                
+                tail = thinking_filter.flush()
+                if tail:
+                    if not emitted:
+                        self.last_stream_stats['first_visible'] = time.perf_counter() - started
+                        emitted = True
+                    yield tail
+                
+                first_meta = first_meta or meta
+                self._add_usage(meta.get('usage'))
+                collector = meta.get('tool_calls')
+                if not tools_allowed or not collector:
+                    break
+                # Whatever was said before the calls stays part of the reply
+                earlier += raw_parts
+                messages = messages + await self._run_tools(collector.calls(), strip_thinking(''.join(raw_parts)))
+            
+            self.tracer.mark('last_token')
+            self.last_stream_stats['total'] = time.perf_counter() - started
+            
+            # Usage of the first request: later ones also carry tool results
+            usage = first_meta.get('usage', {})
+            self.prompt_builder.record_timing(first_token, usage, first_meta.get('timings', {}))
+            
+            # History gets the authoritative full-text cleanup, same as think()
+            self._commit_response(strip_thinking(''.join(earlier + raw_parts)), usage, show_status=False)
+            if show_status:
+                self.print_turn_status()
+            
+        except Overloaded as e:
+            yield self._overloaded(e)
+        except Exception as e:
+            console.print(f"[red]LLM error: {e}[/red]")
+            self.last_stream_stats['error'] = f"{type(e).__name__}: {e}"
+            if not emitted:
+                yield "Something went wrong. Try again, and do be more careful this time."
+    
+    def _add_usage(self, usage: Optional[Dict[str, Any]]):
+        """Add one request's token usage to the turn's total in last_stream_stats."""
+        if not usage:
+            return
+        total = self.last_stream_stats.setdefault('usage', {'prompt_tokens': 0, 'completion_tokens': 0})
+        total['prompt_tokens'] += usage.get('prompt_tokens') or 0
+        total['completion_tokens'] += usage.get('completion_tokens') or 0
+    
+    def _overloaded(self, error: Overloaded) -> str:
+        """Drop a turn that got no LLM slot; returns the line to say instead."""
+        self.commit_interrupted('')
+        self.last_stream_stats['overloaded'] = error.reason
+        console.print(f"[yellow]LLM busy: {error}[/yellow]")
+        if self.busy_reply is None:
+            raise error
+        return self.busy_reply
+    
+    def print_turn_status(self):
+        """Display token usage, prompt cache reuse and timing for the last reply."""
+        self._print_token_status()
+        self._print_prefix_status()
+        stats = self.last_stream_stats
+        if stats.get('first_visible') is None:
+            return
+        line = (
+            f"[dim]First token: {stats['first_token']:.2f}s • "
+            f"first visible: {stats['first_visible']:.2f}s • "
+            f"total: {stats['total']:.2f}s"
+        )
+        if len(self.router.endpoints) > 1 and stats.get('endpoint'):
+            line += f" • endpoint: {stats['endpoint']}"
+        if stats.get('tools'):
+            line += f" • tools: {', '.join(stats['tools']['names'])} ({stats['tools']['seconds']:.2f}s)"
+        console.print(line + "[/dim]")
+    
+    def commit_interrupted(self, spoken: str):
+        """Rewrite the latest turn after an interrupt to what the user heard.
+        
+        The reply may still be generating (nothing committed yet) or already
+        committed in full while playback was running. If nothing was spoken
+        the user message is dropped too, so the model never sees a question
+        it supposedly answered.
+        """
+        spoken = spoken.strip()
+        if self._turn_state == 'answered':
+            self.history.pop_latest()
+        elif self._turn_state != 'open':
+            return
+        
+        if spoken:
+            self._commit_response(spoken, show_status=False)
+        else:
+            self.history.pop_latest()
+            self.prompt_builder.checkpoint('interrupt')
+        self._turn_state = 'idle'
+    
+    def _print_prefix_status(self):
+        """Display how much of the last prompt was a reused prefix."""
+        turn = self.prompt_builder.last_turn
+        if not turn:
+            return
+        line = f"[dim]Prefix: {turn['prefix_tokens']:,} reused / {turn['new_tokens']:,} new"
+        if turn['cached_tokens'] is not None:
+            line += f" • server cache: {turn['cached_tokens']:,}"
+        if turn['prefill_seconds'] is not None:
+            line += f" • prefill: {turn['prefill_seconds']:.2f}s"
+        if turn.get('recalled_tokens'):
+            line += f" • recalled: {turn['recalled_tokens']:,}"
+        if turn['checkpoint']:
+            line += f" • checkpoint: {turn['checkpoint']}"
+        console.print(line + "[/dim]")
+    
+    def schedule_compaction(self):
+        """Start a background compaction if usage has passed the threshold.
+        
+        Call during idle time (after playback) so summarization never sits on
+        the critical path of a turn.
+        """
+        if not self.compaction_enabled:
+            return
+        if self._compaction_task is not None and not self._compaction_task.done():
+            return
+        if self._calculate_tokens()['percent_used'] < self.compaction_threshold * 100:
+            return
+        self._compaction_task = asyncio.create_task(self.compact())
+    
+    async def compact(self) -> bool:
+        """Fold everything except the most recent messages into the summary."""
+        fold_count = len(self.history) - self.compaction_keep_recent
+        # Keep the recent window starting on a user turn
+        while fold_count > 0 and self.history.oldest(fold_count + 1)[-1]['role'] != 'user':
+            fold_count -= 1
+        if fold_count <= 0:
+            return False
+        
+        folded = self.history.oldest(fold_count)
+        before = self.history.total()
+        started = time.perf_counter()
+        
+        transcript = "\n".join(
+            f"{'User' if msg['role'] == 'user' else 'Yennefer'}: {msg['content']}"
+            for msg in folded
+        )
+        if self.history.summary:
+            transcript = f"Earlier summary:\n{self.history.summary}\n\nNew transcript:\n{transcript}"
+        
+        try:
+            # Background priority: waits behind turns and is cancelled if one needs the slot
+            async with self.scheduler.slot(self.session, BACKGROUND):
+                data = await self._complete({
+                    'messages': [
+                        {'role': 'system', 'content': SUMMARY_PROMPT.format(max_words=self.summary_max_words)},
+                        {'role': 'user', 'content': transcript}
+                    ],
+                    'max_tokens': self.max_tokens,
+                    'temperature': 0.2,
+                    'stream': False
+                })
+            summary = strip_thinking(data['choices'][0]['message']['content'])
+        except asyncio.CancelledError:
+            raise
+        except Overloaded as e:
+            console.print(f"[dim]Compaction skipped: {e}[/dim]")
+            return False
+        except Exception as e:
+            console.print(f"[yellow]Compaction failed: {e}[/yellow]")
+            return False
+        
+        if not summary or not self.history.compact(folded, summary):
+            return False
+        self._remember(folded)
+        self.prompt_builder.checkpoint('compaction')
+        
+        elapsed = time.perf_counter() - started
+        saved = before - self.history.total()
+        self.compaction_stats['runs'] += 1
+        self.compaction_stats['tokens_saved'] += saved
+        self.compaction_stats['seconds'] += elapsed
+        console.print(
+            f"[dim]Compacted {fold_count} messages into summary "
+            f"({saved:,} tokens saved, {elapsed:.1f}s)[/dim]"
+        )
+        return True
+    
+    async def close(self):
+        """Close the pooled HTTP client."""
+        if self._compaction_task is not None and not self._compaction_task.done():
+            self._compaction_task.cancel()
+        if self._owns_router:
+            await self.router.close()
+        if self._owns_tools and self.tools is not None:
+            self.tools.close()
+        if self._owns_client and self.client is not None and not self.client.is_closed:
+            await self.client.aclose()
+        self.client = None
+        if self.store is not None:
+            # Flushes queued writes
+            await asyncio.get_running_loop().run_in_executor(None, self.store.close)
+        if self.recall is not None:
+            # Waits for exchanges still being indexed
+            await asyncio.get_running_loop().run_in_executor(None, self.recall.close)
+    
+    def _store_status(self) -> str:
+        """Persistent memory line for the status panel."""
+        if self.store is None or self.history.store is None:
+            return "\n[cyan]Persistent memory:[/cyan] off"
+        stats = self.store.stats
+        return (
+            f"\n[cyan]Persistent memory:[/cyan] {stats['stored']:,} messages stored, "
+            f"{stats['restored']} restored in {stats['load_ms']:.0f} ms\n"
+            f"  Writes: {stats['writes']:,} in {stats['commits']:,} commits, "
+            f"{self.store.pending} pending"
+        )
+    
+    def _recall_status(self) -> str:
+        """Retrieval memory line for the status panel."""
+        if self.recall is None:
+            return "\n[cyan]Retrieval memory:[/cyan] off"
+        p50, p95 = self.recall.query_percentiles()
+        recalled = self.prompt_builder.last_turn.get('recalled_tokens', 0)
+        return (
+            f"\n[cyan]Retrieval memory:[/cyan] {self.recall.count:,} exchanges "
+            f"({self.recall.nbytes / 1024:,.0f} KB, {self.recall.embedder.spec}), "
+            f"window {self.recall_window} messages\n"
+            f"  Indexing: {self.recall.build_seconds:.2f}s total • "
+            f"query p50 {p50:.1f} ms / p95 {p95:.1f} ms • last turn recalled {recalled:,} tokens"
+        )
+    
+    def _scheduler_status(self) -> str:
+        """LLM scheduler line for the status panel."""
+        stats = self.scheduler.stats()
+        wait = stats['wait']['interactive']
+        waits = (f"wait p50 {wait['p50_ms']:.0f} ms / p95 {wait['p95_ms']:.0f} ms"
+                 if wait['p50_ms'] is not None else "no requests yet")
+        return (
+            f"\n[cyan]LLM scheduler:[/cyan] {stats['active']}/{stats['max_concurrent']} active, "
+            f"{stats['queued']} queued • {waits}\n"
+            f"  Admitted {stats['admitted']:,} • rejected {stats['rejected']} • shed {stats['shed']} "
+            f"• timed out {stats['timeout']} • preempted {stats['preempted']}"
+        )
+    
+    def _router_status(self) -> str:
+        """One line per LLM endpoint for the status panel."""
+        lines = [f"\n[cyan]LLM endpoints:[/cyan] {self.router.failovers} failovers"]
+        for endpoint in self.router.endpoints:
+            state = "[green]✓[/green]" if endpoint.available else "[red]✗[/red]"
+            problem = "" if endpoint.available else f" • {endpoint.error or 'benched'}"
+            ttft = f"TTFT {endpoint.ttft * 1000:.0f} ms" if endpoint.ttft is not None else "TTFT -"
+            tps = f"{endpoint.tokens_per_second:.0f} tok/s" if endpoint.tokens_per_second is not None else "- tok/s"
+            lines.append(
+                f"  {state} {endpoint.name} ({endpoint.model}){problem} • {ttft} • {tps} • "
+                f"{endpoint.requests:,} requests, {endpoint.failures} failed"
+            )
+        return "\n".join(lines)
+    
     def clear_history(self):
         """Clear conversation history."""
-        self.conversation_history = []
+        if self._compaction_task is not None and not self._compaction_task.done():
+            self._compaction_task.cancel()
+        self.history.clear()
+        self._turn_state = 'idle'
+        self.prompt_builder.checkpoint('clear')
         console.print("[dim]Conversation history cleared[/dim]")
         self._print_token_status()
     
     def status(self):
         """Print detailed token status."""
         stats = self._calculate_tokens()
-        exchanges = len(self.conversation_history) // 2
+        exchanges = len(self.history) // 2
         
         console.print(Panel(
             f"[cyan]System prompt:[/cyan] {stats['system']:,} tokens\n"
+            f"[cyan]Summary:[/cyan] {stats['summary']:,} tokens\n"
             f"[cyan]Your messages:[/cyan] {stats['user']:,} tokens\n"
             f"[cyan]Yennefer responses:[/cyan] {stats['assistant']:,} tokens\n"
             f"[cyan]Total used:[/cyan] {stats['total']:,} / {self.context_limit:,}\n"
             f"[cyan]Remaining:[/cyan] {stats['remaining']:,} tokens\n"
-            f"[cyan]Exchanges:[/cyan] {exchanges}",
+            f"[cyan]Exchanges:[/cyan] {exchanges}\n"
+            f"[cyan]Tokenizer:[/cyan] {self.token_counter.spec} "
+            f"(calibration ×{self.token_counter.scale:.2f})\n"
+            f"[cyan]Compactions:[/cyan] {self.compaction_stats['runs']} "
+            f"({self.compaction_stats['tokens_saved']:,} tokens saved, "
+            f"{self.compaction_stats['seconds']:.1f}s)\n"
+            f"[cyan]Prefix checkpoints:[/cyan] {self.prompt_builder.checkpoints}"
+            f"{self._store_status()}"
+            f"{self._recall_status()}"
+            f"{self._scheduler_status()}"
+            f"{self._router_status()}"
+            f"{self.tools.status_line() if self.tools is not None else ''}",
             title="Memory Status"
         ))
@@ -0,0 +1,161 @@
+"""
+Cache - Content-Addressed TTS Audio Cache
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+from rich.console import Console
+
+console = Console()
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "cache" / "tts"
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different strings share an entry."""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class AudioCache:
+    """On-disk audio cache keyed on text + every setting that changes the audio.
+    
+    Entries are <sha256>.audio files (mp3 or raw PCM, per output_format).
+    An in-memory index ordered by last use is built once at startup from
+    file mtimes; hits bump the mtime so the LRU order survives restarts.
+    The oldest entries are evicted once the total size passes max_bytes.
+    get() and put() do their file I/O in a worker thread, so a slow disk
+    never stalls playback on the event loop.
+    """
+    
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 100 * 1024 * 1024):
+        self.directory = Path(directory) if directory else DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.characters_saved = 0
+        
+        self._load_index()
+    
+    def _load_index(self):
+        """Build the LRU index from the files already on disk."""
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            entries = sorted(
+                (entry.stat().st_mtime, entry.stem, entry.stat().st_size)
+                for entry in self.directory.glob('*.audio')
+            )
+        except OSError as e:
+            console.print(f"[yellow]Audio cache unavailable: {e}[/yellow]")
+            entries = []
+        for _, key, size in entries:
+            self._index[key] = size
+            self._size += size
+    
+    @staticmethod
+    def key(text: str, **settings) -> str:
+        """Content address for text spoken with the given voice settings."""
+        payload = json.dumps(
+            {'text': normalize_text(text), **settings},
+            sort_keys=True,
+            separators=(',', ':')
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.audio"
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+    
+    @property
+    def size(self) -> int:
+        """Total bytes currently cached."""
+        return self._size
+    
+    @property
+    def entries(self) -> int:
+        return len(self._index)
+    
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    
+    async def get(self, key: str, characters: int = 0) -> Optional[bytes]:
+        """Return cached audio, or None on a miss."""
+        if key not in self._index:
+            self.misses += 1
+            return None
+        try:
+            data = await asyncio.to_thread(self._read, self._path(key))
+        except OSError:
+            self._forget(key)
+            self.misses += 1
+            return None
+        
+        # Evicted while it was being read
+        if key in self._index:
+            self._index.move_to_end(key)
+        self.hits += 1
+        self.bytes_saved += len(data)
+        self.characters_saved += characters
+        return data
+    
+    async def put(self, key: str, data: bytes):
+        """Store audio and evict least recently used entries over the cap."""
+        if not data or len(data) > self.max_bytes:
+            return
+        try:
+            await asyncio.to_thread(self._write, self._path(key), data)
+        except OSError as e:
+            console.print(f"[yellow]Audio cache write failed: {e}[/yellow]")
+            return
+        
+        self._forget(key)
+        self._index[key] = len(data)
+        self._size += len(data)
+        evicted = self._evict()
+        if evicted:
+            await asyncio.to_thread(self._unlink, evicted)
+    
+    @staticmethod
+    def _read(path: Path) -> bytes:
+        data = path.read_bytes()
+        os.utime(path)
+        return data
+    
+    @staticmethod
+    def _write(path: Path, data: bytes):
+        temp_path = path.with_suffix('.tmp')
+        temp_path.write_bytes(data)
+        os.replace(temp_path, path)
+    
+    @staticmethod
+    def _unlink(paths: List[Path]):
+        for path in paths:
+            path.unlink(missing_ok=True)
+    
+    def _forget(self, key: str):
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._size -= size
+    
+    def _evict(self) -> List[Path]:
+        """Drop the oldest entries over the cap; returns their files to delete."""
+        evicted = []
+        while self._size > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._size -= size
+            evicted.append(self._path(key))
+        return evicted
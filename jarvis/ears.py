@@ -1,33 +1,170 @@
 """
-Ears - Text Input Module
+Ears - Text and Voice Input Module
 """
 
 import asyncio
+import threading
+from typing import TYPE_CHECKING, Optional
+
 from rich.console import Console
-from rich.prompt import Prompt
+from rich.markup import escape
+
+if TYPE_CHECKING:
+    # Imported only for voice_input.engine: local - it pulls in numpy
+    from .speech import SpeechInput
 
 console = Console()
 
 
 class Ears:
-    """Text input handler."""
+    """Text input handler, plus local speech-to-text when enabled.
+    
+    A background thread reads stdin continuously, so input typed while
+    Yennefer is thinking or speaking is not lost and can interrupt her.
+    With voice_input.engine: local, spoken utterances arrive alongside
+    typed lines (see speech.py); partial transcripts are shown as they
+    come and the final one is returned like a typed line.
+    """
     
     def __init__(self, config: dict):
         self.config = config.get('voice_input', {})
-        
+        self.engine = self.config.get('engine', 'text')
+        # Speech during a reply interrupts it; off by default since the
+        # microphone hears her too unless you wear headphones
+        self.barge_in = self.config.get('barge_in', False)
+        self.wake_word = self.config.get('wake_word', {}).get('enabled', False)
+        self.speech: Optional['SpeechInput'] = None
+        self._speech_task: Optional[asyncio.Task] = None
+        self._speech_ended = False
+        self._lines: Optional[asyncio.Queue] = None
+        self._reader: Optional[threading.Thread] = None
+    
     async def initialize(self):
-        """Initialize input handler."""
+        """Initialize input handler.
+        
+        The speech model loads in the background; typing works meanwhile.
+        """
+        self._start_reader()
         console.print("[green]✓[/green] Text input ready")
+        if self.engine == 'local':
+            self._speech_task = asyncio.create_task(self._start_speech())
+    
+    async def _start_speech(self):
+        from .speech import SpeechInput
+        
+        speech = SpeechInput.from_config(self.config)
+        if speech is None:
+            return
+        try:
+            await speech.start()
+        except Exception as e:
+            console.print(f"[yellow]Voice input unavailable: {e}[/yellow]")
+            speech.close()
+            return
+        self.speech = speech
+        hint = 'say "Hey Yennefer"' if speech.wake is not None else 'just talk'
+        console.print(f"\n[green]✓[/green] Voice input ready ({speech.spec}) - {hint}")
     
-    async def listen(self) -> str:
-        """Get text input from user."""
-        loop = asyncio.get_event_loop()
-        text = await loop.run_in_executor(
-            None,
-            lambda: Prompt.ask("[cyan]You[/cyan]")
-        )
+    def _start_reader(self):
+        """Start the stdin reader thread (once)."""
+        if self._reader is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._lines = asyncio.Queue()
+        
+        def read():
+            while True:
+                try:
+                    line = input()
+                except (EOFError, KeyboardInterrupt):
+                    loop.call_soon_threadsafe(self._lines.put_nowait, None)
+                    return
+                loop.call_soon_threadsafe(self._lines.put_nowait, line)
+        
+        # Daemon so a blocked input() never keeps the process alive on exit
+        self._reader = threading.Thread(target=read, name='ears-stdin', daemon=True)
+        self._reader.start()
+    
+    async def listen(self, prompt: bool = True) -> str:
+        """Get the next line of input from the user, typed or spoken.
+        
+        With prompt=False nothing is printed, for picking up input typed
+        while a reply is in progress; speech is ignored then unless
+        voice_input.barge_in is on. Raises EOFError when stdin closes.
+        """
+        self._start_reader()
+        if prompt:
+            console.print("[cyan]You[/cyan]: ", end='')
+        
+        speech = self.speech if (prompt or self.barge_in) and not self._speech_ended else None
+        if self.speech is not None and speech is None:
+            self.speech.paused = True
+        try:
+            text = await self._next_line(speech)
+        finally:
+            if self.speech is not None:
+                self.speech.paused = False
+        
+        if text is None:
+            # Keep reporting EOF to any later listener
+            self._lines.put_nowait(None)
+            raise EOFError
         return text.strip()
     
+    async def _next_line(self, speech: Optional['SpeechInput']) -> Optional[str]:
+        """Next typed line or final transcript, whichever comes first."""
+        typed = asyncio.ensure_future(self._lines.get())
+        partial = ''
+        try:
+            while speech is not None:
+                spoken = asyncio.ensure_future(speech.next())
+                await asyncio.wait({typed, spoken}, return_when=asyncio.FIRST_COMPLETED)
+                if typed.done():
+                    spoken.cancel()
+                    return typed.result()
+                
+                transcript = spoken.result()
+                if transcript is None:
+                    console.print("\n[dim]Voice input ended[/dim]")
+                    self._speech_ended = True
+                    speech = None
+                elif transcript.wake:
+                    console.print("\r[dim]Listening…[/dim]", end='')
+                    partial = 'Listening'
+                elif not transcript.final:
+                    # Overwrite the previous partial in place
+                    console.print(f"\r[dim]{escape(transcript.text.ljust(len(partial)))}…[/dim]", end='')
+                    partial = transcript.text
+                else:
+                    console.print(f"\r{escape(transcript.text.ljust(len(partial) + 1))}")
+                    return transcript.text
+            return await typed
+        finally:
+            typed.cancel()
+    
+    def status(self):
+        """Print speech-to-text latency (local engine only)."""
+        if self.speech is None:
+            return
+        stats = self.speech.stats
+        line = f"[cyan]Voice input:[/cyan] {self.speech.spec} • {stats['finals']} utterances"
+        if self.speech.wake is not None:
+            line += f" • woken {stats['wakes']} times"
+        latency = self.speech.latency_percentiles()
+        if latency is not None:
+            p50, p95, pause = latency
+            line += (
+                f" • end of speech → text p50 {p50 * 1000:.0f} ms / p95 {p95 * 1000:.0f} ms "
+                f"(pause {pause * 1000:.0f} ms) • {stats['from_partial']}/{stats['finals']} ready from partials"
+            )
+        rtf = self.speech.real_time_factor
+        if rtf is not None:
+            line += f" • {rtf:.2f}× real time, {stats['partials']} partials"
+        console.print(line)
+    
     def cleanup(self):
-        """Nothing to clean up."""
-        pass
+        """Stop voice capture."""
+        if self._speech_task is not None and not self._speech_task.done():
+            self._speech_task.cancel()
+        if self.speech is not None:
+            self.speech.close()
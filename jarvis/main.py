@@ -3,24 +3,31 @@
 Yennefer - AI Assistant
 
 Usage:
-    python -m jarvis.main
+    python -m jarvis.main [--profile-startup]
+    python -m jarvis.main batch prompts.jsonl [-o results.jsonl] [-c 4]   (headless, see batch.py)
 """
 
+import time
+_STARTED = time.perf_counter()
+
 import os
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'  # Must be before pygame import
 
+import argparse
 import asyncio
+import sys
 from rich.console import Console
-from rich.panel import Panel
 
-from .orchestrator import YenneferOrchestrator
 from .config import load_config
+from .trace import StartupProfile
 
 console = Console()
 
 
 def print_banner():
     """Display Yennefer startup banner."""
+    from rich.panel import Panel
+    
     banner = """
 ██╗   ██╗███████╗███╗   ██╗███╗   ██╗███████╗███████╗███████╗██████╗ 
 ╚██╗ ██╔╝██╔════╝████╗  ██║████╗  ██║██╔════╝██╔════╝██╔════╝██╔══██╗
@@ -33,20 +40,43 @@ def print_banner():
                         subtitle="v0.3.2", style="magenta"))
 
 
-async def main():
+async def main(profile_startup: bool = False):
     """Main entry point."""
-    print_banner()
+    startup = StartupProfile(_STARTED)
+    startup.mark('main')
+    
+    with startup.phase('banner'):
+        print_banner()
     
-    config = load_config()
+    with startup.phase('config'):
+        config = load_config()
     console.print("[green]✓[/green] Configuration loaded")
     
-    yennefer = YenneferOrchestrator(config)
+    # The rest of the stack is imported after the banner is already up
+    with startup.phase('imports'):
+        from .orchestrator import YenneferOrchestrator
+    
+    yennefer = YenneferOrchestrator(config, startup=startup if profile_startup else None)
     await yennefer.run()
 
 
 def cli():
     """CLI entry point."""
-    asyncio.run(main())
+    if sys.argv[1:2] == ['batch']:
+        # Headless; imported here so the interactive start doesn't pay for it
+        from .batch import cli as batch_cli
+        
+        batch_cli(sys.argv[2:], prog="python -m jarvis.main batch")
+        return
+    
+    parser = argparse.ArgumentParser(
+        description="Yennefer AI assistant",
+        epilog="python -m jarvis.main batch --help: run a JSONL file of prompts headless"
+    )
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print a breakdown of startup time at the first prompt")
+    args = parser.parse_args()
+    asyncio.run(main(args.profile_startup))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+"""
+Memory - Conversation History and Token Accounting
+"""
+
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional
+
+from rich.console import Console
+
+console = Console()
+
+# Chat templates wrap every message in role markers (<|im_start|>user ... <|im_end|>)
+MESSAGE_OVERHEAD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate: ~4 chars per token for English."""
+    return len(text) // 4
+
+
+class TokenCounter:
+    """Counts tokens with a local tokenizer when available, else estimate_tokens.
+    
+    Counts are "raw"; scale corrects them towards what the server actually
+    reports, so running totals never need recounting after a calibration.
+    
+    Tokenizer spec (llm.tokenizer in config):
+    - heuristic               ~4 chars per token (default)
+    - tiktoken:<encoding>     e.g. tiktoken:cl100k_base
+    - <path or HF repo id>    tokenizer.json via the `tokenizers` package
+    """
+    
+    def __init__(self, spec: Optional[str] = None, calibration_rate: float = 0.3):
+        self.spec = spec or 'heuristic'
+        self.calibration_rate = calibration_rate
+        self.scale = 1.0
+        self.calibrations = 0
+        self._encode = self._load(self.spec)
+    
+    def _load(self, spec: str):
+        """Return an encode function for the spec, or None for the heuristic."""
+        if spec == 'heuristic':
+            return None
+        
+        try:
+            if spec.startswith('tiktoken:'):
+                import tiktoken
+                encoding = tiktoken.get_encoding(spec.split(':', 1)[1])
+                return lambda text: len(encoding.encode(text, disallowed_special=()))
+            
+            from pathlib import Path
+            from tokenizers import Tokenizer
+            if Path(spec).exists():
+                tokenizer = Tokenizer.from_file(spec)
+            else:
+                tokenizer = Tokenizer.from_pretrained(spec)
+            return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+        
+        except ImportError as e:
+            console.print(f"[yellow]Tokenizer unavailable ({e}), using estimate[/yellow]")
+            console.print("[dim]Run: pip install tiktoken  (or: pip install tokenizers)[/dim]")
+        except Exception as e:
+            console.print(f"[yellow]Could not load tokenizer '{spec}': {e}[/yellow]")
+        
+        self.spec = 'heuristic'
+        return None
+    
+    def count(self, text: str) -> int:
+        """Raw token count for text."""
+        if self._encode is None:
+            return estimate_tokens(text)
+        return self._encode(text)
+    
+    def scaled(self, raw: int) -> int:
+        """Apply the server calibration to a raw count."""
+        return int(round(raw * self.scale))
+    
+    def calibrate(self, raw_estimate: int, reported: int):
+        """Move scale towards reported/raw_estimate using server `usage` numbers."""
+        if raw_estimate <= 0 or reported <= 0:
+            return
+        ratio = min(max(reported / raw_estimate, 0.25), 4.0)
+        if self.calibrations == 0:
+            self.scale = ratio
+        else:
+            self.scale += self.calibration_rate * (ratio - self.scale)
+        self.calibrations += 1
+
+
+class ConversationHistory:
+    """Conversation messages with running per-role token totals.
+    
+    Every message's count is computed once when it is appended, so totals
+    and trimming cost O(1) per message regardless of session length.
+    
+    With a store attached (see store.SessionStore), every change is also
+    logged there so the conversation survives restarts.
+    """
+    
+    def __init__(self, counter: TokenCounter, store=None):
+        self.counter = counter
+        self.store = store
+        self._messages: Deque[Dict[str, str]] = deque()
+        self._tokens: Deque[int] = deque()
+        self._ids: Deque[Optional[int]] = deque()
+        self._role_totals: Dict[str, int] = {}
+        self._raw_total = 0
+        
+        # Rolling summary of compacted messages, kept outside the message list
+        self.summary = ''
+        self._summary_tokens = 0
+        self._last_dropped: Optional[int] = None
+    
+    def __len__(self) -> int:
+        return len(self._messages)
+    
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self._messages)
+    
+    @property
+    def messages(self) -> List[Dict[str, str]]:
+        """Messages in API format, oldest first."""
+        return list(self._messages)
+    
+    @property
+    def raw_total(self) -> int:
+        """Uncalibrated token total including the summary and per-message overhead."""
+        return self._raw_total + self._summary_tokens
+    
+    @property
+    def messages_raw_total(self) -> int:
+        """Uncalibrated token total of the messages alone (no summary)."""
+        return self._raw_total
+    
+    def tail_raw_tokens(self, count: int) -> int:
+        """Uncalibrated token total of the newest count messages."""
+        count = min(count, len(self._tokens))
+        return sum(self._tokens[-i] for i in range(1, count + 1))
+    
+    def append(self, role: str, content: str) -> int:
+        """Add a message and return its raw token count."""
+        tokens = self.counter.count(content) + MESSAGE_OVERHEAD
+        message_id = self.store.append(role, content, tokens) if self.store else None
+        self._add(role, content, tokens, message_id)
+        return tokens
+    
+    def _add(self, role: str, content: str, tokens: int, message_id: Optional[int]):
+        self._messages.append({'role': role, 'content': content})
+        self._tokens.append(tokens)
+        self._ids.append(message_id)
+        self._role_totals[role] = self._role_totals.get(role, 0) + tokens
+        self._raw_total += tokens
+    
+    def restore(self, messages: List[tuple], summary: str = '', summary_tokens: int = 0):
+        """Load (id, role, content, tokens) rows read back from the store.
+        
+        Counts are taken as stored, so nothing is re-tokenized.
+        """
+        for message_id, role, content, tokens in messages:
+            self._add(role, content, tokens, message_id)
+        self.summary = summary
+        self._summary_tokens = summary_tokens
+    
+    def _pop_oldest(self) -> Dict[str, str]:
+        message = self._messages.popleft()
+        tokens = self._tokens.popleft()
+        self._last_dropped = self._ids.popleft()
+        self._role_totals[message['role']] -= tokens
+        self._raw_total -= tokens
+        return message
+    
+    def pop_oldest(self) -> Dict[str, str]:
+        """Remove and return the oldest message."""
+        message = self._pop_oldest()
+        if self.store and self._last_dropped is not None:
+            self.store.forget(self._last_dropped)
+        return message
+    
+    def pop_latest(self) -> Dict[str, str]:
+        """Remove and return the newest message."""
+        message = self._messages.pop()
+        tokens = self._tokens.pop()
+        message_id = self._ids.pop()
+        self._role_totals[message['role']] -= tokens
+        self._raw_total -= tokens
+        if self.store and message_id is not None:
+            self.store.retract(message_id)
+        return message
+    
+    def role_tokens(self, role: str) -> int:
+        """Calibrated token total for one role."""
+        return self.counter.scaled(self._role_totals.get(role, 0))
+    
+    def summary_tokens(self) -> int:
+        """Calibrated token count of the rolling summary."""
+        return self.counter.scaled(self._summary_tokens)
+    
+    def total(self) -> int:
+        """Calibrated token total for the summary and all messages."""
+        return self.counter.scaled(self.raw_total)
+    
+    def oldest(self, count: int) -> List[Dict[str, str]]:
+        """The count oldest messages, without removing them."""
+        return [self._messages[i] for i in range(min(count, len(self._messages)))]
+    
+    def compact(self, folded: List[Dict[str, str]], summary: str) -> bool:
+        """Replace the folded messages at the front with a new summary.
+        
+        folded must be the exact message objects returned by oldest(); if
+        the front of the history changed since (trim, clear), nothing is
+        done and False is returned.
+        """
+        if not folded or len(folded) > len(self._messages):
+            return False
+        if not all(self._messages[i] is message for i, message in enumerate(folded)):
+            return False
+        for _ in folded:
+            self._pop_oldest()
+        self.summary = summary
+        self._summary_tokens = self.counter.count(summary) if summary else 0
+        if self.store and self._last_dropped is not None:
+            self.store.summarize(self._last_dropped, summary, self._summary_tokens)
+        return True
+    
+    def trim_to(self, budget: int, keep_last: int = 2) -> int:
+        """Drop the oldest messages until the calibrated total fits budget.
+        
+        Always keeps the newest keep_last messages, and never leaves an
+        assistant message at the front without the user turn it answered.
+        Returns the number of messages removed.
+        """
+        removed = 0
+        while len(self._messages) > keep_last and self.total() > budget:
+            self._pop_oldest()
+            removed += 1
+        while len(self._messages) > keep_last and self._messages[0]['role'] == 'assistant':
+            self._pop_oldest()
+            removed += 1
+        # One store event for the whole trim
+        if removed and self.store and self._last_dropped is not None:
+            self.store.forget(self._last_dropped)
+        return removed
+    
+    def clear(self):
+        """Remove all messages."""
+        self._messages.clear()
+        self._tokens.clear()
+        self._ids.clear()
+        if self.store:
+            self.store.clear()
+        self._role_totals = {}
+        self._raw_total = 0
+        self.summary = ''
+        self._summary_tokens = 0
@@ -3,30 +3,61 @@ Orchestrator - Main Conversation Loop
 """
 
 import asyncio
+import time
+from typing import Optional
+
 from rich.console import Console
 
 from .ears import Ears
 from .voice import Voice
 from .brain import Brain
+from .trace import StartupProfile, Tracer
 
 console = Console()
 
+# Fixed lines spoken every session - pre-synthesized into the audio cache
+GREETING = "I'm here. What do you need?"
+CLEARED = "Memory cleared. A fresh start, then."
+FAREWELL = "Until next time."
+CANNED_PHRASES = [GREETING, CLEARED, FAREWELL]
+
+# Typed while Yennefer is talking: stop without starting a new turn
+INTERRUPT_COMMANDS = ('', 'stop', 'shh', 'quiet', 'enough')
+
 
 class YenneferOrchestrator:
     """Main orchestrator for Yennefer AI Assistant."""
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, startup: Optional[StartupProfile] = None):
         self.config = config
+        # Printed at the first prompt when passed in (--profile-startup)
+        self.profile_startup = startup is not None
+        self.startup = startup or StartupProfile()
+        # Shared by Brain and Voice so one trace covers the whole turn
+        self.tracer = Tracer.from_config(config)
         self.ears = Ears(config)
-        self.voice = Voice(config)
-        self.brain = Brain(config)
+        self.voice = Voice(config, tracer=self.tracer)
+        self.brain = Brain(config, tracer=self.tracer)
+        self.tracer.add_metrics(self.brain.scheduler.prometheus)
+        self.tracer.add_metrics(self.brain.router.prometheus)
+        if self.brain.tools is not None:
+            self.tracer.add_metrics(self.brain.tools.prometheus)
         self.is_running = False
+        self._prewarm_task = None
+        self._greeting_task = None
         
     async def initialize(self):
-        """Initialize all components."""
-        await self.ears.initialize()
-        await self.voice.initialize()
-        return await self.brain.initialize()
+        """Initialize all components at once; none of them waits on another."""
+        startup = self.startup
+        _, _, ready = await asyncio.gather(
+            startup.timed('ears', self.ears.initialize()),
+            startup.timed('voice', self.voice.initialize(startup)),
+            startup.timed('brain', self.brain.initialize(startup))
+        )
+        # Known once Voice has settled on a transport
+        if self.voice.tts_router is not None:
+            self.tracer.add_metrics(self.voice.tts_router.prometheus)
+        return ready
     
     async def run(self):
         """Main run loop."""
@@ -36,19 +67,39 @@ class YenneferOrchestrator:
             console.print("[red]Failed to initialize. Is LM Studio running?[/red]")
             return
         
-        await self.voice.speak("I'm here. What do you need?")
+        # The greeting plays while the prompt is already up; typing cuts it off
+        self._greeting_task = asyncio.create_task(self.voice.speak(GREETING))
+        self._prewarm_task = asyncio.create_task(self._prewarm())
+        # Let the greeting print before the command list
+        await asyncio.sleep(0)
         
         console.print("\n[dim]Commands:[/dim]")
         console.print("[dim]  'quit'    - exit[/dim]")
         console.print("[dim]  'clear'   - reset conversation memory[/dim]")
-        console.print("[dim]  'status'  - show LLM token usage[/dim]")
+        console.print("[dim]  'status'  - show LLM token usage and latency[/dim]")
         console.print("[dim]  'credits' - show ElevenLabs usage[/dim]")
         console.print("[dim]  'voice'   - show voice settings[/dim]")
-        console.print("[dim]Voice input: Press Win+H to dictate[/dim]\n")
+        console.print("[dim]  Enter or 'stop' while she speaks - interrupt[/dim]")
+        if self.ears.engine == 'local' and self.ears.wake_word:
+            console.print("[dim]Voice input: say \"Hey Yennefer\", then talk; a short pause sends[/dim]\n")
+        elif self.ears.engine == 'local':
+            console.print("[dim]Voice input: just talk, a short pause sends[/dim]\n")
+        else:
+            console.print("[dim]Voice input: Press Win+H to dictate[/dim]\n")
+        
+        self.startup.mark('first prompt')
+        if self.profile_startup:
+            self.startup.print()
+        
+        pending_input = None
         
         try:
             while self.is_running:
-                user_input = await self.ears.listen()
+                if pending_input is not None:
+                    user_input, pending_input = pending_input, None
+                else:
+                    user_input = await self.ears.listen()
+                await self._stop_greeting()
                 
                 # Handle commands
                 cmd = user_input.lower().strip()
@@ -59,11 +110,13 @@ class YenneferOrchestrator:
                 
                 if cmd == 'clear':
                     self.brain.clear_history()
-                    await self.voice.speak("Memory cleared. A fresh start, then.")
+                    await self.voice.speak(CLEARED)
                     continue
                 
                 if cmd == 'status':
                     self.brain.status()
+                    self.tracer.status()
+                    self.ears.status()
                     continue
                 
                 if cmd in ('credits', 'usage'):
@@ -77,22 +130,103 @@ class YenneferOrchestrator:
                 if not user_input:
                     continue
                 
-                response = await self.brain.think(user_input)
+                pending_input = await self._run_turn(user_input)
+                if pending_input is not None:
+                    continue
                 
-                if response.get('text'):
-                    await self.voice.speak(response['text'])
+                # Summarize old history while waiting for the next input
+                self.brain.schedule_compaction()
                 
                 print()
                 
         except (KeyboardInterrupt, EOFError):
             await self.shutdown()
     
+    async def _prewarm(self):
+        """Cache the canned phrases once the greeting is over.
+        
+        Speaking the greeting already caches it, so prewarm waits rather than
+        download it a second time alongside; an interrupted greeting is
+        fetched here instead.
+        """
+        if self._greeting_task is not None:
+            await asyncio.wait({self._greeting_task})
+        await self.voice.prewarm(CANNED_PHRASES)
+    
+    async def _stop_greeting(self):
+        """Cut the greeting off if it is still playing."""
+        task, self._greeting_task = self._greeting_task, None
+        if task is not None and not task.done():
+            self.voice.stop()
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    
+    async def _respond(self, user_input: str):
+        """Generate and speak one reply."""
+        if self.voice.streaming:
+            # Speak each sentence while the rest is still generating
+            await self.voice.speak_stream(
+                self.brain.think_stream(user_input, show_status=False)
+            )
+            self.tracer.mark('playback_end')
+            self.brain.print_turn_status()
+        else:
+            response = await self.brain.think(user_input)
+            
+            if response.get('text'):
+                await self.voice.speak(response['text'])
+            self.tracer.mark('playback_end')
+    
+    async def _run_turn(self, user_input: str) -> Optional[str]:
+        """Run a reply while still listening, so the user can barge in.
+        
+        New input cancels the LLM request, pending synthesis and playback.
+        History keeps only what was actually spoken. Returns the new input
+        to handle next, or None.
+        """
+        self.tracer.begin()
+        turn = asyncio.create_task(self._respond(user_input))
+        listener = asyncio.create_task(self.ears.listen(prompt=False))
+        
+        await asyncio.wait({turn, listener}, return_when=asyncio.FIRST_COMPLETED)
+        
+        if turn.done():
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            self.tracer.end()
+            turn.result()
+            return None
+        
+        try:
+            barge_in = listener.result()
+        except EOFError:
+            barge_in = 'quit'
+        started = time.perf_counter()
+        
+        self.voice.stop()
+        turn.cancel()
+        await asyncio.gather(turn, return_exceptions=True)
+        self.voice.stop()
+        self.brain.commit_interrupted(self.voice.spoken_text)
+        self.tracer.end(interrupted=True)
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        console.print(f"\n[dim]Interrupted ({elapsed_ms:.0f} ms)[/dim]")
+        
+        if barge_in.lower().strip() in INTERRUPT_COMMANDS:
+            return None
+        return barge_in
+    
     async def shutdown(self):
         """Shutdown Yennefer."""
         self.is_running = False
-        await self.voice.speak("Until next time.")
+        await self._stop_greeting()
+        await self.voice.speak(FAREWELL)
         self.ears.cleanup()
+        await self.voice.close()
         self.voice.cleanup()
+        await self.brain.close()
+        await asyncio.get_running_loop().run_in_executor(None, self.tracer.close)
 
 
 # Backwards compatibility alias
@@ -0,0 +1,197 @@
+"""
+Plugins - Built-in Tools
+
+The tools listed by name in tools.plugins (see tools.py for how they run):
+
+- current_time   date and time (async)
+- calculate      arithmetic and math functions (cpu, process pool)
+- list_files     a folder's entries under tools.files_root (io, thread pool)
+- read_file      a text file under tools.files_root (io, thread pool)
+- fetch_url      a web page as plain text (async; off unless listed)
+"""
+
+import ast
+import html
+import math
+import operator
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Type
+
+import httpx
+
+from .tools import Tool
+
+
+class CurrentTime(Tool):
+    name = 'current_time'
+    description = "The current local date, time and day of the week."
+    kind = 'async'
+    
+    async def run(self) -> str:
+        return datetime.now().astimezone().strftime("%A %d %B %Y, %H:%M:%S %Z")
+
+
+_OPERATORS = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+    ast.USub: operator.neg, ast.UAdd: operator.pos,
+}
+_FUNCTIONS = {name: getattr(math, name) for name in (
+    'sqrt', 'exp', 'log', 'log10', 'log2', 'sin', 'cos', 'tan', 'asin', 'acos', 'atan',
+    'floor', 'ceil', 'factorial', 'gcd', 'degrees', 'radians', 'hypot')}
+_FUNCTIONS.update({'abs': abs, 'round': round, 'min': min, 'max': max})
+_CONSTANTS = {'pi': math.pi, 'e': math.e, 'tau': math.tau}
+# Integers past this many bits (about 4,200 digits) are refused: bigger
+# ones can take longer to build than the call's timeout, and Python won't
+# print more than 4,300 digits anyway
+_MAX_BITS = 14_000
+
+DEFAULT_FILES_ROOT = Path(__file__).parent.parent / "data" / "files"
+
+
+def _evaluate(node):
+    """Evaluate a parsed arithmetic expression; nothing but numbers, operators and math functions."""
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.Name) and node.id in _CONSTANTS:
+        return _CONSTANTS[node.id]
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        return _OPERATORS[type(node.op)](_evaluate(node.operand))
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, right = _evaluate(node.left), _evaluate(node.right)
+        if isinstance(node.op, ast.Pow):
+            _check_power(left, right)
+        return _bounded(_OPERATORS[type(node.op)](left, right))
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS
+            and not node.keywords):
+        arguments = [_evaluate(arg) for arg in node.args]
+        if node.func.id == 'factorial' and arguments and abs(arguments[0]) > 3000:
+            raise ValueError("factorial argument too large")
+        return _bounded(_FUNCTIONS[node.func.id](*arguments))
+    raise ValueError(f"unsupported expression: {ast.dump(node)[:60]}")
+
+
+def _check_power(base, exponent):
+    """Refuse integer powers whose result would be too large, before computing them."""
+    if abs(exponent) > 10000:
+        raise ValueError("exponent too large")
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if (abs(base).bit_length() - 1) * exponent > _MAX_BITS:
+            raise ValueError("result too large")
+
+
+def _bounded(value):
+    if isinstance(value, int) and value.bit_length() > _MAX_BITS:
+        raise ValueError("result too large")
+    return value
+
+
+class Calculate(Tool):
+    name = 'calculate'
+    description = ("Evaluate an arithmetic expression exactly, e.g. '17.5 * 3 / (2 + 1)' or "
+                   "'sqrt(2) * sin(pi / 4)'. Supports + - * / // % **, parentheses and math functions.")
+    parameters = {
+        'type': 'object',
+        'properties': {'expression': {'type': 'string', 'description': "The expression"}},
+        'required': ['expression'],
+    }
+    kind = 'cpu'
+    
+    def run(self, expression: str) -> str:
+        result = _evaluate(ast.parse(expression, mode='eval'))
+        return f"{expression} = {result}"
+
+
+class _Files(Tool):
+    """Base for file tools: paths are relative to tools.files_root and can't leave it.
+    
+    Hidden files and folders (.env, .ssh, ...) are off limits even inside it.
+    """
+    
+    kind = 'io'
+    
+    @property
+    def root(self) -> Path:
+        root = Path(self.config.get('files_root') or DEFAULT_FILES_ROOT).expanduser().resolve()
+        root.mkdir(parents=True, exist_ok=True)
+        return root
+    
+    def resolve(self, path: str) -> Path:
+        if any(part.startswith('.') for part in Path(path).parts):
+            raise PermissionError(f"{path} is hidden or outside {self.root}")
+        target = (self.root / path).resolve()
+        if not target.is_relative_to(self.root):
+            raise PermissionError(f"{path} is outside {self.root}")
+        # A symlink inside the root can still lead to a hidden file
+        if self.hidden(target):
+            raise PermissionError(f"{path} is hidden")
+        return target
+    
+    def hidden(self, target: Path) -> bool:
+        return any(part.startswith('.') for part in target.relative_to(self.root).parts)
+
+
+class ListFiles(_Files):
+    name = 'list_files'
+    description = "List the files and folders in a folder of the user's files."
+    parameters = {
+        'type': 'object',
+        'properties': {
+            'folder': {'type': 'string', 'description': "Folder relative to the user's files; '' for the top"},
+            'pattern': {'type': 'string', 'description': "Optional glob such as '*.txt'"},
+        },
+    }
+    
+    def run(self, folder: str = '', pattern: str = '*') -> str:
+        target = self.resolve(folder)
+        entries = sorted(entry for entry in target.glob(pattern or '*') if not self.hidden(entry))[:200]
+        lines = [f"{entry.name}/" if entry.is_dir() else f"{entry.name} ({entry.stat().st_size:,} bytes)"
+                 for entry in entries]
+        return '\n'.join(lines) or "(empty)"
+
+
+class ReadFile(_Files):
+    name = 'read_file'
+    description = "Read a text file from the user's files."
+    parameters = {
+        'type': 'object',
+        'properties': {'path': {'type': 'string', 'description': "File path relative to the user's files"}},
+        'required': ['path'],
+    }
+    
+    def run(self, path: str) -> str:
+        with open(self.resolve(path), 'rb') as f:
+            data = f.read(self.config.get('max_file_bytes', 200_000))
+        return data.decode('utf-8', errors='replace')
+
+
+class FetchUrl(Tool):
+    name = 'fetch_url'
+    description = "Fetch a web page and return its text."
+    parameters = {
+        'type': 'object',
+        'properties': {'url': {'type': 'string', 'description': "http(s) URL"}},
+        'required': ['url'],
+    }
+    kind = 'async'
+    
+    async def run(self, url: str) -> str:
+        if not url.startswith(('http://', 'https://')):
+            raise ValueError("only http(s) URLs")
+        async with httpx.AsyncClient(follow_redirects=True, timeout=self.timeout or 10.0) as client:
+            response = await client.get(url, headers={'User-Agent': 'Yennefer/1.0'})
+        response.raise_for_status()
+        text = response.text
+        if 'html' in response.headers.get('content-type', ''):
+            text = re.sub(r'(?is)<(script|style)\b.*?</\1>', ' ', text)
+            text = html.unescape(re.sub(r'<[^>]+>', ' ', text))
+        return re.sub(r'\s+', ' ', text).strip()
+
+
+BUILTIN: Dict[str, Type[Tool]] = {
+    tool.name: tool for tool in (CurrentTime, Calculate, ListFiles, ReadFile, FetchUrl)
+}
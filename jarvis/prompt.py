@@ -0,0 +1,139 @@
+"""
+Prompt - Prefix-Stable Request Construction
+"""
+
+from typing import Any, Dict, List, Optional
+
+from rich.console import Console
+
+from .memory import MESSAGE_OVERHEAD, ConversationHistory
+
+console = Console()
+
+
+class PromptBuilder:
+    """Builds chat requests whose prefix only changes at explicit checkpoints.
+    
+    LM Studio / llama.cpp reuse the KV cache for the longest prefix shared
+    with the previous request. Between checkpoints every prompt is the
+    previous prompt plus new messages, byte for byte: the system message
+    (prompt + frozen summary) is rebuilt only when checkpoint() is called,
+    and history messages are never rewritten in place.
+    
+    Each build() records how much of the prompt is a reused prefix, and
+    record_timing() adds what the server reported, so cache hits can be
+    checked per turn.
+    
+    Retrieved context is attached to the newest user message of a single
+    request only, so the one message it touched is the only rewrite the
+    next request makes.
+    """
+    
+    def __init__(self, system_prompt: str, counter):
+        self.system_prompt = system_prompt
+        self.counter = counter
+        self._system_message: Optional[Dict[str, str]] = None
+        self._system_tokens = 0
+        self._last_prompt: List[Dict[str, str]] = []
+        self._prompt_estimate = 0
+        self._augmented_at: Optional[int] = None
+        self._checkpoint_reason: Optional[str] = 'start'
+        
+        self.checkpoints = 0
+        self.unexpected_rewrites = 0
+        self.last_turn: Dict[str, Any] = {}
+    
+    def checkpoint(self, reason: str):
+        """Allow the next build() to rewrite the prefix (compaction, trim, clear)."""
+        self._checkpoint_reason = reason
+    
+    def _system(self, summary: str) -> Dict[str, str]:
+        """The system message, frozen until the next checkpoint."""
+        if self._system_message is None or self._checkpoint_reason is not None:
+            content = self.system_prompt
+            if summary:
+                content += f"\n\nEarlier in this conversation:\n{summary}"
+            self._system_message = {'role': 'system', 'content': content}
+            self._system_tokens = self.counter.count(content) + MESSAGE_OVERHEAD
+        return self._system_message
+    
+    def build(self, history: ConversationHistory, context: str = '') -> List[Dict[str, str]]:
+        """Assemble the request messages and measure prefix reuse.
+        
+        context (recalled earlier conversation) is prepended to the newest
+        message for this request only; history itself is not changed.
+        """
+        reason = self._checkpoint_reason
+        messages = [self._system(history.summary)] + history.messages
+        context_tokens = 0
+        if context and len(messages) > 1:
+            latest = messages[-1]
+            messages[-1] = {
+                'role': latest['role'],
+                'content': f"(Recalled from earlier conversation:\n{context})\n\n{latest['content']}"
+            }
+            context_tokens = self.counter.count(context)
+        
+        # Length of the prefix shared with the previous request
+        previous = self._last_prompt
+        shared = 0
+        limit = min(len(previous), len(messages))
+        while shared < limit and (
+            previous[shared] is messages[shared] or previous[shared] == messages[shared]
+        ):
+            shared += 1
+        
+        if previous and shared < len(previous):
+            # The previous request is no longer a prefix of this one
+            if reason is None and shared != self._augmented_at:
+                self.unexpected_rewrites += 1
+                console.print("[yellow]⚠ Prompt prefix changed outside a checkpoint[/yellow]")
+            elif reason is not None:
+                self.checkpoints += 1
+        
+        # Raw token counts come from the history's running totals, so this
+        # stays O(new messages) rather than O(history)
+        total = self._system_tokens + history.messages_raw_total
+        reused = 0
+        if shared:
+            reused = total - history.tail_raw_tokens(len(messages) - shared)
+        total += context_tokens
+        self._prompt_estimate = total
+        
+        self.last_turn = {
+            'checkpoint': reason,
+            'shared_messages': shared,
+            'prefix_tokens': self.counter.scaled(reused),
+            'new_tokens': self.counter.scaled(max(total - reused, 0)),
+            'recalled_tokens': self.counter.scaled(context_tokens),
+            'prefill_seconds': None,
+            'cached_tokens': None,
+        }
+        self._last_prompt = messages
+        self._augmented_at = len(messages) - 1 if context_tokens else None
+        self._checkpoint_reason = None
+        return messages
+    
+    @property
+    def prompt_estimate(self) -> int:
+        """Raw tokens of the last built prompt (for calibration)."""
+        return self._prompt_estimate
+    
+    def record_timing(self, ttft: Optional[float], usage: Optional[Dict[str, Any]] = None,
+                      timings: Optional[Dict[str, Any]] = None):
+        """Attach server-side prefill information to the last turn.
+        
+        ttft approximates prefill time when streaming. OpenAI-style
+        usage.prompt_tokens_details.cached_tokens and llama.cpp `timings`
+        (prompt_ms, cache_n) are used when the server provides them.
+        """
+        turn = self.last_turn
+        turn['prefill_seconds'] = ttft
+        details = (usage or {}).get('prompt_tokens_details') or {}
+        if details.get('cached_tokens') is not None:
+            turn['cached_tokens'] = details['cached_tokens']
+        if timings:
+            if timings.get('cache_n') is not None:
+                turn['cached_tokens'] = timings['cache_n']
+            if timings.get('prompt_ms') is not None:
+                turn['prefill_seconds'] = timings['prompt_ms'] / 1000
@@ -0,0 +1,286 @@
+"""
+Recall - Retrieval Memory over Past Exchanges
+
+Every finished exchange is embedded and appended to a vector index; each
+turn the few most relevant ones are handed back to the prompt, so older
+conversation can be remembered without being resent every turn.
+"""
+
+import asyncio
+import json
+import re
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+from rich.console import Console
+
+console = Console()
+
+DEFAULT_RECALL_DIR = Path(__file__).parent.parent / "data" / "recall"
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+# Too common to say anything about what an exchange was about
+_STOPWORDS = frozenset(
+    "a an and are as at be but by can do for from had has have he her him his how i if in "
+    "is it its i'm i'll i've me my no not of on or our so than that the their them then "
+    "there these they this to too was we were what when where which who why will with "
+    "would you your you're yennefer user about did does tell told said say remember know "
+    "something".split()
+)
+
+
+class HashingEmbedder:
+    """Feature-hashed bag of words and word pairs; no model, no training.
+    
+    Tokens are hashed with crc32 (stable across runs, unlike hash()) into
+    dim buckets with a hash-derived sign, weighted 1 + log(tf), and the
+    vector is L2-normalized so a dot product is cosine similarity.
+    """
+    
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.spec = f"hashing-{dim}"
+    
+    def _features(self, text: str) -> List[str]:
+        words = []
+        for word in _WORD_RE.findall(text.lower()):
+            if word in _STOPWORDS:
+                continue
+            # Crude folding so "sister's" and "sisters" match "sister"
+            if word.endswith("'s"):
+                word = word[:-2]
+            elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+                word = word[:-1]
+            words.append(word)
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            features = self._features(text)
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features),
+                                 dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0)
+            counts = np.bincount(hashes % self.dim, weights=signs, minlength=self.dim)
+            # Sublinear term frequency, keeping the sign
+            vectors[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class SentenceEmbedder:
+    """Local sentence-transformers model (CPU is fine for MiniLM-sized models)."""
+    
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.spec = f"st-{model_name.replace('/', '_')}"
+    
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, normalize_embeddings=True,
+                                 convert_to_numpy=True).astype(np.float32)
+
+
+def create_embedder(spec: str, dim: int = 1024):
+    """'hashing' or 'sentence-transformers:<model>'; falls back to hashing."""
+    if spec.startswith('sentence-transformers:'):
+        try:
+            return SentenceEmbedder(spec.split(':', 1)[1])
+        except ImportError:
+            console.print("[yellow]sentence-transformers not installed, using hashed features[/yellow]")
+            console.print("[dim]Run: pip install sentence-transformers[/dim]")
+        except Exception as e:
+            console.print(f"[yellow]Could not load embedding model ({e}), using hashed features[/yellow]")
+    return HashingEmbedder(dim)
+
+
+class RecallIndex:
+    """Append-only vector index with snippets, optionally on disk.
+    
+    On disk (directory given) it is three files per embedder:
+    - vectors.npy   float32 [capacity, dim], memory-mapped
+    - offsets.npy   int64 [capacity], byte offset of each snippet
+    - snippets.jsonl
+    plus meta.json with the row count. Opening memory-maps the arrays
+    without reading them, and snippet text is only read for search hits,
+    so startup doesn't depend on index size. Capacity doubles when full.
+    
+    add() and search() are blocking; remember()/recall() run them on one
+    worker thread so they never block the event loop or race each other.
+    """
+    
+    def __init__(self, embedder, directory: Optional[str] = None, initial_capacity: int = 1024):
+        self.embedder = embedder
+        self.dim = embedder.dim
+        self.directory = Path(directory) / embedder.spec if directory else None
+        self.initial_capacity = initial_capacity
+        
+        self.count = 0
+        self._vectors: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+        self._snippets: List[str] = []  # in-memory mode only
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='recall')
+        
+        self.build_seconds = 0.0
+        self._query_ms: Deque[float] = deque(maxlen=500)
+    
+    # --- storage ----------------------------------------------------------
+    
+    def open(self):
+        """Create or memory-map the index. Blocking."""
+        if self.directory is None:
+            self._vectors = np.zeros((self.initial_capacity, self.dim), dtype=np.float32)
+            self._offsets = np.zeros(self.initial_capacity, dtype=np.int64)
+            return
+        
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta_path = self.directory / 'meta.json'
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            self.count = meta['count']
+            self._vectors = np.load(self.directory / 'vectors.npy', mmap_mode='r+')
+            self._offsets = np.load(self.directory / 'offsets.npy', mmap_mode='r+')
+        else:
+            self._allocate(self.initial_capacity)
+            self._write_meta()
+    
+    def _allocate(self, capacity: int):
+        """(Re)create the arrays with room for capacity rows, keeping existing rows."""
+        if self.directory is None:
+            vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+            offsets = np.zeros(capacity, dtype=np.int64)
+        else:
+            # Write the grown copies next to the old files, then swap them in
+            vectors = np.lib.format.open_memmap(
+                self.directory / 'vectors.tmp.npy', mode='w+', dtype=np.float32, shape=(capacity, self.dim)
+            )
+            offsets = np.lib.format.open_memmap(
+                self.directory / 'offsets.tmp.npy', mode='w+', dtype=np.int64, shape=(capacity,)
+            )
+        if self._vectors is not None and self.count:
+            vectors[:self.count] = self._vectors[:self.count]
+            offsets[:self.count] = self._offsets[:self.count]
+        
+        if self.directory is not None:
+            vectors.flush()
+            offsets.flush()
+            del vectors, offsets
+            self._vectors = self._offsets = None
+            (self.directory / 'vectors.tmp.npy').replace(self.directory / 'vectors.npy')
+            (self.directory / 'offsets.tmp.npy').replace(self.directory / 'offsets.npy')
+            vectors = np.load(self.directory / 'vectors.npy', mmap_mode='r+')
+            offsets = np.load(self.directory / 'offsets.npy', mmap_mode='r+')
+        self._vectors, self._offsets = vectors, offsets
+    
+    def _write_meta(self):
+        meta = {'count': self.count, 'dim': self.dim, 'embedder': self.embedder.spec}
+        temp_path = self.directory / 'meta.tmp'
+        temp_path.write_text(json.dumps(meta))
+        temp_path.replace(self.directory / 'meta.json')
+    
+    @property
+    def capacity(self) -> int:
+        return 0 if self._vectors is None else len(self._vectors)
+    
+    @property
+    def nbytes(self) -> int:
+        """Bytes of vector data in use."""
+        return self.count * self.dim * 4
+    
+    # --- indexing and search ----------------------------------------------
+    
+    def add(self, texts: List[str]) -> int:
+        """Embed and append snippets; returns the new row count. Blocking."""
+        if not texts:
+            return self.count
+        started = time.perf_counter()
+        vectors = self.embedder.embed(texts)
+        
+        needed = self.count + len(texts)
+        if needed > self.capacity:
+            capacity = max(self.capacity, self.initial_capacity)
+            while capacity < needed:
+                capacity *= 2
+            self._allocate(capacity)
+        
+        if self.directory is None:
+            self._snippets.extend(texts)
+        else:
+            with open(self.directory / 'snippets.jsonl', 'ab') as f:
+                for row, text in enumerate(texts):
+                    self._offsets[self.count + row] = f.tell()
+                    f.write(json.dumps({'text': text}).encode('utf-8') + b'\n')
+        self._vectors[self.count:needed] = vectors
+        self.count = needed
+        
+        if self.directory is not None:
+            self._vectors.flush()
+            self._offsets.flush()
+            self._write_meta()
+        self.build_seconds += time.perf_counter() - started
+        return self.count
+    
+    def search(self, text: str, k: int = 3, min_score: float = 0.0) -> List[Tuple[float, str]]:
+        """Top-k (score, snippet) pairs by cosine similarity, best first. Blocking."""
+        started = time.perf_counter()
+        results: List[Tuple[float, str]] = []
+        if self.count:
+            query = self.embedder.embed([text])[0]
+            scores = self._vectors[:self.count] @ query
+            k = min(k, self.count)
+            # Partial sort: only the k best rows are ordered
+            top = np.argpartition(-scores, k - 1)[:k]
+            for row in top[np.argsort(-scores[top])]:
+                score = float(scores[row])
+                if score < min_score:
+                    break
+                results.append((score, self.snippet(int(row))))
+        self._query_ms.append((time.perf_counter() - started) * 1000)
+        return results
+    
+    def snippet(self, row: int) -> str:
+        """Text of one row."""
+        if self.directory is None:
+            return self._snippets[row]
+        with open(self.directory / 'snippets.jsonl', 'rb') as f:
+            f.seek(int(self._offsets[row]))
+            return json.loads(f.readline())['text']
+    
+    async def remember(self, texts: List[str]):
+        """add() on the index's worker thread."""
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.add, texts)
+    
+    async def recall(self, text: str, k: int = 3, min_score: float = 0.0) -> List[Tuple[float, str]]:
+        """search() on the index's worker thread."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.search, text, k, min_score
+        )
+    
+    async def run(self, func, *args):
+        """Run a blocking call (open, close) on the index's worker thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    def query_percentiles(self) -> Tuple[float, float]:
+        """p50 and p95 search latency in ms over recent queries."""
+        if not self._query_ms:
+            return 0.0, 0.0
+        latencies = np.fromiter(self._query_ms, dtype=np.float64)
+        return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 95))
+    
+    def close(self):
+        """Finish queued work and flush to disk. Blocking."""
+        self._executor.shutdown(wait=True)
+        if self.directory is not None and self._vectors is not None:
+            self._vectors.flush()
+            self._offsets.flush()
@@ -0,0 +1,308 @@
+"""
+Router - Multiple LLM Endpoints with Health Checks and Failover
+
+Brain can talk to several OpenAI-compatible servers (llm.endpoints), say
+one LM Studio per GPU box. LLMRouter keeps track of them:
+
+- every endpoint's /models is polled in the background; one that stops
+  answering is taken out of rotation until it answers again
+- time to first token and tokens/second are kept over each endpoint's
+  recent replies, and requests go to the healthy endpoint expected to
+  finish a typical reply soonest, weighted by what it is already running
+- a request that fails, gets no first byte within llm.read_timeout (or
+  stall_timeout if larger; prefill of a long prompt can be slow), or
+  then stalls for router.stall_timeout seconds between chunks, benches
+  its endpoint for router.cooldown seconds (a wedged LM Studio often
+  still lists its models) and Brain retries on the next one. Only a
+  reply that has already been partly spoken is not retried; the next
+  turn goes elsewhere
+
+With a single api_base the router is just that one endpoint.
+"""
+
+import asyncio
+import statistics
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import AsyncIterator, Deque, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from rich.console import Console
+
+console = Console()
+
+# Reply length endpoints are compared on (tokens)
+TYPICAL_REPLY_TOKENS = 100
+
+# HTTP statuses that mean "this server can't answer right now" rather than a bad request
+UNAVAILABLE_STATUSES = (404, 408, 429, 500, 502, 503, 504)
+
+
+class EndpointError(Exception):
+    """The endpoint failed in a way another endpoint may not."""
+
+
+# Errors Brain fails over on
+FAILOVER_ERRORS = (httpx.TransportError, EndpointError)
+
+
+def api_error(status: int, body: str) -> Exception:
+    """Exception for a non-200 chat completion response."""
+    if status in UNAVAILABLE_STATUSES:
+        return EndpointError(f"HTTP {status}: {body[:200]}")
+    return Exception(f"API error: {body}")
+
+
+class Endpoint:
+    """One OpenAI-compatible server and its recent performance."""
+    
+    def __init__(self, api_base: str, model: str = 'auto', name: Optional[str] = None,
+                 window: int = 20):
+        self.api_base = api_base.rstrip('/')
+        self.model = model
+        self.name = name or urlsplit(self.api_base).netloc or self.api_base
+        self.healthy = False
+        self.error: Optional[str] = None
+        # Benched after a failed request until this time.monotonic()
+        self.down_until = 0.0
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.probe_ms: Optional[float] = None
+        
+        # Recent replies: seconds to first token, tokens/second after it
+        self._ttft: Deque[float] = deque(maxlen=window)
+        self._tps: Deque[float] = deque(maxlen=window)
+    
+    @property
+    def available(self) -> bool:
+        return self.healthy and time.monotonic() >= self.down_until
+    
+    @property
+    def ttft(self) -> Optional[float]:
+        return statistics.median(self._ttft) if self._ttft else None
+    
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        return statistics.median(self._tps) if self._tps else None
+    
+    def expected_seconds(self) -> float:
+        """Time to a typical whole reply; 0 until measured, so new endpoints get tried."""
+        ttft, tps = self.ttft, self.tokens_per_second
+        if ttft is None:
+            return 0.0
+        return ttft + (TYPICAL_REPLY_TOKENS / tps if tps else 0.0)
+
+
+class LLMRouter:
+    """Picks an endpoint per request and keeps their health up to date."""
+    
+    def __init__(self, endpoints: List[Endpoint], health_interval: float = 10.0,
+                 health_timeout: float = 3.0, stall_timeout: float = 30.0, cooldown: float = 30.0):
+        self.endpoints = endpoints
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.stall_timeout = stall_timeout
+        self.cooldown = cooldown
+        self.failovers = 0
+        self.client: Optional[httpx.AsyncClient] = None
+        self._health_task: Optional[asyncio.Task] = None
+    
+    @classmethod
+    def from_config(cls, config: dict) -> 'LLMRouter':
+        """Router for llm.endpoints (or llm.api_base) and the `llm.router:` section."""
+        llm = config.get('llm', {})
+        router = llm.get('router', {})
+        model = llm.get('model', 'auto')
+        window = router.get('window', 20)
+        
+        endpoints = []
+        for entry in llm.get('endpoints') or [llm.get('api_base', 'http://localhost:1234/v1')]:
+            if isinstance(entry, str):
+                entry = {'api_base': entry}
+            endpoints.append(Endpoint(entry['api_base'], entry.get('model', model),
+                                      entry.get('name'), window=window))
+        return cls(
+            endpoints,
+            health_interval=router.get('health_interval', 10.0),
+            health_timeout=router.get('health_timeout', 3.0),
+            stall_timeout=router.get('stall_timeout', 30.0),
+            cooldown=router.get('cooldown', 30.0)
+        )
+    
+    async def start(self, client: httpx.AsyncClient) -> bool:
+        """Check every endpoint and keep checking in the background.
+        
+        True if any endpoint answered. Shared routers are started once.
+        """
+        if self._health_task is None:
+            self.client = client
+            await self.check_all()
+            self._health_task = asyncio.create_task(self._health_loop())
+        return any(endpoint.healthy for endpoint in self.endpoints)
+    
+    async def check_all(self):
+        await asyncio.gather(*(self._check(endpoint) for endpoint in self.endpoints))
+    
+    async def _check(self, endpoint: Endpoint):
+        """Probe /models; also picks the endpoint's model when it is 'auto'."""
+        started = time.perf_counter()
+        try:
+            response = await self.client.get(f"{endpoint.api_base}/models", timeout=self.health_timeout)
+            if response.status_code != 200:
+                raise EndpointError(f"HTTP {response.status_code}")
+            models = response.json().get('data', [])
+        except (httpx.HTTPError, EndpointError, ValueError) as e:
+            error = str(e) or type(e).__name__
+            if endpoint.healthy:
+                console.print(f"[yellow]LLM endpoint {endpoint.name} is down: {error}[/yellow]")
+            endpoint.healthy = False
+            endpoint.error = error
+            return
+        
+        endpoint.probe_ms = (time.perf_counter() - started) * 1000
+        if endpoint.model == 'auto' and models:
+            endpoint.model = models[0].get('id', 'local-model')
+        if not endpoint.healthy and endpoint.error is not None:
+            console.print(f"[dim]LLM endpoint {endpoint.name} is back[/dim]")
+        endpoint.healthy = True
+        endpoint.error = None
+    
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await self.check_all()
+    
+    def candidates(self) -> List[Endpoint]:
+        """Endpoints in the order to try them.
+        
+        Available ones first, fastest expected reply first (an endpoint's
+        estimate grows with the requests it is already running); benched
+        and unhealthy ones follow as a last resort.
+        """
+        available = [endpoint for endpoint in self.endpoints if endpoint.available]
+        available.sort(key=lambda endpoint: endpoint.expected_seconds() * (1 + endpoint.in_flight))
+        rest = [endpoint for endpoint in self.endpoints if not endpoint.available]
+        rest.sort(key=lambda endpoint: (not endpoint.healthy, endpoint.down_until))
+        return available + rest
+    
+    @property
+    def primary(self) -> Endpoint:
+        """Where the next request would go."""
+        return self.candidates()[0]
+    
+    def stream_timeout(self, connect_timeout: float, read_timeout: float) -> httpx.Timeout:
+        """Timeout for a streamed request, up to its first byte.
+        
+        The larger of read_timeout and stall_timeout, so prefill of a long
+        prompt gets as long as it did before there was a router; watch()
+        holds later chunks to stall_timeout.
+        """
+        return httpx.Timeout(max(read_timeout, self.stall_timeout), connect=connect_timeout)
+    
+    async def watch(self, lines: AsyncIterator[str]) -> AsyncIterator[str]:
+        """lines of a streamed response, failing once stall_timeout passes between two of them."""
+        lines = lines.__aiter__()
+        try:
+            # The first one is bounded by stream_timeout
+            yield await lines.__anext__()
+        except StopAsyncIteration:
+            return
+        while True:
+            try:
+                line = await asyncio.wait_for(lines.__anext__(), self.stall_timeout)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise EndpointError(f"stalled, no data for {self.stall_timeout:g}s")
+            yield line
+    
+    @contextmanager
+    def request(self, endpoint: Endpoint):
+        """Count a request as running on endpoint."""
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        try:
+            yield endpoint
+        finally:
+            endpoint.in_flight -= 1
+    
+    def record(self, endpoint: Endpoint, ttft: Optional[float], tokens: int, generation: float):
+        """Add a finished reply to the endpoint's rolling stats."""
+        if ttft is None:
+            return
+        endpoint._ttft.append(ttft)
+        if tokens > 1 and generation > 0:
+            endpoint._tps.append(tokens / generation)
+    
+    def failed(self, endpoint: Endpoint, error: Exception):
+        """Bench an endpoint after a failed or stalled request."""
+        endpoint.failures += 1
+        endpoint.error = str(error) or type(error).__name__
+        endpoint.down_until = time.monotonic() + self.cooldown
+        # Counts as a reply that took stall_timeout to start, so an endpoint
+        # that keeps failing sinks in the ranking once it is back
+        endpoint._ttft.append(self.stall_timeout)
+        self.failovers += 1
+        if len(self.endpoints) > 1:
+            console.print(f"[yellow]LLM endpoint {endpoint.name} failed ({endpoint.error}), failing over[/yellow]")
+    
+    def stats(self) -> List[dict]:
+        """Per-endpoint health and performance."""
+        return [
+            {
+                'name': endpoint.name,
+                'api_base': endpoint.api_base,
+                'model': endpoint.model,
+                'healthy': endpoint.healthy,
+                'available': endpoint.available,
+                'error': endpoint.error,
+                'in_flight': endpoint.in_flight,
+                'requests': endpoint.requests,
+                'failures': endpoint.failures,
+                'ttft_ms': round(endpoint.ttft * 1000, 1) if endpoint.ttft is not None else None,
+                'tokens_per_second': round(endpoint.tokens_per_second, 1)
+                if endpoint.tokens_per_second is not None else None,
+                'probe_ms': round(endpoint.probe_ms, 1) if endpoint.probe_ms is not None else None,
+            }
+            for endpoint in self.endpoints
+        ]
+    
+    def prometheus(self) -> List[str]:
+        """Metric lines for the Prometheus snapshot."""
+        lines = [
+            "# HELP yennefer_llm_endpoint_up Endpoint healthy and not benched.",
+            "# TYPE yennefer_llm_endpoint_up gauge",
+        ]
+        lines += [f'yennefer_llm_endpoint_up{{endpoint="{e.name}"}} {int(e.available)}' for e in self.endpoints]
+        lines += [
+            "# HELP yennefer_llm_endpoint_requests_total Requests sent to the endpoint.",
+            "# TYPE yennefer_llm_endpoint_requests_total counter",
+        ]
+        lines += [f'yennefer_llm_endpoint_requests_total{{endpoint="{e.name}"}} {e.requests}' for e in self.endpoints]
+        lines += [
+            "# HELP yennefer_llm_endpoint_failures_total Requests that failed or stalled.",
+            "# TYPE yennefer_llm_endpoint_failures_total counter",
+        ]
+        lines += [f'yennefer_llm_endpoint_failures_total{{endpoint="{e.name}"}} {e.failures}' for e in self.endpoints]
+        lines += [
+            "# HELP yennefer_llm_endpoint_ttft_seconds Median time to first token over recent replies.",
+            "# TYPE yennefer_llm_endpoint_ttft_seconds gauge",
+        ]
+        lines += [f'yennefer_llm_endpoint_ttft_seconds{{endpoint="{e.name}"}} {e.ttft:.6f}'
+                  for e in self.endpoints if e.ttft is not None]
+        lines += [
+            "# HELP yennefer_llm_endpoint_tokens_per_second Median generation speed over recent replies.",
+            "# TYPE yennefer_llm_endpoint_tokens_per_second gauge",
+        ]
+        lines += [f'yennefer_llm_endpoint_tokens_per_second{{endpoint="{e.name}"}} {e.tokens_per_second:.2f}'
+                  for e in self.endpoints if e.tokens_per_second is not None]
+        return lines
+    
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
@@ -0,0 +1,280 @@
+"""
+Scheduler - Admission Control for LLM Requests
+
+LM Studio only generates a few replies at once; anything more just queues
+inside the server until the HTTP read times out. Every request goes
+through an LLMScheduler instead:
+
+- at most max_concurrent requests are in flight; the rest wait in a
+  bounded queue, served round-robin across sessions so one busy client
+  can't starve the others
+- interactive turns always go before background work (summarization),
+  which may only use background_slots at once and is preempted when an
+  interactive turn would otherwise have to wait
+- when the queue is full the newest background request is shed to make
+  room for an interactive one, or the new request is rejected; requests
+  that wait longer than max_wait are shed too
+
+Turned-away requests raise Overloaded right away rather than timing out
+minutes later. Queue depth, wait times and rejections are reported by
+stats(), Brain's status panel and the Prometheus snapshot.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional, Set
+
+from rich.console import Console
+
+from .trace import percentile
+
+console = Console()
+
+INTERACTIVE = 0
+BACKGROUND = 1
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+
+class Overloaded(Exception):
+    """A request was turned away instead of queued (or waited too long).
+    
+    reason is 'rejected' (queue full), 'shed' (made room for an interactive
+    request) or 'timeout' (waited longer than max_wait).
+    """
+    
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+class _Waiter:
+    __slots__ = ('session', 'priority', 'future', 'enqueued', 'task')
+    
+    def __init__(self, session: str, priority: int, future: asyncio.Future, task: Optional[asyncio.Task]):
+        self.session = session
+        self.priority = priority
+        self.future = future
+        self.enqueued = time.perf_counter()
+        self.task = task
+
+
+class LLMScheduler:
+    """Concurrency limit, fair queue and priorities in front of the LLM backend."""
+    
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 32, max_wait: float = 30.0,
+                 background_slots: int = 1, preempt_background: bool = True, window: int = 500):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.background_slots = max(1, min(background_slots, self.max_concurrent))
+        self.preempt_background = preempt_background
+        
+        self.active = 0
+        # Tasks holding a background slot (preemption cancels them)
+        self._background: Set[asyncio.Task] = set()
+        # priority -> session -> waiters; session order is the round-robin order
+        self._queues: Dict[int, 'OrderedDict[str, Deque[_Waiter]]'] = {
+            INTERACTIVE: OrderedDict(), BACKGROUND: OrderedDict()
+        }
+        self._queued = {INTERACTIVE: 0, BACKGROUND: 0}
+        
+        # Recent waits (seconds) per priority, plus lifetime counters
+        self._waits: Dict[int, Deque[float]] = {p: deque(maxlen=window) for p in PRIORITY_NAMES}
+        self._wait_sums = {p: 0.0 for p in PRIORITY_NAMES}
+        self._wait_counts = {p: 0 for p in PRIORITY_NAMES}
+        self.counts = {'admitted': 0, 'enqueued': 0, 'rejected': 0, 'shed': 0, 'timeout': 0, 'preempted': 0}
+    
+    @classmethod
+    def from_config(cls, config: dict) -> 'LLMScheduler':
+        """Scheduler for the `llm.scheduler:` config section."""
+        scheduler = config.get('llm', {}).get('scheduler', {})
+        return cls(
+            max_concurrent=scheduler.get('max_concurrent', 2),
+            max_queue=scheduler.get('max_queue', 32),
+            max_wait=scheduler.get('max_wait', 30.0),
+            background_slots=scheduler.get('background_slots', 1),
+            preempt_background=scheduler.get('preempt_background', True)
+        )
+    
+    @property
+    def queued(self) -> int:
+        return self._queued[INTERACTIVE] + self._queued[BACKGROUND]
+    
+    @asynccontextmanager
+    async def slot(self, session: str = 'default', priority: int = INTERACTIVE):
+        """Hold one of the backend's slots for the duration of a request."""
+        await self.acquire(session, priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+    
+    async def acquire(self, session: str = 'default', priority: int = INTERACTIVE):
+        """Wait for a slot; raises Overloaded if turned away."""
+        task = asyncio.current_task()
+        if self._queued[INTERACTIVE] == 0 and (priority == INTERACTIVE or self._queued[BACKGROUND] == 0) \
+                and self._has_room(priority):
+            self._admit(priority, task, 0.0)
+            return
+        
+        if self.queued >= self.max_queue and not (priority == INTERACTIVE and self._shed_background()):
+            self.counts['rejected'] += 1
+            raise Overloaded('rejected', f"LLM queue full ({self.max_queue} waiting)")
+        
+        waiter = _Waiter(session, priority, asyncio.get_running_loop().create_future(), task)
+        queue = self._queues[priority]
+        queue.setdefault(session, deque()).append(waiter)
+        self._queued[priority] += 1
+        self.counts['enqueued'] += 1
+        
+        if priority == INTERACTIVE and self.preempt_background and self.active >= self.max_concurrent:
+            self._preempt()
+        
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.max_wait)
+        except asyncio.TimeoutError:
+            if self._granted(waiter):
+                return
+            self._remove(waiter)
+            self.counts['timeout'] += 1
+            raise Overloaded('timeout', f"no LLM slot within {self.max_wait:g}s")
+        except asyncio.CancelledError:
+            if self._granted(waiter):
+                # Pass the slot on
+                self.release(priority)
+            else:
+                self._remove(waiter)
+            raise
+    
+    def release(self, priority: int = INTERACTIVE):
+        """Give a slot back and admit whoever is next."""
+        self.active -= 1
+        if priority == BACKGROUND:
+            self._background.discard(asyncio.current_task())
+        self._grant()
+    
+    def _has_room(self, priority: int) -> bool:
+        if self.active >= self.max_concurrent:
+            return False
+        return priority == INTERACTIVE or len(self._background) < self.background_slots
+    
+    def _admit(self, priority: int, task: Optional[asyncio.Task], waited: float):
+        self.active += 1
+        if priority == BACKGROUND and task is not None:
+            self._background.add(task)
+        self.counts['admitted'] += 1
+        self._waits[priority].append(waited)
+        self._wait_sums[priority] += waited
+        self._wait_counts[priority] += 1
+    
+    def _grant(self):
+        """Admit queued requests while there is room: interactive first, sessions in turn."""
+        for priority in (INTERACTIVE, BACKGROUND):
+            queue = self._queues[priority]
+            while queue and self._has_room(priority):
+                session = next(iter(queue))
+                waiters = queue[session]
+                waiter = waiters.popleft()
+                if waiters:
+                    # Back of the line until every other session has had a turn
+                    queue.move_to_end(session)
+                else:
+                    del queue[session]
+                self._queued[priority] -= 1
+                if waiter.future.done():
+                    continue
+                self._admit(priority, waiter.task, time.perf_counter() - waiter.enqueued)
+                waiter.future.set_result(None)
+    
+    def _granted(self, waiter: _Waiter) -> bool:
+        future = waiter.future
+        return future.done() and not future.cancelled() and future.exception() is None
+    
+    def _remove(self, waiter: _Waiter):
+        queue = self._queues[waiter.priority]
+        waiters = queue.get(waiter.session)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            self._queued[waiter.priority] -= 1
+            if not waiters:
+                del queue[waiter.session]
+    
+    def _shed_background(self) -> bool:
+        """Turn away the newest queued background request; False if there is none."""
+        queue = self._queues[BACKGROUND]
+        if not queue:
+            return False
+        session = next(reversed(queue))
+        waiter = queue[session][-1]
+        self._remove(waiter)
+        self.counts['shed'] += 1
+        waiter.future.set_exception(Overloaded('shed', "shed for interactive requests"))
+        return True
+    
+    def _preempt(self):
+        """Cancel one running background request so an interactive one can start."""
+        running = [task for task in self._background if not task.done()]
+        if running:
+            running[0].cancel()
+            self.counts['preempted'] += 1
+    
+    def wait_percentiles(self, priority: int = INTERACTIVE) -> Optional[tuple]:
+        """p50, p95 and p99 queue wait in seconds over recent admissions."""
+        samples = sorted(self._waits[priority])
+        if not samples:
+            return None
+        return percentile(samples, 0.50), percentile(samples, 0.95), percentile(samples, 0.99)
+    
+    def stats(self) -> dict:
+        """Current load, counters and wait percentiles (ms) per priority."""
+        waits = {}
+        for priority, name in PRIORITY_NAMES.items():
+            quantiles = self.wait_percentiles(priority)
+            waits[name] = {
+                'queued': self._queued[priority],
+                'p50_ms': round(quantiles[0] * 1000, 1) if quantiles else None,
+                'p95_ms': round(quantiles[1] * 1000, 1) if quantiles else None,
+                'p99_ms': round(quantiles[2] * 1000, 1) if quantiles else None,
+            }
+        return {
+            'active': self.active,
+            'max_concurrent': self.max_concurrent,
+            'queued': self.queued,
+            'max_queue': self.max_queue,
+            **self.counts,
+            'wait': waits,
+        }
+    
+    def prometheus(self) -> List[str]:
+        """Metric lines for the Prometheus snapshot."""
+        lines = [
+            "# HELP yennefer_llm_active LLM requests in flight.",
+            "# TYPE yennefer_llm_active gauge",
+            f"yennefer_llm_active {self.active}",
+            "# HELP yennefer_llm_queue_depth LLM requests waiting for a slot.",
+            "# TYPE yennefer_llm_queue_depth gauge",
+        ]
+        for priority, name in PRIORITY_NAMES.items():
+            lines.append(f'yennefer_llm_queue_depth{{priority="{name}"}} {self._queued[priority]}')
+        lines += [
+            "# HELP yennefer_llm_requests_total LLM requests by outcome at admission.",
+            "# TYPE yennefer_llm_requests_total counter",
+        ]
+        for outcome in ('admitted', 'rejected', 'shed', 'timeout', 'preempted'):
+            lines.append(f'yennefer_llm_requests_total{{outcome="{outcome}"}} {self.counts[outcome]}')
+        lines += [
+            "# HELP yennefer_llm_queue_wait_seconds Time spent waiting for an LLM slot.",
+            "# TYPE yennefer_llm_queue_wait_seconds summary",
+        ]
+        for priority, name in PRIORITY_NAMES.items():
+            quantiles = self.wait_percentiles(priority)
+            if quantiles is not None:
+                for q, value in zip(('0.5', '0.95', '0.99'), quantiles):
+                    lines.append(
+                        f'yennefer_llm_queue_wait_seconds{{priority="{name}",quantile="{q}"}} {value:.6f}'
+                    )
+            lines.append(f'yennefer_llm_queue_wait_seconds_sum{{priority="{name}"}} {self._wait_sums[priority]:.6f}')
+            lines.append(f'yennefer_llm_queue_wait_seconds_count{{priority="{name}"}} {self._wait_counts[priority]}')
+        return lines
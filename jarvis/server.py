@@ -0,0 +1,708 @@
+"""
+Server - Multi-Session Chat over HTTP and WebSocket
+
+Lets several clients share one LM Studio box. Each session gets its own
+Brain (history, summary, prompt prefix) capped at server.session_context_limit
+tokens; nothing is persisted. Sessions idle past server.idle_timeout are
+closed, and once server.max_sessions is reached the least recently used
+idle session makes way for a new one. All sessions share one pooled
+connection to LM Studio, one endpoint router (llm.endpoints, with health
+checks and failover) and one LLM scheduler (llm.scheduler), which takes
+turns round-robin across sessions and puts turns before summarization.
+A turn the scheduler turns away gets a 503 (HTTP) or an "error" event with
+"overloaded" set (WebSocket) before any text is sent.
+
+HTTP (server.port):
+    POST   /sessions                          -> {"session": id}
+    POST   /chat {"message", "session"?, "stream"?}
+                                              -> text/event-stream of JSON events
+                                                 ("text" chunks, then "done")
+    DELETE /sessions/<id>
+    GET    /health, /stats
+
+WebSocket (server.ws_port), one session per connection; ?session=<id>
+resumes an existing one:
+    send     {"type": "message", "text": ..., "audio": false}, or {"type": "stop"}
+    receive  {"type": "session"}, {"type": "text"}, {"type": "done"}, {"type": "error"}
+             With audio (server.audio), each sentence as {"type": "audio"},
+             binary frames in voice_output.output_format, {"type": "audio_end"}
+    A message sent while a reply is streaming interrupts it, as in the terminal.
+
+Usage: python -m jarvis.server [--config path] [--host 127.0.0.1] [--port 8765] [--ws-port 8766]
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import time
+import uuid
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from rich.console import Console
+
+from .brain import Brain
+from .config import load_config
+from .router import LLMRouter
+from .scheduler import LLMScheduler, Overloaded
+from .tools import ToolRunner
+from .trace import percentile
+from .voice import AudioStream, SentenceSplitter, Voice
+
+console = Console()
+
+MAX_BODY_BYTES = 1024 * 1024
+REASONS = {
+    200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 503: 'Service Unavailable',
+}
+
+
+class ServerBusy(Exception):
+    """Every session slot is taken by a session that is in use."""
+
+
+class HTTPError(Exception):
+    """Answered with this status and message as JSON."""
+    
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def session_config(config: dict) -> dict:
+    """Config for a session's Brain: its own token cap, nothing persisted.
+    
+    The SQLite log and the retrieval index belong to the terminal assistant;
+    sessions live in memory only.
+    """
+    server = config.get('server', {})
+    session = copy.deepcopy(config)
+    llm = session.setdefault('llm', {})
+    llm['context_limit'] = min(server.get('session_context_limit', 8192), llm.get('context_limit', 32000))
+    # Sized for every session at once rather than one conversation
+    llm['max_connections'] = server.get('max_connections', 32)
+    llm['max_keepalive_connections'] = server.get('max_connections', 32)
+    session['memory'] = {'enabled': False, 'retrieval': {'enabled': False}}
+    return session
+
+
+class Session:
+    """One client's conversation."""
+    
+    def __init__(self, session_id: str, brain: Brain):
+        self.id = session_id
+        self.brain = brain
+        self.created = time.monotonic()
+        self.last_active = self.created
+        self.turns = 0
+        # One turn at a time per conversation; a second request waits
+        self.lock = asyncio.Lock()
+        # Open WebSocket connections; a connected session is never idle
+        self.connections = 0
+    
+    @property
+    def idle(self) -> bool:
+        return not self.lock.locked() and not self.connections
+    
+    def touch(self):
+        self.last_active = time.monotonic()
+
+
+class SessionManager:
+    """Creates, finds and evicts sessions."""
+    
+    def __init__(self, config: dict, client, router: LLMRouter, scheduler: LLMScheduler,
+                 max_sessions: int = 32, idle_timeout: float = 600.0,
+                 tools: Optional[ToolRunner] = None):
+        self.config = config
+        self.client = client
+        self.router = router
+        self.scheduler = scheduler
+        self.tools = tools
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions: Dict[str, Session] = {}
+        self.created = 0
+        self.evicted = 0
+        self._closing: set = set()
+    
+    def create(self) -> Session:
+        """New session; raises ServerBusy when full and none is idle."""
+        if len(self.sessions) >= self.max_sessions:
+            idle = [session for session in self.sessions.values() if session.idle]
+            if not idle:
+                raise ServerBusy(f"all {self.max_sessions} sessions are in use")
+            self._discard(min(idle, key=lambda session: session.last_active))
+            self.evicted += 1
+        session_id = uuid.uuid4().hex
+        brain = Brain(self.config, client=self.client, scheduler=self.scheduler, session=session_id,
+                      router=self.router, tools=self.tools)
+        brain.model = self.router.primary.model
+        # Turned-away turns reach run_turn as Overloaded
+        brain.busy_reply = None
+        session = Session(session_id, brain)
+        self.sessions[session.id] = session
+        self.created += 1
+        return session
+    
+    def get(self, session_id: str) -> Optional[Session]:
+        return self.sessions.get(session_id)
+    
+    def remove(self, session_id: str) -> bool:
+        session = self.sessions.get(session_id)
+        if session is None:
+            return False
+        self._discard(session)
+        return True
+    
+    def _discard(self, session: Session):
+        del self.sessions[session.id]
+        task = asyncio.ensure_future(session.brain.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+    
+    async def evict_idle(self):
+        """Close sessions left idle past idle_timeout, until cancelled."""
+        interval = max(min(self.idle_timeout / 4, 30.0), 0.5)
+        while True:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.idle_timeout
+            for session in list(self.sessions.values()):
+                if session.idle and session.last_active < cutoff:
+                    self._discard(session)
+                    self.evicted += 1
+    
+    async def close(self):
+        for session in list(self.sessions.values()):
+            self._discard(session)
+        await asyncio.gather(*self._closing, return_exceptions=True)
+
+
+class AudioRelay:
+    """Sends a reply's audio over a WebSocket sentence by sentence, in order,
+    while later sentences are already being synthesized.
+    """
+    
+    def __init__(self, ws, voice: Voice):
+        self.ws = ws
+        self.voice = voice
+        self.splitter = SentenceSplitter(voice.min_sentence_chars)
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._sentences = 0
+        # Caps downloads in flight like Voice.speak_stream does; waiters get
+        # slots in order, so sentences still start in reply order
+        self._slots = asyncio.Semaphore(voice.pipeline_depth)
+        self._task = asyncio.create_task(self._send_all())
+    
+    def feed(self, text: str):
+        for sentence in self.splitter.feed(text):
+            self._start(sentence)
+    
+    def _start(self, sentence: str):
+        pending = asyncio.ensure_future(self._synthesize(sentence, self._sentences))
+        self._sentences += 1
+        self._queue.put_nowait((sentence, pending))
+    
+    async def _synthesize(self, sentence: str, position: int):
+        """Synthesize once a slot is free; the slot is held until the download ends."""
+        await self._slots.acquire()
+        try:
+            audio = await self.voice.synthesize(sentence, position)
+        except BaseException:
+            self._slots.release()
+            raise
+        if isinstance(audio, AudioStream):
+            audio.finished.add_done_callback(lambda _: self._slots.release())
+        else:
+            self._slots.release()
+        return audio
+    
+    async def finish(self):
+        """Send the rest and wait until it has gone out."""
+        tail = self.splitter.flush()
+        if tail:
+            self._start(tail)
+        self._queue.put_nowait(None)
+        await self._task
+    
+    def cancel(self):
+        """Stop sending and abandon downloads in flight."""
+        self._task.cancel()
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                _abandon(item[1])
+    
+    async def _send_all(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            sentence, pending = item
+            try:
+                audio = await pending
+            except asyncio.CancelledError:
+                _abandon(pending)
+                raise
+            except Exception as e:
+                console.print(f"[yellow]TTS error: {e}[/yellow]")
+                continue
+            if audio is None:
+                continue
+            
+            await self.ws.send(json.dumps({'type': 'audio', 'format': self.voice.output_format, 'text': sentence}))
+            if isinstance(audio, AudioStream):
+                try:
+                    async for chunk in audio:
+                        await self.ws.send(chunk)
+                finally:
+                    if not audio.finished.done():
+                        audio.cancel()
+            else:
+                await self.ws.send(audio)
+            await self.ws.send(json.dumps({'type': 'audio_end'}))
+
+
+def _abandon(pending: asyncio.Future):
+    """Cancel a synthesis that may already have started downloading."""
+    if not pending.done():
+        pending.cancel()
+    elif not pending.cancelled() and isinstance(pending.result(), AudioStream):
+        pending.result().cancel()
+
+
+class YenneferServer:
+    """Chat sessions over HTTP (SSE streaming) and WebSocket."""
+    
+    def __init__(self, config: dict):
+        self.config = config
+        server = config.get('server', {})
+        self.host = server.get('host', '127.0.0.1')
+        self.port = server.get('port', 8765)
+        self.ws_port = server.get('ws_port', 8766)
+        self.max_sessions = server.get('max_sessions', 32)
+        self.idle_timeout = server.get('idle_timeout', 600)
+        self.max_message_chars = server.get('max_message_chars', 4000)
+        
+        # Checks LM Studio once and owns the HTTP client every session shares
+        self.session_config = session_config(config)
+        self.scheduler = LLMScheduler.from_config(config)
+        self.router = LLMRouter.from_config(config)
+        self.tools = ToolRunner.from_config(config)
+        self.brain = Brain(self.session_config, scheduler=self.scheduler, router=self.router, tools=self.tools)
+        self.voice = Voice(config) if server.get('audio', False) else None
+        self.sessions: Optional[SessionManager] = None
+        
+        # Recent turn latencies (seconds) for /stats
+        window = server.get('stats_window', 1000)
+        self._first_text: Deque[float] = deque(maxlen=window)
+        self._turn_seconds: Deque[float] = deque(maxlen=window)
+        self.turns = 0
+        self.active_turns = 0
+        
+        self._http = None
+        self._ws = None
+        self._evictor: Optional[asyncio.Task] = None
+    
+    async def start(self) -> bool:
+        """Connect to LM Studio and open the listeners."""
+        if not await self.brain.initialize():
+            return False
+        if self.voice is not None:
+            await self.voice.initialize()
+        
+        self.sessions = SessionManager(
+            self.session_config, self.brain.client, self.router, self.scheduler,
+            self.max_sessions, self.idle_timeout, self.tools
+        )
+        self._evictor = asyncio.create_task(self.sessions.evict_idle())
+        
+        self._http = await asyncio.start_server(self._handle_http, self.host, self.port)
+        self.port = self._http.sockets[0].getsockname()[1]
+        console.print(f"[green]✓[/green] HTTP on http://{self.host}:{self.port}")
+        
+        if self.ws_port:
+            try:
+                import websockets
+                
+                self._ws = await websockets.serve(self._handle_ws, self.host, self.ws_port)
+                self.ws_port = next(iter(self._ws.sockets)).getsockname()[1]
+                console.print(f"[green]✓[/green] WebSocket on ws://{self.host}:{self.ws_port}")
+            except ImportError:
+                console.print("[yellow]websockets not installed, HTTP only[/yellow]")
+                console.print("[dim]Run: pip install websockets[/dim]")
+        
+        console.print(
+            f"[dim]Sessions: up to {self.max_sessions}, "
+            f"{self.session_config['llm']['context_limit']:,} tokens each, "
+            f"closed after {self.idle_timeout:g}s idle • "
+            f"{self.scheduler.max_concurrent} LLM requests at once, {self.scheduler.max_queue} queued[/dim]"
+        )
+        return True
+    
+    async def serve(self):
+        """Run until cancelled (Ctrl+C)."""
+        if not await self.start():
+            console.print("[red]Failed to start. Is LM Studio running?[/red]")
+            return
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.close()
+    
+    async def close(self):
+        if self._evictor is not None:
+            self._evictor.cancel()
+        if self._ws is not None:
+            self._ws.close()
+            await self._ws.wait_closed()
+        if self._http is not None:
+            self._http.close()
+        if self.sessions is not None:
+            await self.sessions.close()
+        await self.router.close()
+        if self.tools is not None:
+            self.tools.close()
+        await self.brain.close()
+        if self.voice is not None:
+            await self.voice.close()
+    
+    async def run_turn(self, session: Session, message: str,
+                       on_text: Callable[[str], Awaitable[None]]) -> dict:
+        """Stream one reply to on_text and return the closing "done" event.
+        
+        If the turn is cancelled or on_text fails (client gone), history
+        keeps only the text the client received, like an interrupt. Raises
+        Overloaded, before any text, if the scheduler turns the turn away.
+        """
+        async with session.lock:
+            session.touch()
+            brain = session.brain
+            started = time.perf_counter()
+            first_text = None
+            sent: List[str] = []
+            self.active_turns += 1
+            stream = brain.think_stream(message, show_status=False)
+            try:
+                async for chunk in stream:
+                    if first_text is None:
+                        first_text = time.perf_counter() - started
+                    sent.append(chunk)
+                    await on_text(chunk)
+            except BaseException:
+                await stream.aclose()
+                brain.commit_interrupted(''.join(sent))
+                raise
+            finally:
+                self.active_turns -= 1
+                session.touch()
+            
+            elapsed = time.perf_counter() - started
+            if first_text is not None:
+                self._first_text.append(first_text)
+            self._turn_seconds.append(elapsed)
+            self.turns += 1
+            session.turns += 1
+            # Summarize old history while the client reads the reply
+            brain.schedule_compaction()
+            return {
+                'type': 'done',
+                'session': session.id,
+                'text': ''.join(sent),
+                'first_text_ms': round((first_text or elapsed) * 1000, 1),
+                'total_ms': round(elapsed * 1000, 1),
+                'tokens': brain.history.total() + brain.system_tokens,
+                'context_limit': brain.context_limit,
+                'endpoint': brain.last_stream_stats.get('endpoint'),
+            }
+    
+    def stats(self) -> dict:
+        """Sessions, turns and latency percentiles (ms) over recent turns."""
+        def summary(samples: Deque[float]) -> dict:
+            ordered = sorted(samples)
+            if not ordered:
+                return {'p50': None, 'p95': None, 'p99': None, 'n': 0}
+            return {
+                'p50': round(percentile(ordered, 0.50) * 1000, 1),
+                'p95': round(percentile(ordered, 0.95) * 1000, 1),
+                'p99': round(percentile(ordered, 0.99) * 1000, 1),
+                'n': len(ordered),
+            }
+        
+        sessions = self.sessions.sessions.values() if self.sessions else []
+        return {
+            'sessions': len(sessions),
+            'busy_sessions': sum(1 for session in sessions if session.lock.locked()),
+            'max_sessions': self.max_sessions,
+            'sessions_created': self.sessions.created if self.sessions else 0,
+            'sessions_evicted': self.sessions.evicted if self.sessions else 0,
+            'turns': self.turns,
+            'active_turns': self.active_turns,
+            'first_text_ms': summary(self._first_text),
+            'turn_ms': summary(self._turn_seconds),
+            'scheduler': self.scheduler.stats(),
+            'endpoints': self.router.stats(),
+            'tools': self.tools.stats() if self.tools is not None else None,
+            'tts_routes': self.voice.tts_router.stats()
+            if self.voice is not None and self.voice.tts_router is not None else None,
+        }
+    
+    def _message(self, value) -> str:
+        if not isinstance(value, str) or not value.strip():
+            raise HTTPError(400, "message must be a non-empty string")
+        if len(value) > self.max_message_chars:
+            raise HTTPError(413, f"message longer than {self.max_message_chars} characters")
+        return value.strip()
+    
+    # HTTP
+    
+    async def _handle_http(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                headers: Dict[str, str] = {}
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    await self._route(method, path, body, writer)
+                except HTTPError as e:
+                    await _send_json(writer, e.status, {'error': str(e)})
+                    if e.status == 400:
+                        # The stream may be out of step with request boundaries
+                        break
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _route(self, method: str, path: str, body: bytes, writer: asyncio.StreamWriter):
+        path = urlsplit(path).path.rstrip('/') or '/'
+        
+        if path == '/health' and method == 'GET':
+            await _send_json(writer, 200, {'status': 'ok', 'model': self.brain.model,
+                                           'sessions': len(self.sessions.sessions),
+                                           'endpoints_up': sum(e.available for e in self.router.endpoints)})
+        elif path == '/stats' and method == 'GET':
+            await _send_json(writer, 200, self.stats())
+        elif path == '/sessions' and method == 'POST':
+            await _send_json(writer, 200, {'session': self._create_session().id})
+        elif path.startswith('/sessions/') and method == 'DELETE':
+            if not self.sessions.remove(path[len('/sessions/'):]):
+                raise HTTPError(404, "unknown session")
+            await _send_json(writer, 204, None)
+        elif path == '/chat' and method == 'POST':
+            await self._chat(body, writer)
+        elif path in ('/health', '/stats', '/sessions', '/chat') or path.startswith('/sessions/'):
+            raise HTTPError(405, f"{method} not allowed on {path}")
+        else:
+            raise HTTPError(404, f"no route for {path}")
+    
+    def _create_session(self) -> Session:
+        try:
+            return self.sessions.create()
+        except ServerBusy as e:
+            raise HTTPError(503, str(e))
+    
+    async def _chat(self, body: bytes, writer: asyncio.StreamWriter):
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(400, "body must be JSON")
+        if not isinstance(request, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        message = self._message(request.get('message'))
+        
+        if request.get('session'):
+            session = self.sessions.get(request['session'])
+            if session is None:
+                raise HTTPError(404, "unknown session")
+        else:
+            session = self._create_session()
+        
+        if not request.get('stream', True):
+            async def collect(_):
+                pass
+            await _send_json(writer, 200, await self._turn(session, message, collect))
+            return
+        
+        # The head waits for the first event so a turned-away turn can still get a 503
+        head = _head(200, {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Transfer-Encoding': 'chunked',
+            'X-Session-Id': session.id,
+        })
+        
+        async def send(event: dict):
+            nonlocal head
+            data = f"data: {json.dumps(event)}\n\n".encode()
+            writer.write(head + f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            head = b''
+            await writer.drain()
+        
+        async def on_text(chunk: str):
+            await send({'type': 'text', 'text': chunk})
+        
+        await send(await self._turn(session, message, on_text))
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+    
+    async def _turn(self, session: Session, message: str,
+                    on_text: Callable[[str], Awaitable[None]]) -> dict:
+        try:
+            return await self.run_turn(session, message, on_text)
+        except Overloaded as e:
+            raise HTTPError(503, f"LLM busy ({e.reason}): {e}")
+    
+    # WebSocket
+    
+    async def _handle_ws(self, ws, *_):
+        from websockets.exceptions import ConnectionClosed
+        
+        # websockets >= 13 has ws.request.path; older versions ws.path
+        path = getattr(getattr(ws, 'request', None), 'path', None) or getattr(ws, 'path', '/')
+        session_id = parse_qs(urlsplit(path).query).get('session', [None])[0]
+        if session_id:
+            session = self.sessions.get(session_id)
+            if session is None:
+                await ws.close(4404, "unknown session")
+                return
+        else:
+            try:
+                session = self.sessions.create()
+            except ServerBusy as e:
+                await ws.close(1013, str(e))
+                return
+        
+        session.connections += 1
+        turn: Optional[asyncio.Task] = None
+        try:
+            await ws.send(json.dumps({'type': 'session', 'session': session.id}))
+            async for raw in ws:
+                if isinstance(raw, bytes):
+                    continue
+                try:
+                    request = json.loads(raw) if raw.lstrip().startswith('{') else {'text': raw}
+                    kind = request.get('type', 'message')
+                    if kind not in ('message', 'stop'):
+                        raise HTTPError(400, f"unknown message type {kind!r}")
+                    message = self._message(request.get('text')) if kind == 'message' else None
+                except (ValueError, HTTPError) as e:
+                    await ws.send(json.dumps({'type': 'error', 'error': str(e)}))
+                    continue
+                
+                # A stop, or a new message barging in
+                if turn is not None and not turn.done():
+                    turn.cancel()
+                    await asyncio.gather(turn, return_exceptions=True)
+                if message is not None:
+                    audio = bool(request.get('audio')) and self.voice is not None
+                    turn = asyncio.create_task(self._ws_turn(ws, session, message, audio))
+        except ConnectionClosed:
+            pass
+        finally:
+            if turn is not None and not turn.done():
+                turn.cancel()
+                await asyncio.gather(turn, return_exceptions=True)
+            session.connections -= 1
+            session.touch()
+    
+    async def _ws_turn(self, ws, session: Session, message: str, audio: bool):
+        relay = AudioRelay(ws, self.voice) if audio else None
+        
+        async def on_text(chunk: str):
+            await ws.send(json.dumps({'type': 'text', 'text': chunk}))
+            if relay is not None:
+                relay.feed(chunk)
+        
+        try:
+            done = await self.run_turn(session, message, on_text)
+            if relay is not None:
+                await relay.finish()
+            await ws.send(json.dumps(done))
+        except asyncio.CancelledError:
+            raise
+        except Overloaded as e:
+            await ws.send(json.dumps({'type': 'error', 'error': f"LLM busy: {e}", 'overloaded': e.reason}))
+        except Exception as e:
+            # Client gone mid-reply; history already holds what it got
+            console.print(f"[dim]Session {session.id[:8]}: {e}[/dim]")
+        finally:
+            if relay is not None:
+                relay.cancel()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    """One HTTP/1.1 request: (method, path, lowercase headers, body), None at EOF."""
+    line = await reader.readline()
+    if not line:
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise HTTPError(400, "malformed request line")
+    method, path, _ = parts
+    
+    headers: Dict[str, str] = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(400, "chunked request bodies are not supported")
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(400, "bad Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(400, "request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method, path, headers, body
+
+
+def _head(status: int, headers: Dict[str, str]) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+
+async def _send_json(writer: asyncio.StreamWriter, status: int, body: Optional[dict]):
+    data = json.dumps(body).encode() if body is not None else b''
+    headers = {'Content-Length': str(len(data))}
+    if data:
+        headers['Content-Type'] = 'application/json'
+    writer.write(_head(status, headers) + data)
+    await writer.drain()
+
+
+def cli():
+    """Server entry point."""
+    parser = argparse.ArgumentParser(description="Yennefer chat server (HTTP and WebSocket)")
+    parser.add_argument('--config', help="config file (default: config/jarvis.yaml)")
+    parser.add_argument('--host', help="address to listen on")
+    parser.add_argument('--port', type=int, help="HTTP port")
+    parser.add_argument('--ws-port', type=int, help="WebSocket port (0 disables)")
+    args = parser.parse_args()
+    
+    config = load_config(args.config)
+    server = config.setdefault('server', {})
+    for key in ('host', 'port', 'ws_port'):
+        if getattr(args, key) is not None:
+            server[key] = getattr(args, key)
+    
+    try:
+        asyncio.run(YenneferServer(config).serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,614 @@
+"""
+Speech - Local Voice Input (VAD + On-Device Speech-to-Text)
+
+The engine behind `voice_input.engine: local`. Audio from the microphone
+(or a WAV file, for headless benchmarks) is written into a ring buffer;
+a voice activity detector splits it into utterances, and each utterance
+is transcribed on the CPU by a local Whisper model (faster-whisper) in a
+worker pool.
+
+While the user is still talking, the utterance so far is re-transcribed
+every partial_interval_ms and the partial transcripts are streamed out.
+Partials keep running through the closing pause, so by the time the
+pause is long enough to end the utterance one of them usually covers all
+of the speech already: it becomes the final transcript at once and the
+LLM request starts without waiting for another transcription.
+
+With voice_input.wake_word enabled, nothing is transcribed until the
+wake word is heard (see wakeword.py); then the next utterance is.
+"""
+
+import asyncio
+import importlib.util
+import queue
+import threading
+import time
+import wave
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import Deque, Iterator, Optional, Set
+
+import numpy as np
+from rich.console import Console
+
+from .trace import percentile
+
+console = Console()
+
+
+def load_wav(path: str, sample_rate: int) -> np.ndarray:
+    """A WAV file as mono int16 samples at sample_rate."""
+    with wave.open(str(path), 'rb') as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        raw = f.readframes(f.getnframes())
+    if width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32)
+    elif width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) * 256
+    elif width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / 65536
+    else:
+        raise ValueError(f"{path}: unsupported sample width ({width * 8}-bit)")
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate and len(samples):
+        duration = len(samples) / rate
+        positions = np.arange(int(duration * sample_rate)) * (rate / sample_rate)
+        samples = np.interp(positions, np.arange(len(samples)), samples)
+    return np.clip(samples, -32768, 32767).astype(np.int16)
+
+
+class AudioRing:
+    """Fixed-size ring of int16 samples, addressed by absolute sample index."""
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.int16)
+        self.total = 0  # samples written so far
+    
+    def write(self, samples: np.ndarray):
+        count = len(samples)
+        samples = samples[-self.capacity:]
+        position = (self.total + count - len(samples)) % self.capacity
+        first = min(len(samples), self.capacity - position)
+        self.buffer[position:position + first] = samples[:first]
+        self.buffer[:len(samples) - first] = samples[first:]
+        self.total += count
+    
+    def read(self, start: int, end: int) -> np.ndarray:
+        """Copy of samples [start, end); anything already overwritten is skipped."""
+        start = max(start, self.total - self.capacity, 0)
+        end = min(end, self.total)
+        if end <= start:
+            return np.zeros(0, dtype=np.int16)
+        return self.buffer[np.arange(start, end) % self.capacity]
+
+
+class EnergyVAD:
+    """Speech when a frame's RMS clears an adaptive noise floor by `ratio`."""
+    
+    spec = 'energy'
+    
+    def __init__(self, ratio: float = 3.0, min_rms: float = 300.0):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.noise: Optional[float] = None
+    
+    def is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(frame.astype(np.float32) ** 2)))
+        if self.noise is None:
+            self.noise = max(rms, 1.0)
+        speech = rms > max(self.noise * self.ratio, self.min_rms)
+        if not speech:
+            # The floor follows background noise, not the voice
+            self.noise = max(self.noise + 0.05 * (rms - self.noise), 1.0)
+        return speech
+
+
+class WebRtcVAD:
+    """Google's WebRTC VAD (pip install webrtcvad); frames must be 10, 20 or 30 ms."""
+    
+    spec = 'webrtc'
+    
+    def __init__(self, sample_rate: int, aggressiveness: int = 2):
+        import webrtcvad
+        
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sample_rate = sample_rate
+    
+    def is_speech(self, frame: np.ndarray) -> bool:
+        return self.vad.is_speech(frame.tobytes(), self.sample_rate)
+
+
+class WhisperTranscriber:
+    """faster-whisper on the CPU; one model shared by all worker threads."""
+    
+    def __init__(self, model: str = 'base.en', compute_type: str = 'int8', cpu_threads: int = 4,
+                 workers: int = 2, language: Optional[str] = 'en', beam_size: int = 1):
+        self.model_name = model
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.workers = workers
+        self.language = language or None
+        self.beam_size = beam_size
+        self.model = None
+    
+    @property
+    def spec(self) -> str:
+        return f"faster-whisper {self.model_name} ({self.compute_type})"
+    
+    def load(self):
+        """Load the model (downloads it the first time). Blocking."""
+        if self.model is not None:
+            return
+        from faster_whisper import WhisperModel
+        
+        self.model = WhisperModel(
+            self.model_name, device='cpu', compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads, num_workers=self.workers
+        )
+    
+    def transcribe(self, audio: np.ndarray) -> str:
+        """Text of int16 mono 16 kHz audio. Blocking, thread-safe."""
+        segments, _ = self.model.transcribe(
+            audio.astype(np.float32) / 32768.0,
+            language=self.language,
+            beam_size=self.beam_size,
+            vad_filter=False,
+            condition_on_previous_text=False,
+            without_timestamps=True
+        )
+        return ' '.join(segment.text.strip() for segment in segments).strip()
+
+
+class MicrophoneSource:
+    """Microphone blocks through sounddevice (pip install sounddevice)."""
+    
+    def __init__(self, sample_rate: int, block: int, device=None):
+        self.sample_rate = sample_rate
+        self.block = block
+        self.device = device
+        self._blocks: queue.Queue = queue.Queue()
+        self._stream = None
+    
+    def start(self):
+        import sounddevice
+        
+        def callback(indata, frames, time_info, status):
+            self._blocks.put(indata[:, 0].copy())
+        
+        self._stream = sounddevice.InputStream(
+            samplerate=self.sample_rate, channels=1, dtype='int16',
+            blocksize=self.block, device=self.device, callback=callback
+        )
+        self._stream.start()
+    
+    def __iter__(self) -> Iterator[np.ndarray]:
+        while True:
+            block = self._blocks.get()
+            if block is None:
+                return
+            yield block
+    
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+        self._blocks.put(None)
+
+
+class WavSource:
+    """A WAV file played in as if it were the microphone.
+    
+    realtime paces blocks at 1x so latencies mean what they would live;
+    otherwise the file is read as fast as the pipeline takes it.
+    """
+    
+    def __init__(self, path: str, sample_rate: int, block: int, realtime: bool = True):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.block = block
+        self.realtime = realtime
+        self.samples = np.zeros(0, dtype=np.int16)
+        self._closed = False
+    
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / self.sample_rate
+    
+    def start(self):
+        self.samples = load_wav(self.path, self.sample_rate)
+    
+    def __iter__(self) -> Iterator[np.ndarray]:
+        started = time.perf_counter()
+        for offset in range(0, len(self.samples), self.block):
+            if self._closed:
+                return
+            if self.realtime:
+                delay = started + (offset + self.block) / self.sample_rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            yield self.samples[offset:offset + self.block]
+    
+    def close(self):
+        self._closed = True
+
+
+class Transcript:
+    """A partial or final transcript of one utterance.
+    
+    start/end are seconds into the audio. For finals, latency is seconds
+    from the end of speech to the transcript being ready, of which
+    endpoint was the pause that ended the utterance. A wake transcript
+    (empty text) says the wake word was just heard.
+    """
+    
+    __slots__ = ('text', 'final', 'utterance', 'start', 'end', 'latency', 'endpoint', 'from_partial', 'wake')
+    
+    def __init__(self, text: str, final: bool, utterance: int, start: float, end: float,
+                 latency: Optional[float] = None, endpoint: Optional[float] = None,
+                 from_partial: bool = False, wake: bool = False):
+        self.text = text
+        self.final = final
+        self.utterance = utterance
+        self.start = start
+        self.end = end
+        self.latency = latency
+        self.endpoint = endpoint
+        self.from_partial = from_partial
+        self.wake = wake
+
+
+class _Utterance:
+    """Segmentation and transcription state of one utterance (guarded by SpeechInput._lock)."""
+    
+    def __init__(self, number: int, start: int, last_voiced: int, voiced_at: float):
+        self.number = number
+        self.start = start
+        self.last_voiced = last_voiced      # sample index just past the last speech frame
+        self.voiced_at = voiced_at          # perf_counter when that frame came in
+        self.ended_at: Optional[float] = None
+        self.end: Optional[int] = None
+        self.audio: Optional[np.ndarray] = None
+        self.partial_at = start             # where the last partial was started
+        self.partial_end: Optional[int] = None  # partial in flight covers up to here
+        self.best = ''                      # newest finished partial
+        self.best_end: Optional[int] = None
+        self.finalized = False
+
+
+class SpeechInput:
+    """Microphone or WAV in, partial and final transcripts out (see module docstring).
+    
+    Capture and segmentation run on one thread, transcription on a pool of
+    `workers` threads; transcripts arrive on the event loop through next().
+    """
+    
+    def __init__(self, source, transcriber, vad, sample_rate: int = 16000, frame_ms: int = 30,
+                 min_speech_ms: int = 200, silence_ms: int = 500, pre_roll_ms: int = 300,
+                 max_utterance_s: float = 30.0, partial_interval_ms: int = 400,
+                 buffer_s: float = 60.0, workers: int = 2, window: int = 200,
+                 wake=None, listen_s: float = 6.0):
+        self.source = source
+        self.transcriber = transcriber
+        self.vad = vad
+        self.sample_rate = sample_rate
+        ms = sample_rate // 1000
+        self.frame = frame_ms * ms
+        self.min_speech = min_speech_ms * ms
+        self.silence = silence_ms * ms
+        self.pre_roll = pre_roll_ms * ms
+        self.tail = min(self.silence, 100 * ms)
+        self.max_utterance = int(max_utterance_s * sample_rate)
+        self.partial_interval = partial_interval_ms * ms
+        self.ring = AudioRing(int(buffer_s * sample_rate))
+        self.workers = workers
+        # True while replies play without barge-in: speech is ignored
+        self.paused = False
+        # Optional WakeWordDetector: asleep, nothing is transcribed until it fires
+        self.wake = wake
+        self.awake = wake is None
+        self.listen = int(listen_s * sample_rate)
+        self._awake_until = 0
+        self._wake_at = 0
+        
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._transcripts: Optional[asyncio.Queue] = None
+        self._lock = threading.RLock()
+        self._jobs: Set[Future] = set()
+        self._utterance: Optional[_Utterance] = None
+        self._utterances = 0
+        self._vad_position = 0
+        self._speech_run = 0
+        self._run_start = 0
+        
+        # Finals: seconds from end of speech to transcript, and how many came from a partial
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._endpoints: Deque[float] = deque(maxlen=window)
+        self.stats = {'finals': 0, 'from_partial': 0, 'empty': 0, 'partials': 0, 'wakes': 0,
+                      'transcribe_seconds': 0.0, 'audio_seconds': 0.0}
+    
+    @classmethod
+    def from_config(cls, config: dict, wav: Optional[str] = None,
+                    realtime: bool = True) -> Optional['SpeechInput']:
+        """Engine for the `voice_input:` section; None (with a hint) if a dependency is missing."""
+        sample_rate = config.get('sample_rate', 16000)
+        frame_ms = config.get('frame_ms', 30)
+        block = frame_ms * sample_rate // 1000
+        
+        if importlib.util.find_spec('faster_whisper') is None:
+            console.print("[yellow]faster-whisper not installed, voice input off[/yellow]")
+            console.print("[dim]Run: pip install faster-whisper[/dim]")
+            return None
+        transcriber = WhisperTranscriber(
+            config.get('model', 'base.en'),
+            compute_type=config.get('compute_type', 'int8'),
+            cpu_threads=config.get('cpu_threads', 4),
+            workers=config.get('workers', 2),
+            language=config.get('language', 'en'),
+            beam_size=config.get('beam_size', 1)
+        )
+        
+        vad = EnergyVAD(config.get('vad_threshold', 3.0), config.get('vad_min_rms', 300.0))
+        if config.get('vad', 'energy') == 'webrtc':
+            try:
+                vad = WebRtcVAD(sample_rate, config.get('vad_aggressiveness', 2))
+            except ImportError:
+                console.print("[yellow]webrtcvad not installed, using the energy VAD[/yellow]")
+                console.print("[dim]Run: pip install webrtcvad[/dim]")
+        
+        wav = wav or config.get('wav') or None
+        if wav:
+            source = WavSource(wav, sample_rate, block, realtime=realtime)
+        elif importlib.util.find_spec('sounddevice') is None:
+            console.print("[yellow]sounddevice not installed, voice input off[/yellow]")
+            console.print("[dim]Run: pip install sounddevice[/dim]")
+            return None
+        else:
+            source = MicrophoneSource(sample_rate, block, config.get('device'))
+        
+        wake_config = config.get('wake_word', {})
+        wake = None
+        if wake_config.get('enabled', False):
+            from .wakeword import WakeWordDetector
+            
+            wake = WakeWordDetector.from_config(wake_config, sample_rate)
+        
+        return cls(
+            source, transcriber, vad,
+            sample_rate=sample_rate,
+            frame_ms=frame_ms,
+            min_speech_ms=config.get('min_speech_ms', 200),
+            silence_ms=config.get('silence_ms', 500),
+            pre_roll_ms=config.get('pre_roll_ms', 300),
+            max_utterance_s=config.get('max_utterance_s', 30.0),
+            partial_interval_ms=config.get('partial_interval_ms', 400),
+            buffer_s=config.get('buffer_s', 60.0),
+            workers=config.get('workers', 2),
+            wake=wake,
+            listen_s=wake_config.get('listen_s', 6.0)
+        )
+    
+    @property
+    def spec(self) -> str:
+        spec = f"{self.transcriber.spec}, {self.vad.spec} VAD"
+        return f"{spec}, {self.wake.spec}" if self.wake is not None else spec
+    
+    async def start(self):
+        """Load the model, open the source and start listening."""
+        self._loop = asyncio.get_running_loop()
+        self._transcripts = asyncio.Queue()
+        
+        def open_input():
+            self.transcriber.load()
+            self.source.start()
+        
+        await self._loop.run_in_executor(None, open_input)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='stt')
+        self._thread = threading.Thread(target=self._run, name='speech', daemon=True)
+        self._thread.start()
+    
+    async def next(self) -> Optional[Transcript]:
+        """Next partial or final transcript; None once the input has ended."""
+        transcript = await self._transcripts.get()
+        if transcript is None:
+            # Keep reporting the end to any later caller
+            self._transcripts.put_nowait(None)
+        return transcript
+    
+    def close(self):
+        """Stop capturing and drop pending transcriptions."""
+        self.source.close()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+    
+    # Capture thread
+    
+    def _run(self):
+        try:
+            for block in self.source:
+                self._feed(block)
+        except Exception as e:
+            console.print(f"[yellow]Voice input stopped: {e}[/yellow]")
+        finally:
+            with self._lock:
+                if self._utterance is not None:
+                    self._end_utterance(time.perf_counter())
+            # Finals still being transcribed come before the end marker
+            while True:
+                with self._lock:
+                    jobs = list(self._jobs)
+                if not jobs:
+                    break
+                wait_futures(jobs)
+            self._emit(None)
+    
+    def _feed(self, block: np.ndarray):
+        now = time.perf_counter()
+        self.ring.write(block)
+        while self.ring.total - self._vad_position >= self.frame:
+            position = self._vad_position
+            frame = self.ring.read(position, position + self.frame)
+            self._vad_position += self.frame
+            with self._lock:
+                self._step(self.vad.is_speech(frame), position, now, frame)
+    
+    def _step(self, speech: bool, position: int, now: float, frame: np.ndarray):
+        """Advance segmentation by one frame."""
+        end = position + self.frame
+        utterance = self._utterance
+        
+        if self.paused:
+            if utterance is not None:
+                utterance.finalized = True
+                self._utterance = None
+            self._speech_run = 0
+            return
+        
+        if not self.awake:
+            if self.wake.feed(frame, speech):
+                self._wake_up(end, now)
+            return
+        
+        if utterance is None:
+            if not speech:
+                self._speech_run = 0
+                if self.wake is not None and end >= self._awake_until:
+                    self._sleep()
+                return
+            if self._speech_run == 0:
+                self._run_start = position
+            self._speech_run += self.frame
+            if self._speech_run >= self.min_speech:
+                self._utterances += 1
+                # Never reaching back into the wake word itself
+                start = max(self._run_start - self.pre_roll, self.ring.total - self.ring.capacity, self._wake_at)
+                self._utterance = _Utterance(self._utterances, start, end, now)
+            return
+        
+        if speech:
+            utterance.last_voiced = end
+            utterance.voiced_at = now
+        if end - utterance.last_voiced >= self.silence or end - utterance.start >= self.max_utterance:
+            self._end_utterance(now)
+        elif end - utterance.partial_at >= self.partial_interval and utterance.partial_end is None:
+            utterance.partial_at = end
+            utterance.partial_end = end
+            self._submit(utterance, self.ring.read(utterance.start, end), end, final=False)
+    
+    def _wake_up(self, position: int, now: float):
+        """Wake word heard: the next utterance (within listen_s) is transcribed."""
+        self.awake = True
+        self.stats['wakes'] += 1
+        self._wake_at = position
+        self._awake_until = position + self.listen
+        self._speech_run = 0
+        self._emit(Transcript('', False, self._utterances + 1, position / self.sample_rate,
+                              position / self.sample_rate, wake=True))
+    
+    def _sleep(self):
+        self.awake = False
+        self.wake.reset()
+    
+    def _end_utterance(self, now: float):
+        utterance, self._utterance = self._utterance, None
+        self._speech_run = 0
+        if self.wake is not None:
+            self._sleep()
+        utterance.ended_at = now
+        utterance.end = min(utterance.last_voiced + self.tail, self.ring.total)
+        utterance.audio = self.ring.read(utterance.start, utterance.end)
+        if utterance.best_end is not None and utterance.best_end >= utterance.last_voiced:
+            self._finalize(utterance, utterance.best, from_partial=True)
+        elif utterance.partial_end is not None and utterance.partial_end >= utterance.last_voiced:
+            pass  # That partial becomes the final when it finishes
+        else:
+            self._submit(utterance, utterance.audio, utterance.end, final=True)
+    
+    # Transcription (worker threads)
+    
+    def _submit(self, utterance: _Utterance, audio: np.ndarray, end: int, final: bool):
+        if not final:
+            self.stats['partials'] += 1
+        try:
+            future = self._pool.submit(self._transcribe, audio)
+        except RuntimeError:
+            return  # Closed
+        self._jobs.add(future)
+        future.add_done_callback(lambda done: self._done(utterance, done, end, final))
+    
+    def _transcribe(self, audio: np.ndarray):
+        started = time.perf_counter()
+        text = self.transcriber.transcribe(audio)
+        return text, time.perf_counter() - started
+    
+    def _done(self, utterance: _Utterance, future: Future, end: int, final: bool):
+        with self._lock:
+            self._jobs.discard(future)
+            if not final:
+                utterance.partial_end = None
+            if future.cancelled():
+                return
+            try:
+                text, seconds = future.result()
+            except Exception as e:
+                console.print(f"[yellow]Transcription failed: {e}[/yellow]")
+                text = None
+            else:
+                self.stats['transcribe_seconds'] += seconds
+                self.stats['audio_seconds'] += (end - utterance.start) / self.sample_rate
+            if utterance.finalized:
+                return
+            
+            if final:
+                self._finalize(utterance, text or '', from_partial=False)
+                return
+            if text is not None and (utterance.best_end is None or end > utterance.best_end):
+                utterance.best, utterance.best_end = text, end
+                if utterance.ended_at is None and text:
+                    self._emit(Transcript(text, False, utterance.number, *self._span(utterance, end)))
+            if utterance.ended_at is not None:
+                if utterance.best_end is not None and utterance.best_end >= utterance.last_voiced:
+                    self._finalize(utterance, utterance.best, from_partial=True)
+                else:
+                    self._submit(utterance, utterance.audio, utterance.end, final=True)
+    
+    def _finalize(self, utterance: _Utterance, text: str, from_partial: bool):
+        utterance.finalized = True
+        if not text.strip():
+            self.stats['empty'] += 1
+            return
+        latency = time.perf_counter() - utterance.voiced_at
+        endpoint = utterance.ended_at - utterance.voiced_at
+        self.stats['finals'] += 1
+        self.stats['from_partial'] += from_partial
+        self._latencies.append(latency)
+        self._endpoints.append(endpoint)
+        self._emit(Transcript(text.strip(), True, utterance.number, *self._span(utterance, utterance.end),
+                              latency=latency, endpoint=endpoint, from_partial=from_partial))
+    
+    def _span(self, utterance: _Utterance, end: int):
+        return utterance.start / self.sample_rate, end / self.sample_rate
+    
+    def _emit(self, transcript: Optional[Transcript]):
+        try:
+            self._loop.call_soon_threadsafe(self._transcripts.put_nowait, transcript)
+        except RuntimeError:
+            pass  # Event loop already closed
+    
+    def latency_percentiles(self) -> Optional[tuple]:
+        """p50 and p95 seconds from end of speech to final transcript, and the median pause."""
+        samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return percentile(samples, 0.50), percentile(samples, 0.95), percentile(sorted(self._endpoints), 0.50)
+    
+    @property
+    def real_time_factor(self) -> Optional[float]:
+        """Transcription seconds per second of audio transcribed."""
+        if not self.stats['audio_seconds']:
+            return None
+        return self.stats['transcribe_seconds'] / self.stats['audio_seconds']
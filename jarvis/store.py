@@ -0,0 +1,273 @@
+"""
+Store - Persistent Conversation Memory (SQLite)
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from rich.console import Console
+
+from .memory import MESSAGE_OVERHEAD
+
+console = Console()
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "data" / "memory.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    tokenizer TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    tokens INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    session INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    message INTEGER NOT NULL,
+    content TEXT,
+    tokens INTEGER,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_kind_message ON events (kind, message);
+"""
+
+# Events that move the start of the live history forward
+BOUNDARY_EVENTS = ('forget', 'summary', 'clear')
+
+
+class SessionStore:
+    """Append-only conversation log in SQLite (WAL mode).
+    
+    Nothing is ever updated or deleted: messages are appended with the token
+    count they were given when first counted, and history changes are
+    appended as events that refer to message ids:
+    - forget   messages up to this id were trimmed
+    - summary  messages up to this id were folded into `content`
+    - clear    everything up to this id was cleared
+    - retract  this one message was withdrawn (interrupted turn)
+    
+    Writes are queued and committed in batches by a background thread, so
+    the event loop never waits on disk. load() reads only the newest
+    messages that fit the context budget, using the primary key and one
+    index, so startup cost doesn't grow with the size of the log.
+    """
+    
+    def __init__(self, path: Optional[str] = None, flush_interval: float = 0.5,
+                 batch_size: int = 256):
+        self.path = Path(path) if path else DEFAULT_DB_PATH
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self.session: Optional[int] = None
+        self._next_id = 1
+        
+        self.stats: Dict[str, Any] = {
+            'stored': 0, 'restored': 0, 'load_ms': 0.0,
+            'writes': 0, 'commits': 0, 'errors': 0
+        }
+    
+    def open(self, tokenizer: str):
+        """Open (or create) the database and start a new session. Blocking."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        
+        cursor = conn.execute(
+            "INSERT INTO sessions (started, tokenizer) VALUES (?, ?)", (time.time(), tokenizer)
+        )
+        self.session = cursor.lastrowid
+        last_id = conn.execute("SELECT MAX(id) FROM messages").fetchone()[0] or 0
+        self._next_id = last_id + 1
+        self.stats['stored'] = last_id
+        self._conn = conn
+        
+        self._writer = threading.Thread(target=self._write_loop, name='memory-store', daemon=True)
+        self._writer.start()
+    
+    def load(self, budget: int, counter) -> Dict[str, Any]:
+        """Read the live summary and the newest messages fitting budget raw tokens. Blocking.
+        
+        Returns {'messages': [(id, role, content, tokens)], 'summary', 'summary_tokens'}
+        with messages oldest first. Counts made with a different tokenizer
+        than counter's are recounted (only for the rows actually loaded).
+        """
+        started = time.perf_counter()
+        with self._lock:
+            conn = self._conn
+            
+            def latest(kind: str) -> int:
+                row = conn.execute("SELECT MAX(message) FROM events WHERE kind = ?", (kind,)).fetchone()
+                return row[0] or 0
+            
+            boundary = max(latest(kind) for kind in BOUNDARY_EVENTS)
+            cleared = latest('clear')
+            
+            summary, summary_tokens = '', 0
+            row = conn.execute(
+                "SELECT message, content, tokens FROM events WHERE kind = 'summary' "
+                "ORDER BY message DESC LIMIT 1"
+            ).fetchone()
+            if row is not None and row[0] > cleared:
+                summary, summary_tokens = row[1], row[2]
+                if self._tokenizer_of(conn, row[0]) != counter.spec:
+                    summary_tokens = counter.count(summary)
+            
+            retracted = {
+                message for (message,) in conn.execute(
+                    "SELECT message FROM events WHERE kind = 'retract' AND message > ?", (boundary,)
+                )
+            }
+            
+            # Newest first, stopping as soon as the budget is spent
+            messages: List[Tuple[int, str, str, int]] = []
+            remaining = budget - summary_tokens
+            rows = conn.execute(
+                "SELECT m.id, m.role, m.content, m.tokens, s.tokenizer "
+                "FROM messages m JOIN sessions s ON s.id = m.session "
+                "WHERE m.id > ? ORDER BY m.id DESC", (boundary,)
+            )
+            for message_id, role, content, tokens, tokenizer in rows:
+                if message_id in retracted:
+                    continue
+                if tokenizer != counter.spec:
+                    tokens = counter.count(content) + MESSAGE_OVERHEAD
+                if tokens > remaining and messages:
+                    break
+                remaining -= tokens
+                messages.append((message_id, role, content, tokens))
+            rows.close()
+        
+        messages.reverse()
+        # Never start on a reply whose question was left behind
+        while messages and messages[0][1] == 'assistant':
+            messages.pop(0)
+        
+        self.stats['restored'] = len(messages)
+        self.stats['load_ms'] = (time.perf_counter() - started) * 1000
+        return {'messages': messages, 'summary': summary, 'summary_tokens': summary_tokens}
+    
+    @staticmethod
+    def _tokenizer_of(conn: sqlite3.Connection, message_id: int) -> Optional[str]:
+        """Tokenizer of the session that wrote a message."""
+        row = conn.execute(
+            "SELECT s.tokenizer FROM messages m JOIN sessions s ON s.id = m.session WHERE m.id = ?",
+            (message_id,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    @property
+    def last_id(self) -> int:
+        """Id of the newest message appended (0 if none)."""
+        return self._next_id - 1
+    
+    def append(self, role: str, content: str, tokens: int) -> int:
+        """Queue a message for writing and return its id."""
+        message_id = self._next_id
+        self._next_id += 1
+        self.stats['stored'] = message_id
+        self._queue(
+            "INSERT INTO messages (id, session, role, content, tokens, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (message_id, self.session, role, content, tokens, time.time())
+        )
+        return message_id
+    
+    def _event(self, kind: str, message_id: int, content: Optional[str] = None,
+               tokens: Optional[int] = None):
+        self._queue(
+            "INSERT INTO events (session, kind, message, content, tokens, created) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.session, kind, message_id, content, tokens, time.time())
+        )
+    
+    def forget(self, message_id: int):
+        """Messages up to message_id were trimmed."""
+        self._event('forget', message_id)
+    
+    def summarize(self, message_id: int, summary: str, tokens: int):
+        """Messages up to message_id were folded into summary."""
+        self._event('summary', message_id, summary, tokens)
+    
+    def clear(self):
+        """Everything so far was cleared."""
+        self._event('clear', self.last_id)
+    
+    def retract(self, message_id: int):
+        """A single message was withdrawn."""
+        self._event('retract', message_id)
+    
+    def _queue(self, sql: str, params: tuple):
+        if self._writer is not None:
+            self._writes.put((sql, params))
+    
+    def _write_loop(self):
+        """Commit queued writes in batches until close() sends None."""
+        running = True
+        while running:
+            item = self._writes.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            # Gather whatever else arrives within flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._writes.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            self._commit(batch)
+    
+    def _commit(self, batch: List[Tuple[str, tuple]]):
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                for sql, params in batch:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            self.stats['writes'] += len(batch)
+            self.stats['commits'] += 1
+        except sqlite3.Error as e:
+            self.stats['errors'] += 1
+            console.print(f"[yellow]Memory store write failed: {e}[/yellow]")
+            try:
+                self._conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+    
+    @property
+    def pending(self) -> int:
+        """Writes queued but not yet committed."""
+        return self._writes.qsize()
+    
+    def close(self):
+        """Flush pending writes and close the database. Blocking."""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,255 @@
+"""
+Text - Reasoning-Tag and Markdown Normalization
+
+Shared by Brain (hiding <think> blocks) and Voice (making text speakable).
+Every pattern is compiled once, and each function makes a single regex
+pass over the text instead of one pass per rule.
+"""
+
+import re
+from typing import List, Optional
+
+# Reasoning tags: <think>, </think>, <thinking>, </thinking>
+_TAG_RE = re.compile(r'<(/?)(think(?:ing)?)>')
+_TAGS = ('<think>', '<thinking>', '</think>', '</thinking>')
+
+# Markdown that TTS would read literally, as one alternation. Line starts
+# are handled together with the line break before them, so list markers
+# and headers can be dropped in the same pass as newline folding. Every
+# branch starts with one of the lookahead's characters, which lets the
+# scan skip ordinary text without trying each branch at every position.
+_SPEECH_RE = re.compile(r"""
+    (?=[\ \n*_`])(?:
+    (?P<nl>\ *\n[ \n]*)
+    (?P<item>\#+\s*|[ \t]*(?:[-*]|\d+\.)\s+)?
+  | \*\*\*(?P<strong>[^*]+)\*\*\*
+  | \*\*(?P<bold>[^*]+)\*\*
+  | \*(?P<italic>[^*]+)\*
+  | (?P<drop>[_`]+)
+  | (?P<spaces>\ {2,})
+    )
+""", re.VERBOSE)
+# The start of the text counts as a line start too
+_LEAD_RE = re.compile(r'(?P<nl>[ \n]*)(?P<item>\#+\s*|[ \t]*(?:[-*]|\d+\.)\s+)?')
+
+# The same rules minus line starts, for text inside emphasis
+_INLINE_RE = re.compile(r'(?P<nl> *\n[ \n]*)|(?P<drop>[_`]+)|(?P<spaces> {2,})')
+
+_PARAGRAPH_RE = re.compile(r'\n{2,}')
+_SPACES_RE = re.compile(r' {2,}')
+
+
+class ThinkingFilter:
+    """Hide reasoning blocks from text that arrives in chunks.
+    
+    Feed raw chunks as they arrive; each call returns only the text that is
+    safe to show. A tag split across chunks is held back until it can be
+    resolved. Set in_think=True for chat templates that open the think block
+    themselves, so the model's output starts mid-thought.
+    
+    - <think>...</think> and <thinking>...</thinking> blocks are hidden
+    - A close tag with no matching open (missing opening tag) hides
+      everything before it; only the first such tag of each kind counts
+    - An unclosed block hides everything after it
+    
+    These agree with strip_thinking except for interleaved <think> and
+    <thinking> blocks, which need the whole reply to resolve.
+    """
+    
+    def __init__(self, in_think: bool = False):
+        self.in_think = in_think
+        self.saw_orphan_close = False
+        # Tag name of the open block; None when the template opened it
+        self._open_tag: Optional[str] = None
+        self._orphans = set()
+        self._buffer = ''
+        self._started = False
+    
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+    
+    def _scan(self, text: str) -> List[str]:
+        """Run the tag state machine over text; return the visible pieces."""
+        visible = []
+        pos = 0
+        for match in _TAG_RE.finditer(text):
+            if not self.in_think:
+                visible.append(text[pos:match.start()])
+            pos = match.end()
+            closing, name = match.groups()
+            if not closing:
+                if not self.in_think:
+                    self.in_think = True
+                    self._open_tag = name
+            elif self.in_think and self._open_tag in (None, name):
+                self.in_think = False
+                if self._open_tag is None:
+                    # The block the template opened counts as this kind's
+                    # missing opening tag
+                    self._orphans.add(name)
+            else:
+                # Close with no matching open: what came before was thinking,
+                # but may already have been shown
+                self.in_think = False
+                if name not in self._orphans:
+                    self._orphans.add(name)
+                    self.saw_orphan_close = True
+                    self._started = False
+                    visible = []
+        if not self.in_think:
+            visible.append(text[pos:])
+        return visible
+    
+    def feed(self, chunk: str) -> str:
+        """Consume a raw chunk and return the newly visible text."""
+        text = self._buffer + chunk
+        
+        # Hold back a trailing partial tag like "<thi" until the next chunk
+        self._buffer = ''
+        cut = text.rfind('<', max(len(text) - 11, 0))
+        if cut != -1:
+            tail = text[cut:]
+            if tail not in _TAGS and any(tag.startswith(tail) for tag in _TAGS):
+                self._buffer = tail
+                text = text[:cut]
+        
+        return self._emit(''.join(self._scan(text)))
+    
+    def flush(self) -> str:
+        """Return any held-back text at end of stream."""
+        text = '' if self.in_think else self._buffer
+        self._buffer = ''
+        return self._emit(text).rstrip()
+
+
+def _without_thinking(text: str) -> str:
+    """Remove reasoning blocks and tags, scanning the text once.
+    
+    The tags are found in one pass; the rules are then applied to that
+    (short) list of tag positions, and the visible text is joined at the end.
+    """
+    tags = [(match.start(), match.end(), match.group(1), match.group(2))
+            for match in _TAG_RE.finditer(text)]
+    if not tags:
+        return text
+    alive = [True] * len(tags)
+    hidden = []
+    
+    # Complete blocks: each open tag pairs with the next close of its kind
+    # (<think> blocks first, then <thinking> among what is left)
+    for kind in ('think', 'thinking'):
+        opened = None
+        for i, (start, end, closing, name) in enumerate(tags):
+            if not alive[i] or name != kind:
+                continue
+            if opened is None:
+                if not closing:
+                    opened = i
+            elif closing:
+                for j in range(opened, i + 1):
+                    alive[j] = False
+                hidden.append((tags[opened][0], end))
+                opened = None
+    
+    # Missing opening tag: drop everything before the first leftover close
+    low, high = 0, len(text)
+    for kind in ('think', 'thinking'):
+        for i, (start, end, closing, name) in enumerate(tags):
+            if alive[i] and closing and name == kind and start >= low:
+                low = end
+                break
+    # Unclosed block (model cut off mid-thought): drop from the open tag on
+    for kind in ('think', 'thinking'):
+        for i, (start, end, closing, name) in enumerate(tags):
+            if alive[i] and not closing and name == kind and low <= start < high:
+                high = start
+                break
+    
+    # Join what is left, skipping hidden blocks and orphan tags
+    skips = sorted(hidden + [(tag[0], tag[1]) for i, tag in enumerate(tags) if alive[i]])
+    visible = []
+    pos = low
+    for start, end in skips:
+        if start >= high:
+            break
+        if start > pos:
+            visible.append(text[pos:start])
+        pos = max(pos, end)
+    if pos < high:
+        visible.append(text[pos:high])
+    return ''.join(visible)
+
+
+def strip_thinking(text: str) -> str:
+    """Remove <think>...</think> blocks from reasoning model output.
+    
+    Handles multiple edge cases:
+    - Complete <think>...</think> blocks
+    - <thinking>...</thinking> variant
+    - Missing opening tag (strip everything before </think>)
+    - Unclosed tags (strip from <think> to end)
+    - Orphan tags
+    """
+    return _without_thinking(text).strip()
+
+
+def _breaks(run: str) -> str:
+    """Blank lines become a pause ('. '), other line breaks a space."""
+    if '\n\n' in run:
+        return _SPACES_RE.sub(' ', '. '.join(' ' if part else '' for part in _PARAGRAPH_RE.split(run)))
+    return ' ' if run else ''
+
+
+def _inline_sub(match) -> str:
+    kind = match.lastgroup
+    if kind == 'drop':
+        return ''
+    if kind == 'spaces':
+        return ' '
+    return _breaks(match.group('nl'))
+
+
+def _speech_sub(match) -> str:
+    kind = match.lastgroup
+    if kind == 'drop':
+        return ''
+    if kind == 'spaces':
+        return ' '
+    if kind in ('strong', 'bold', 'italic'):
+        return _INLINE_RE.sub(_inline_sub, match.group(kind))
+    
+    run = match.group('nl')
+    if kind == 'nl':
+        return _breaks(run)
+    item = match.group('item')
+    if item[0] == '#':
+        if run and run[-1] != '\n':
+            # Indented '#' is not a header
+            return _breaks(run) + item
+        return _breaks(run)
+    # A list item absorbs the blank lines above it into one line break
+    if match.start() == 0:
+        return ''
+    return _breaks(run[:run.index('\n') + 1])
+
+
+def clean_markdown(text: str) -> str:
+    """Remove markdown formatting that TTS would read literally.
+    
+    For text that has no reasoning tags (Brain output already has them
+    removed); see clean_for_speech for raw model output.
+    """
+    lead = _LEAD_RE.match(text)
+    text = _speech_sub(lead) + _SPEECH_RE.sub(_speech_sub, text[lead.end():])
+    if '  ' in text:
+        # Emphasis next to a space can leave a double space behind
+        text = _SPACES_RE.sub(' ', text)
+    return text.strip()
+
+
+def clean_for_speech(text: str) -> str:
+    """Remove thinking tags and markdown formatting that TTS would read literally."""
+    return clean_markdown(_without_thinking(text))
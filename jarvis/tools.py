@@ -0,0 +1,331 @@
+"""
+Tools - Function Calling with Concurrent Plugin Execution
+
+With `tools.enabled`, Brain offers the configured plugins to the model as
+OpenAI-style functions. The tool calls in a reply (streamed or not) are
+collected and all of them run at once, each where it belongs:
+
+- 'async' plugins on the event loop
+- 'io' plugins (blocking file or network access) on a thread pool
+- 'cpu' plugins on a process pool, so they neither hold the GIL nor
+  stall the event loop
+
+Every call has a timeout and its result is capped at max_result_chars.
+All results go back to the model in one follow-up request, so a turn with
+several tool calls waits for the slowest tool rather than the sum of them.
+
+Plugins subclass Tool. Built-in ones are in plugins.py; others are loaded
+from `module:Class` entries in tools.plugins.
+"""
+
+import asyncio
+import importlib
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Deque, Dict, List, Optional
+
+from rich.console import Console
+
+from .trace import percentile
+
+console = Console()
+
+KINDS = ('async', 'io', 'cpu')
+
+
+class Tool:
+    """A function the model can call.
+    
+    Subclasses set name, description and parameters (a JSON schema) and
+    implement run(**arguments): a coroutine for kind 'async', a plain
+    function for 'io' and 'cpu'. 'cpu' tools run in a worker process, so
+    the instance, its arguments and its result must be picklable.
+    """
+    
+    name = ''
+    description = ''
+    parameters: Dict[str, Any] = {'type': 'object', 'properties': {}}
+    kind = 'async'
+    # Seconds and characters; None uses tools.timeout / tools.max_result_chars
+    timeout: Optional[float] = None
+    max_result_chars: Optional[int] = None
+    
+    def __init__(self, config: Optional[dict] = None):
+        """config is the whole `tools:` section, for plugin-specific keys."""
+        self.config = config or {}
+    
+    def definition(self) -> dict:
+        """The tool as listed in a chat completion request."""
+        return {
+            'type': 'function',
+            'function': {'name': self.name, 'description': self.description, 'parameters': self.parameters}
+        }
+    
+    def run(self, **arguments):
+        raise NotImplementedError
+
+
+class ToolCall:
+    """One function call requested by the model."""
+    
+    __slots__ = ('id', 'name', 'arguments')
+    
+    def __init__(self, id: str, name: str, arguments: str):
+        self.id = id
+        self.name = name
+        self.arguments = arguments  # JSON text, as the model wrote it
+    
+    def message(self) -> dict:
+        return {'id': self.id, 'type': 'function', 'function': {'name': self.name, 'arguments': self.arguments}}
+
+
+def parse_tool_calls(message: dict) -> List[ToolCall]:
+    """Tool calls of a non-streamed reply message."""
+    calls = []
+    for number, call in enumerate(message.get('tool_calls') or []):
+        function = call.get('function') or {}
+        arguments = function.get('arguments') or '{}'
+        if not isinstance(arguments, str):
+            arguments = json.dumps(arguments)
+        calls.append(ToolCall(call.get('id') or f"call_{number}", function.get('name', ''), arguments))
+    return calls
+
+
+class ToolCallCollector:
+    """Reassembles tool calls from streamed `delta.tool_calls` fragments."""
+    
+    def __init__(self):
+        self._calls: Dict[int, dict] = {}
+    
+    def feed(self, fragments: List[dict]):
+        for fragment in fragments:
+            call = self._calls.setdefault(fragment.get('index', 0), {'id': None, 'name': '', 'arguments': ''})
+            if fragment.get('id'):
+                call['id'] = fragment['id']
+            function = fragment.get('function') or {}
+            if function.get('name') and not call['name']:
+                call['name'] = function['name']
+            if function.get('arguments'):
+                call['arguments'] += function['arguments']
+    
+    def __bool__(self) -> bool:
+        return bool(self._calls)
+    
+    def calls(self) -> List[ToolCall]:
+        return [
+            ToolCall(call['id'] or f"call_{index}", call['name'], call['arguments'] or '{}')
+            for index, call in sorted(self._calls.items())
+        ]
+
+
+class ToolRunner:
+    """Runs tool calls concurrently and keeps per-tool statistics."""
+    
+    def __init__(self, tools: List[Tool], timeout: float = 10.0, max_result_chars: int = 4000,
+                 threads: int = 8, processes: int = 2, max_rounds: int = 1, window: int = 200):
+        self.tools = {tool.name: tool for tool in tools}
+        self.timeout = timeout
+        self.max_result_chars = max_result_chars
+        self.threads = threads
+        self.processes = processes
+        # Follow-up requests per turn that may call tools again; the last
+        # one is sent without tools so the model has to answer
+        self.max_rounds = max_rounds
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self.counts: Dict[str, Dict[str, int]] = {
+            name: {'calls': 0, 'errors': 0, 'timeouts': 0, 'truncated': 0} for name in self.tools
+        }
+        self._seconds: Dict[str, Deque[float]] = {name: deque(maxlen=window) for name in self.tools}
+        # Wall time of each batch of calls (one reply's worth)
+        self._batches: Deque[float] = deque(maxlen=window)
+    
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['ToolRunner']:
+        """Runner for the `tools:` section; None when tools are off."""
+        section = config.get('tools', {})
+        if not section.get('enabled', False):
+            return None
+        tools = []
+        for entry in section.get('plugins', []):
+            try:
+                tools.append(load_plugin(entry, section))
+            except (ImportError, AttributeError, ValueError) as e:
+                console.print(f"[yellow]Tool plugin {entry} not loaded: {e}[/yellow]")
+        if not tools:
+            return None
+        return cls(
+            tools,
+            timeout=section.get('timeout', 10.0),
+            max_result_chars=section.get('max_result_chars', 4000),
+            threads=section.get('threads', 8),
+            processes=section.get('processes', 2),
+            max_rounds=section.get('max_rounds', 1)
+        )
+    
+    @property
+    def spec(self) -> str:
+        return ', '.join(self.tools)
+    
+    def definitions(self) -> List[dict]:
+        return [tool.definition() for tool in self.tools.values()]
+    
+    async def run(self, calls: List[ToolCall], content: str = '') -> List[dict]:
+        """Messages to append for the follow-up request.
+        
+        The assistant message that made the calls, then one tool message
+        per call in the same order; the calls themselves run concurrently.
+        """
+        started = time.perf_counter()
+        results = await asyncio.gather(*(self._run_one(call) for call in calls))
+        self._batches.append(time.perf_counter() - started)
+        return [{'role': 'assistant', 'content': content, 'tool_calls': [call.message() for call in calls]}] + [
+            {'role': 'tool', 'tool_call_id': call.id, 'content': result}
+            for call, result in zip(calls, results)
+        ]
+    
+    async def _run_one(self, call: ToolCall) -> str:
+        tool = self.tools.get(call.name)
+        if tool is None:
+            return f"Error: there is no tool named {call.name!r}"
+        try:
+            arguments = json.loads(call.arguments) if call.arguments.strip() else {}
+            if not isinstance(arguments, dict):
+                raise ValueError("arguments must be a JSON object")
+        except ValueError as e:
+            return f"Error: invalid arguments ({e})"
+        
+        stats = self.counts[tool.name]
+        stats['calls'] += 1
+        timeout = tool.timeout or self.timeout
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self._dispatch(tool, arguments), timeout)
+        except asyncio.TimeoutError:
+            stats['timeouts'] += 1
+            if tool.kind == 'cpu':
+                self._recycle_processes()
+            result = f"Error: {tool.name} timed out after {timeout:g}s"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            stats['errors'] += 1
+            result = f"Error: {type(e).__name__}: {e}"
+        self._seconds[tool.name].append(time.perf_counter() - started)
+        return self._cap(tool, result)
+    
+    def _dispatch(self, tool: Tool, arguments: dict):
+        """Awaitable running the tool where its kind says."""
+        if tool.kind == 'async':
+            return tool.run(**arguments)
+        loop = asyncio.get_running_loop()
+        if tool.kind == 'cpu':
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.processes)
+            return loop.run_in_executor(self._processes, partial(tool.run, **arguments))
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='tool')
+        return loop.run_in_executor(self._threads, partial(tool.run, **arguments))
+    
+    def _recycle_processes(self):
+        """Swap in a fresh process pool so a runaway call can't hold a worker for later ones.
+        
+        The old pool's workers are terminated, or the stuck one would keep
+        running (and another would pile up on every timeout). Other cpu
+        calls still running in it fail and reach the model as errors.
+        """
+        if self._processes is not None:
+            pool, self._processes = self._processes, None
+            # ProcessPoolExecutor has no public way to stop a running call
+            workers = list((getattr(pool, '_processes', None) or {}).values())
+            pool.shutdown(wait=False, cancel_futures=True)
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+    
+    def _cap(self, tool: Tool, result: Any) -> str:
+        if not isinstance(result, str):
+            result = json.dumps(result, ensure_ascii=False, default=str)
+        limit = tool.max_result_chars or self.max_result_chars
+        if len(result) <= limit:
+            return result
+        self.counts[tool.name]['truncated'] += 1
+        return f"{result[:limit]}\n[truncated, {len(result) - limit:,} more characters]"
+    
+    def percentiles(self, name: Optional[str] = None) -> Optional[tuple]:
+        """p50 and p95 seconds of one tool's calls, or of whole batches."""
+        samples = sorted(self._batches if name is None else self._seconds[name])
+        if not samples:
+            return None
+        return percentile(samples, 0.50), percentile(samples, 0.95)
+    
+    def status_line(self) -> str:
+        """Tools line for Brain's status panel."""
+        calls = sum(stats['calls'] for stats in self.counts.values())
+        line = (f"\n[cyan]Tools:[/cyan] {self.spec} • {calls:,} calls, "
+                f"{sum(stats['errors'] for stats in self.counts.values())} failed, "
+                f"{sum(stats['timeouts'] for stats in self.counts.values())} timed out")
+        batch = self.percentiles()
+        if batch is not None:
+            line += f" • per reply p50 {batch[0] * 1000:.0f} ms / p95 {batch[1] * 1000:.0f} ms"
+        return line
+    
+    def stats(self) -> dict:
+        """Per-tool counters and latency (ms), for the server's /stats."""
+        result = {}
+        for name, stats in self.counts.items():
+            quantiles = self.percentiles(name)
+            result[name] = {
+                **stats,
+                'p50_ms': round(quantiles[0] * 1000, 1) if quantiles else None,
+                'p95_ms': round(quantiles[1] * 1000, 1) if quantiles else None,
+            }
+        return result
+    
+    def prometheus(self) -> List[str]:
+        """Metric lines for the Prometheus snapshot."""
+        lines = [
+            "# HELP yennefer_tool_calls_total Tool calls by outcome.",
+            "# TYPE yennefer_tool_calls_total counter",
+        ]
+        for name, stats in self.counts.items():
+            failed = stats['errors'] + stats['timeouts']
+            lines.append(f'yennefer_tool_calls_total{{tool="{name}",outcome="ok"}} {stats["calls"] - failed}')
+            lines.append(f'yennefer_tool_calls_total{{tool="{name}",outcome="error"}} {stats["errors"]}')
+            lines.append(f'yennefer_tool_calls_total{{tool="{name}",outcome="timeout"}} {stats["timeouts"]}')
+        lines += [
+            "# HELP yennefer_tool_seconds Tool call duration.",
+            "# TYPE yennefer_tool_seconds summary",
+        ]
+        for name in self.tools:
+            quantiles = self.percentiles(name)
+            if quantiles is not None:
+                for q, value in zip(('0.5', '0.95'), quantiles):
+                    lines.append(f'yennefer_tool_seconds{{tool="{name}",quantile="{q}"}} {value:.6f}')
+        return lines
+    
+    def close(self):
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+
+
+def load_plugin(entry: str, config: dict) -> Tool:
+    """A built-in plugin by name, or any Tool subclass as 'package.module:Class'."""
+    if ':' in entry:
+        module_name, class_name = entry.split(':', 1)
+        cls = getattr(importlib.import_module(module_name), class_name)
+    else:
+        from .plugins import BUILTIN
+        
+        if entry not in BUILTIN:
+            raise ValueError(f"unknown built-in (have: {', '.join(BUILTIN)})")
+        cls = BUILTIN[entry]
+    tool = cls(config)
+    if not tool.name or tool.kind not in KINDS:
+        raise ValueError(f"needs a name and a kind in {KINDS}")
+    return tool
@@ -0,0 +1,340 @@
+"""
+Trace - Per-Turn Latency Tracing and Metrics Export
+
+Each turn records when it reached each stage, from the input arriving to
+the last audio buffer being heard. Finished turns are appended to a JSONL
+trace (rotated at max_mb, keeping `backups` old files) and summarized in
+a Prometheus text-format snapshot, and `status` shows p50/p95/p99 of the
+spans between stages.
+
+StartupProfile does the same for startup itself (--profile-startup).
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from rich.console import Console
+from rich.table import Table
+
+console = Console()
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+# In the order a turn normally reaches them
+STAGES = (
+    'input',           # user input received
+    'llm_request',     # chat completion request sent
+    'first_token',     # first token of any kind (thinking included)
+    'tools_start',     # reply's tool calls started (turns that use tools)
+    'tools_end',       # all of them finished
+    'last_token',      # stream finished
+    'tts_request',     # first text handed to TTS
+    'first_audio',     # first audio byte back (or cache hit)
+    'playback_start',  # first buffer started playing
+    'playback_end',    # last buffer heard
+)
+
+# Spans reported in status and metrics: name -> (from stage, to stage, label)
+SPANS: Dict[str, Tuple[str, str, str]] = {
+    'prepare': ('input', 'llm_request', "Input → LLM request"),
+    'ttft': ('llm_request', 'first_token', "LLM time to first token"),
+    'generation': ('first_token', 'last_token', "LLM generation"),
+    'tools': ('tools_start', 'tools_end', "Tool calls"),
+    'tts_wait': ('input', 'tts_request', "Input → TTS request"),
+    'tts_first_byte': ('tts_request', 'first_audio', "TTS time to first byte"),
+    'audio_start': ('first_audio', 'playback_start', "First byte → playback"),
+    'playback': ('playback_start', 'playback_end', "Playback"),
+    'response': ('input', 'playback_start', "Input → first audio heard"),
+    'turn': ('input', 'playback_end', "Whole turn"),
+}
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples (q in 0..1)."""
+    return samples[max(math.ceil(q * len(samples)) - 1, 0)]
+
+
+class TurnTrace:
+    """Stage timestamps (time.perf_counter) of one turn."""
+    
+    def __init__(self, number: int):
+        self.number = number
+        self.wall_time = time.time()
+        self.marks: Dict[str, float] = {'input': time.perf_counter()}
+        self.interrupted = False
+    
+    def mark(self, stage: str, at: Optional[float] = None):
+        """Record a stage; only the first time it is reached counts."""
+        if stage not in self.marks:
+            self.marks[stage] = time.perf_counter() if at is None else at
+    
+    def span(self, name: str) -> Optional[float]:
+        """Seconds between a span's two stages, None if either was missed."""
+        start, end, _ = SPANS[name]
+        if start in self.marks and end in self.marks:
+            return max(self.marks[end] - self.marks[start], 0.0)
+        return None
+    
+    def record(self) -> dict:
+        """JSON-ready form: stage offsets and spans in ms since input."""
+        origin = self.marks['input']
+        stages = {stage: round((self.marks[stage] - origin) * 1000, 2)
+                  for stage in STAGES if stage in self.marks}
+        spans = {}
+        for name in SPANS:
+            seconds = self.span(name)
+            if seconds is not None:
+                spans[name] = round(seconds * 1000, 2)
+        return {
+            'turn': self.number,
+            'time': round(self.wall_time, 3),
+            'interrupted': self.interrupted,
+            'stages_ms': stages,
+            'spans_ms': spans,
+        }
+
+
+class Tracer:
+    """Collects turn traces and exports them.
+    
+    Brain and Voice call mark() at each stage; with no turn in progress
+    (greeting, farewell, prewarm) marks are ignored. Without paths the
+    tracer only keeps in-memory statistics. Files are written on a worker
+    thread so the event loop never waits on disk.
+    """
+    
+    def __init__(self, path: Optional[str] = None, metrics_path: Optional[str] = None,
+                 window: int = 500, max_mb: float = 10.0, backups: int = 2):
+        self.path = Path(path) if path else None
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        # The trace moves to <path>.1 (and .1 to .2, ...) once it would pass max_mb
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.backups = backups
+        self.current: Optional[TurnTrace] = None
+        self.turns = 0
+        self.interrupted = 0
+        
+        # Recent span samples (seconds) for percentiles, plus lifetime sums
+        self._samples: Dict[str, Deque[float]] = {name: deque(maxlen=window) for name in SPANS}
+        self._sums: Dict[str, float] = {name: 0.0 for name in SPANS}
+        self._counts: Dict[str, int] = {name: 0 for name in SPANS}
+        self._starts: Deque[float] = deque(maxlen=window)
+        # Other components' metric lines, appended to every snapshot
+        self._metrics: List[Callable[[], List[str]]] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if self.path or self.metrics_path:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trace')
+    
+    @classmethod
+    def from_config(cls, config: dict) -> 'Tracer':
+        """Tracer for the `tracing:` config section."""
+        tracing = config.get('tracing', {})
+        if not tracing.get('enabled', True):
+            return cls(window=tracing.get('window', 500))
+        return cls(
+            tracing.get('path') or DATA_DIR / "traces.jsonl",
+            tracing.get('metrics_path') or DATA_DIR / "metrics.prom",
+            window=tracing.get('window', 500),
+            max_mb=tracing.get('max_mb', 10.0),
+            backups=tracing.get('backups', 2)
+        )
+    
+    def add_metrics(self, source: Callable[[], List[str]]):
+        """Include source()'s lines in every Prometheus snapshot."""
+        self._metrics.append(source)
+    
+    def begin(self) -> TurnTrace:
+        """Start a turn; its input stage is now."""
+        if self.current is not None:
+            self.end(interrupted=True)
+        self.turns += 1
+        self.current = TurnTrace(self.turns)
+        self._starts.append(self.current.marks['input'])
+        return self.current
+    
+    def mark(self, stage: str, at: Optional[float] = None):
+        """Record a stage of the current turn (no-op between turns)."""
+        if self.current is not None:
+            self.current.mark(stage, at)
+    
+    def end(self, interrupted: bool = False):
+        """Finish the current turn and export it."""
+        trace, self.current = self.current, None
+        if trace is None:
+            return
+        trace.interrupted = interrupted
+        if interrupted:
+            self.interrupted += 1
+        for name in SPANS:
+            seconds = trace.span(name)
+            if seconds is not None:
+                self._samples[name].append(seconds)
+                self._sums[name] += seconds
+                self._counts[name] += 1
+        if self._executor is not None:
+            self._executor.submit(self._export, trace.record(), self.prometheus())
+    
+    def _export(self, record: dict, snapshot: str):
+        try:
+            if self.path is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                line = json.dumps(record) + '\n'
+                self._rotate(len(line))
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line)
+            if self.metrics_path is not None:
+                self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = self.metrics_path.with_suffix('.tmp')
+                temp_path.write_text(snapshot, encoding='utf-8')
+                temp_path.replace(self.metrics_path)
+        except OSError as e:
+            console.print(f"[yellow]Trace export failed: {e}[/yellow]")
+    
+    def _rotate(self, adding: int):
+        """Shift the trace to <path>.1 (dropping the oldest backup) if adding would pass max_bytes."""
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if not self.max_bytes or size + adding <= self.max_bytes:
+            return
+        if self.backups <= 0:
+            self.path.unlink()
+            return
+        for number in range(self.backups - 1, 0, -1):
+            older = self.path.with_name(f"{self.path.name}.{number}")
+            if older.exists():
+                older.replace(self.path.with_name(f"{self.path.name}.{number + 1}"))
+        self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+    
+    def percentiles(self, name: str) -> Optional[Tuple[float, float, float]]:
+        """p50, p95 and p99 of a span in seconds over recent turns."""
+        samples = sorted(self._samples[name])
+        if not samples:
+            return None
+        return percentile(samples, 0.50), percentile(samples, 0.95), percentile(samples, 0.99)
+    
+    def seconds_per_exchange(self) -> Optional[float]:
+        """Median time from one turn's input to the next (reply plus the user's turn)."""
+        starts = list(self._starts)
+        gaps = sorted(b - a for a, b in zip(starts, starts[1:]))
+        if not gaps:
+            return None
+        return gaps[len(gaps) // 2]
+    
+    def prometheus(self) -> str:
+        """Snapshot in Prometheus text exposition format."""
+        lines: List[str] = [
+            "# HELP yennefer_turns_total Turns started.",
+            "# TYPE yennefer_turns_total counter",
+            f"yennefer_turns_total {self.turns}",
+            "# HELP yennefer_turns_interrupted_total Turns cut off by the user.",
+            "# TYPE yennefer_turns_interrupted_total counter",
+            f"yennefer_turns_interrupted_total {self.interrupted}",
+            "# HELP yennefer_span_seconds Time between turn stages.",
+            "# TYPE yennefer_span_seconds summary",
+        ]
+        for name in SPANS:
+            quantiles = self.percentiles(name)
+            if quantiles is not None:
+                for q, value in zip(('0.5', '0.95', '0.99'), quantiles):
+                    lines.append(f'yennefer_span_seconds{{span="{name}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'yennefer_span_seconds_sum{{span="{name}"}} {self._sums[name]:.6f}')
+            lines.append(f'yennefer_span_seconds_count{{span="{name}"}} {self._counts[name]}')
+        for source in self._metrics:
+            lines.extend(source())
+        return "\n".join(lines) + "\n"
+    
+    def status(self):
+        """Print p50/p95/p99 per span."""
+        table = Table(title=f"Latency ({self.turns} turns, {self.interrupted} interrupted)")
+        table.add_column("Stage", style="cyan")
+        for column in ("p50", "p95", "p99", "n"):
+            table.add_column(column, justify="right")
+        for name, (_, _, label) in SPANS.items():
+            quantiles = self.percentiles(name)
+            if quantiles is None:
+                table.add_row(label, "-", "-", "-", "0")
+            else:
+                table.add_row(label, *(f"{value:.2f}s" for value in quantiles),
+                              str(len(self._samples[name])))
+        console.print(table)
+        if self.path is not None:
+            console.print(f"[dim]Trace: {self.path} • metrics: {self.metrics_path}[/dim]")
+    
+    def close(self):
+        """Finish pending exports. Blocking."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+
+class StartupProfile:
+    """Wall-clock breakdown of startup.
+    
+    Components initialize concurrently and some work carries on in the
+    background after the prompt appears, so phases overlap: each is shown
+    with its start offset as well as its duration.
+    """
+    
+    def __init__(self, started: Optional[float] = None):
+        self.started = time.perf_counter() if started is None else started
+        # name -> [start, end or None while still running]
+        self.phases: Dict[str, List[Optional[float]]] = {}
+    
+    def begin(self, name: str):
+        self.phases[name] = [time.perf_counter(), None]
+    
+    def end(self, name: str):
+        if name in self.phases and self.phases[name][1] is None:
+            self.phases[name][1] = time.perf_counter()
+    
+    def mark(self, name: str):
+        """A point in time rather than a phase (e.g. the first prompt)."""
+        now = time.perf_counter()
+        self.phases[name] = [now, now]
+    
+    @contextmanager
+    def phase(self, name: str):
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+    
+    async def timed(self, name: str, awaitable: Awaitable) -> Any:
+        """Await something as a named phase."""
+        with self.phase(name):
+            return await awaitable
+    
+    def track(self, name: str, task: asyncio.Future) -> asyncio.Future:
+        """Time a background task from now until it finishes."""
+        self.begin(name)
+        task.add_done_callback(lambda _: self.end(name))
+        return task
+    
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+    
+    def print(self):
+        """Print phases in the order they started."""
+        table = Table(title=f"Startup ({self.elapsed() * 1000:.0f} ms so far)")
+        table.add_column("Phase", style="cyan")
+        table.add_column("Start", justify="right")
+        table.add_column("Duration", justify="right")
+        for name, (start, end) in sorted(self.phases.items(), key=lambda item: item[1][0]):
+            offset = f"{(start - self.started) * 1000:.0f} ms"
+            if end is None:
+                duration = "[yellow]running[/yellow]"
+            elif end == start:
+                duration = "-"
+            else:
+                duration = f"{(end - start) * 1000:.0f} ms"
+            table.add_row(name, offset, duration)
+        console.print(table)
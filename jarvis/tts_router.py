@@ -0,0 +1,207 @@
+"""
+TTS Router - Synthesis Model per Sentence
+
+With voice_output.routing.enabled, every sentence Voice synthesizes goes
+to the ElevenLabs model that suits its place in the reply:
+
+- 'first': the first first_sentences of a reply use fast_model; nothing
+  plays until they arrive, so time to first audio is all that matters
+- 'short': sentences under short_chars use fast_model too; they are over
+  before any difference in quality is heard
+- 'quality': the rest use quality_model, synthesized while the sentences
+  before them are still playing
+- 'background': phrases cached ahead of time (prewarm) use quality_model,
+  since nobody is waiting for them
+- 'quota': once less than quota_reserve of the subscription's character
+  quota is left, everything uses the cheaper of the two models
+
+Each route counts requests, characters and credits (characters times the
+model's cost per character) and keeps its time to first audio, for the
+`voice` panel, the server's /stats and the Prometheus snapshot.
+"""
+
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from rich.console import Console
+
+from .trace import percentile
+
+console = Console()
+
+ROUTES = ('first', 'short', 'quality', 'background', 'quota')
+
+# Credits per character; the low-latency models bill at half rate
+MODEL_COSTS = {
+    'eleven_flash_v2_5': 0.5,
+    'eleven_flash_v2': 0.5,
+    'eleven_turbo_v2_5': 0.5,
+    'eleven_turbo_v2': 0.5,
+}
+
+
+class TTSRouter:
+    """Chooses a model per sentence and keeps per-route cost and latency."""
+    
+    def __init__(self, fast_model: str = 'eleven_flash_v2_5', quality_model: str = 'eleven_multilingual_v2',
+                 first_sentences: int = 1, short_chars: int = 40, quota_reserve: float = 0.10,
+                 costs: Optional[Dict[str, float]] = None, window: int = 200):
+        self.fast_model = fast_model
+        self.quality_model = quality_model
+        self.first_sentences = first_sentences
+        self.short_chars = short_chars
+        self.quota_reserve = quota_reserve
+        self.costs = {**MODEL_COSTS, **(costs or {})}
+        
+        cheapest = min((fast_model, quality_model), key=self.cost)
+        self.models = {
+            'first': fast_model, 'short': fast_model, 'quality': quality_model,
+            'background': quality_model, 'quota': cheapest,
+        }
+        self.counts: Dict[str, Dict[str, float]] = {
+            route: {'requests': 0, 'cached': 0, 'characters': 0, 'credits': 0.0} for route in ROUTES
+        }
+        # Seconds from request to first audio chunk, per route
+        self._first_audio: Dict[str, Deque[float]] = {route: deque(maxlen=window) for route in ROUTES}
+        
+        # Quota as of the last subscription fetch, plus what was spent since
+        self.quota_used: Optional[int] = None
+        self.quota_limit: Optional[int] = None
+        self._credits_since_sync = 0.0
+    
+    @classmethod
+    def from_config(cls, config: dict) -> Optional['TTSRouter']:
+        """Router for `voice_output.routing:`; None when routing is off."""
+        voice = config.get('voice_output', {})
+        routing = voice.get('routing', {})
+        if not routing.get('enabled', False):
+            return None
+        return cls(
+            fast_model=routing.get('fast_model', 'eleven_flash_v2_5'),
+            quality_model=routing.get('quality_model', 'eleven_multilingual_v2'),
+            first_sentences=routing.get('first_sentences', 1),
+            short_chars=routing.get('short_chars', 40),
+            quota_reserve=routing.get('quota_reserve', 0.10),
+            costs=routing.get('costs')
+        )
+    
+    def cost(self, model: str) -> float:
+        return self.costs.get(model, 1.0)
+    
+    @property
+    def spec(self) -> str:
+        return f"{self.fast_model} → {self.quality_model}"
+    
+    def set_quota(self, used: int, limit: int):
+        """Character quota from the subscription info."""
+        self.quota_used = used
+        self.quota_limit = limit
+        self._credits_since_sync = 0.0
+    
+    @property
+    def quota_left(self) -> Optional[float]:
+        """Fraction of the quota left, None until the subscription info has arrived."""
+        if not self.quota_limit:
+            return None
+        left = self.quota_limit - self.quota_used - self._credits_since_sync
+        return max(left, 0) / self.quota_limit
+    
+    def route(self, text: str, position: Optional[int]) -> Tuple[str, str]:
+        """(route, model) for a sentence at position in its reply; None: not part of a reply."""
+        quota_left = self.quota_left
+        if quota_left is not None and quota_left < self.quota_reserve:
+            name = 'quota'
+        elif position is None:
+            name = 'background'
+        elif position < self.first_sentences:
+            name = 'first'
+        elif len(text) < self.short_chars:
+            name = 'short'
+        else:
+            name = 'quality'
+        return name, self.models[name]
+    
+    def record_request(self, route: str, model: str, characters: int):
+        """A synthesis request went out."""
+        credits = characters * self.cost(model)
+        counts = self.counts[route]
+        counts['requests'] += 1
+        counts['characters'] += characters
+        counts['credits'] += credits
+        self._credits_since_sync += credits
+    
+    def record_cached(self, route: str):
+        """The sentence was already in the audio cache; nothing was spent."""
+        self.counts[route]['cached'] += 1
+    
+    def record_first_audio(self, route: str, seconds: float):
+        self._first_audio[route].append(seconds)
+    
+    def percentiles(self, route: str) -> Optional[tuple]:
+        """p50 and p95 seconds to first audio for a route."""
+        samples = sorted(self._first_audio[route])
+        if not samples:
+            return None
+        return percentile(samples, 0.50), percentile(samples, 0.95)
+    
+    def status_lines(self) -> str:
+        """Routing lines for the voice panel."""
+        lines = f"[cyan]Model routing:[/cyan] {self.spec}"
+        quota_left = self.quota_left
+        if quota_left is not None:
+            lines += f" • {quota_left:.0%} of quota left"
+        lines += "\n"
+        for route in ROUTES:
+            counts = self.counts[route]
+            if not counts['requests'] and not counts['cached']:
+                continue
+            lines += (f"  {route}: {self.models[route]} • {counts['requests']} requests, "
+                      f"{counts['characters']:,} chars, {counts['credits']:,.0f} credits")
+            if counts['cached']:
+                lines += f", {counts['cached']} cached"
+            quantiles = self.percentiles(route)
+            if quantiles is not None:
+                lines += f" • first audio p50 {quantiles[0] * 1000:.0f} ms / p95 {quantiles[1] * 1000:.0f} ms"
+            lines += "\n"
+        return lines
+    
+    def stats(self) -> dict:
+        """Per-route model, cost and latency (ms), for /stats and benchmarks."""
+        result = {}
+        for route in ROUTES:
+            quantiles = self.percentiles(route)
+            result[route] = {
+                'model': self.models[route],
+                **self.counts[route],
+                'credits': round(self.counts[route]['credits'], 1),
+                'first_audio_p50_ms': round(quantiles[0] * 1000, 1) if quantiles else None,
+                'first_audio_p95_ms': round(quantiles[1] * 1000, 1) if quantiles else None,
+            }
+        return result
+    
+    def prometheus(self) -> List[str]:
+        """Metric lines for the Prometheus snapshot."""
+        lines = [
+            "# HELP yennefer_tts_route_requests_total TTS requests by route.",
+            "# TYPE yennefer_tts_route_requests_total counter",
+        ]
+        for route in ROUTES:
+            lines.append(f'yennefer_tts_route_requests_total{{route="{route}",model="{self.models[route]}"}} '
+                         f'{self.counts[route]["requests"]}')
+        lines += [
+            "# HELP yennefer_tts_route_credits_total ElevenLabs credits spent by route.",
+            "# TYPE yennefer_tts_route_credits_total counter",
+        ]
+        for route in ROUTES:
+            lines.append(f'yennefer_tts_route_credits_total{{route="{route}"}} {self.counts[route]["credits"]:.1f}')
+        lines += [
+            "# HELP yennefer_tts_route_first_audio_seconds Request to first audio chunk by route.",
+            "# TYPE yennefer_tts_route_first_audio_seconds summary",
+        ]
+        for route in ROUTES:
+            quantiles = self.percentiles(route)
+            if quantiles is not None:
+                for q, value in zip(('0.5', '0.95'), quantiles):
+                    lines.append(f'yennefer_tts_route_first_audio_seconds{{route="{route}",quantile="{q}"}} '
+                                 f'{value:.6f}')
+        return lines
@@ -7,62 +7,143 @@ Supports:
 """
 
 import asyncio
+import importlib.util
 import os
 os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = '1'  # Suppress pygame welcome message
 import re
-import subprocess
 import sys
-import tempfile
-from pathlib import Path
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from rich.console import Console
 from rich.panel import Panel
 
+from .audio import AudioSink, open_sink
+from .cache import AudioCache
+from .text import clean_for_speech, clean_markdown
+from .trace import StartupProfile, Tracer
+from .tts_router import TTSRouter
+
 console = Console()
 
 
-def clean_for_speech(text: str) -> str:
-    """Remove thinking tags and markdown formatting that TTS would read literally."""
-    # Strip complete thinking blocks
-    text = re.sub(r'<think>.*?</think>', '', text, flags=re.DOTALL)
-    text = re.sub(r'<thinking>.*?</thinking>', '', text, flags=re.DOTALL)
-    # Handle missing opening tag - strip everything before closing tag
-    if '</think>' in text:
-        text = text.split('</think>', 1)[-1]
-    if '</thinking>' in text:
-        text = text.split('</thinking>', 1)[-1]
-    # Handle unclosed tags
-    if '<think>' in text:
-        text = text.split('<think>', 1)[0]
-    if '<thinking>' in text:
-        text = text.split('<thinking>', 1)[0]
-    # Clean up orphan tags
-    text = re.sub(r'</?think(?:ing)?>', '', text)
-    # Strip markdown
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)  # Bold
-    text = re.sub(r'\*([^*]+)\*', r'\1', text)  # Italic
-    text = re.sub(r'_+', '', text)
-    text = re.sub(r'`+', '', text)
-    text = re.sub(r'^#+\s*', '', text, flags=re.MULTILINE)  # Headers
-    text = re.sub(r'^\s*[-*]\s+', '', text, flags=re.MULTILINE)  # Bullets
-    text = re.sub(r'^\s*\d+\.\s+', '', text, flags=re.MULTILINE)  # Numbered lists
-    text = re.sub(r'\n{2,}', '. ', text)  # Multiple newlines to pause
-    text = re.sub(r'\n', ' ', text)  # Single newlines to space
-    text = re.sub(r'  +', ' ', text)
-    return text.strip()
+# Sentence end: terminal punctuation (plus closing quotes/brackets) followed by whitespace
+_SENTENCE_END_RE = re.compile(r'[.!?…]+["\')\]]*\s+')
+
+
+class SentenceSplitter:
+    """Split streamed text into complete sentences for pipelined TTS.
+    
+    Sentences shorter than min_chars are merged with the next one so that
+    "I see." doesn't become its own API request.
+    """
+    
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self._buffer = ''
+    
+    def feed(self, chunk: str) -> List[str]:
+        """Add a chunk and return any sentences it completed."""
+        self._buffer += chunk
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END_RE.finditer(self._buffer):
+            if match.end() - start < self.min_chars:
+                continue
+            sentences.append(self._buffer[start:match.end()].strip())
+            start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+    
+    def flush(self) -> Optional[str]:
+        """Return whatever is left at end of stream."""
+        text = self._buffer.strip()
+        self._buffer = ''
+        return text or None
+
+
+class AudioStream:
+    """Audio chunks arriving from a download running in a worker thread.
+    
+    The worker calls feed()/close(); the event loop iterates the chunks as
+    they arrive. `finished` resolves once the download has ended.
+    """
+    
+    def __init__(self, on_cancel=None):
+        self._loop = asyncio.get_running_loop()
+        self._on_cancel = on_cancel
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._chunks: List[bytes] = []
+        self.error: Optional[Exception] = None
+        self.cancelled = False
+        self.first_chunk_at: Optional[float] = None
+        self.finished = self._loop.create_future()
+    
+    def cancel(self):
+        """Ask the download to stop at the next chunk."""
+        self.cancelled = True
+        if self._on_cancel is not None:
+            self._on_cancel()
+    
+    def feed(self, chunk: bytes):
+        """Add a chunk (safe to call from any thread)."""
+        self._loop.call_soon_threadsafe(self._put, chunk)
+    
+    def close(self, error: Optional[Exception] = None):
+        """Mark the download finished (safe to call from any thread)."""
+        self._loop.call_soon_threadsafe(self._finish, error)
+    
+    def _put(self, chunk: bytes):
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+        self._chunks.append(chunk)
+        self._queue.put_nowait(chunk)
+    
+    def _finish(self, error: Optional[Exception]):
+        if self.finished.done():
+            return
+        self.error = error
+        self._queue.put_nowait(None)
+        self.finished.set_result(None)
+    
+    @property
+    def data(self) -> bytes:
+        """Everything received so far."""
+        return b''.join(self._chunks)
+    
+    async def __aiter__(self):
+        while True:
+            chunk = await self._queue.get()
+            if chunk is None:
+                break
+            yield chunk
+
+
+Audio = Union[bytes, AudioStream]
 
 
 class Voice:
     """Multi-backend TTS - ElevenLabs or macOS native."""
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, tracer: Optional[Tracer] = None):
         self.config = config.get('voice_output', {})
+        self.tracer = tracer or Tracer()
         self.engine = self.config.get('engine', 'elevenlabs')
         
         # ElevenLabs settings
         self.voice_id = self.config.get('voice_id', '')
         self.model = self.config.get('model', 'eleven_turbo_v2_5')
+        # pcm_* plays while still downloading; mp3_* plays once fully downloaded
+        self.output_format = self.config.get('output_format', 'pcm_24000')
+        # http: one request per sentence; websocket: text streamed into one socket per reply
+        self.transport = self.config.get('transport', 'http')
+        self.ws_url = self.config.get('ws_url') or None
+        self.chunk_length_schedule = self.config.get('chunk_length_schedule')
+        self.socket = None
         self.api_key = self.config.get('api_key') or os.environ.get('ELEVENLABS_API_KEY')
         
+        # Model per sentence (voice_output.routing); None speaks everything with model
+        self.tts_router = TTSRouter.from_config(config)
+        
         # Voice tuning parameters
         self.stability = self.config.get('stability', 0.5)
         self.similarity_boost = self.config.get('similarity_boost', 0.75)
@@ -74,16 +155,50 @@ class Voice:
         self.macos_voice = self.config.get('macos_voice', 'Samantha')
         self.rate = self.config.get('rate', 180)
         
+        # Pipelined playback: sentences synthesized ahead while earlier ones play
+        self.streaming = self.config.get('streaming', True)
+        self.pipeline_depth = self.config.get('pipeline_depth', 3)
+        self.min_sentence_chars = self.config.get('min_sentence_chars', 20)
+        
+        # On-disk cache of synthesized audio (repeated phrases cost nothing)
+        self.cache = None
+        if self.config.get('cache', True):
+            self.cache = AudioCache(
+                self.config.get('cache_dir'),
+                int(self.config.get('cache_max_mb', 100) * 1024 * 1024)
+            )
+        # Cache key -> write still on its way to disk
+        self._cache_writes: Dict[str, asyncio.Task] = {}
+        
+        # Audio output: auto picks sounddevice for PCM when installed, else pygame
+        self.audio_backend = self.config.get('audio_backend', 'auto')
+        self.sink: Optional[AudioSink] = None
+        
         self.initialized = False
-        self._pygame_initialized = False
+        # The SDK and the audio device are loaded on first use, off the event loop
         self.client = None
+        self._client_loading: Optional[asyncio.Future] = None
+        self._sink_opening: Optional[asyncio.Future] = None
+        self._background: set = set()
+        self._startup = StartupProfile()
+        
+        # Downloads in flight, and what the current reply has actually played
+        self._streams = set()
+        self._spoken: List[str] = []
         
         # Usage tracking
         self.characters_used_session = 0
         self.subscription_info = None
         
-    async def initialize(self):
-        """Initialize TTS engine."""
+    async def initialize(self, startup: Optional[StartupProfile] = None):
+        """Initialize TTS engine.
+        
+        Returns quickly: the ElevenLabs SDK and the audio device are loaded
+        when the first line is spoken, and the WebSocket connection and
+        subscription info are fetched in the background.
+        """
+        if startup is not None:
+            self._startup = startup
         # Auto-detect engine if voice_id is set
         if self.voice_id and self.api_key:
             self.engine = 'elevenlabs'
@@ -110,32 +225,87 @@ class Voice:
             console.print("[red]✗[/red] ELEVENLABS_API_KEY not set")
             return
         
-        try:
-            from elevenlabs.client import ElevenLabs
-            import pygame
-            
-            self.client = ElevenLabs(api_key=self.api_key)
-            
-            pygame.mixer.init()
-            self._pygame_initialized = True
-            
-            self.initialized = True
-            self.engine = 'elevenlabs'
-            
-            # Fetch and display subscription info
-            await self._fetch_subscription_info()
-            
-            console.print(f"[green]✓[/green] ElevenLabs ready (voice: {self.voice_id[:8]}..., speed: {self.speed}x)")
-            
-        except ImportError as e:
-            console.print(f"[red]✗[/red] Missing package: {e}")
+        # Only check the SDK is there; importing it takes a few hundred ms
+        if importlib.util.find_spec('elevenlabs') is None:
+            console.print("[red]✗[/red] Missing package: elevenlabs")
             console.print("[dim]Run: pip install elevenlabs pygame[/dim]")
+            return
+        
+        self.initialized = True
+        self.engine = 'elevenlabs'
+        
+        if self.transport == 'websocket':
+            if self.tts_router is not None:
+                # One socket per reply speaks with one model
+                console.print("[yellow]Model routing needs voice_output.transport: http, using one model[/yellow]")
+                self.tts_router = None
+            self._in_background('voice: websocket connect', self._init_socket())
+        # Shown by 'credits' and 'voice' once it arrives
+        self._in_background('voice: subscription info', self._fetch_subscription_info(show=False))
+        
+        console.print(f"[green]✓[/green] ElevenLabs ready (voice: {self.voice_id[:8]}..., speed: {self.speed}x, {self.transport})")
+    
+    def _in_background(self, name: str, coro):
+        """Run startup work that nothing has to wait for."""
+        task = self._startup.track(name, asyncio.ensure_future(coro))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    def _load_client(self):
+        from elevenlabs.client import ElevenLabs
+        return ElevenLabs(api_key=self.api_key)
+    
+    async def _get_client(self):
+        """The ElevenLabs client, importing the SDK on a worker thread the first time."""
+        if self.client is None:
+            if self._client_loading is None:
+                self._client_loading = self._startup.track(
+                    'voice: elevenlabs import',
+                    asyncio.get_running_loop().run_in_executor(None, self._load_client)
+                )
+            # Shielded: an interrupted first request must not cancel the load for the next
+            self.client = await asyncio.shield(self._client_loading)
+        return self.client
+    
+    async def _get_sink(self) -> AudioSink:
+        """The audio sink, opening the device the first time something plays."""
+        if self.sink is None:
+            if self._sink_opening is None:
+                self._sink_opening = self._startup.track(
+                    'voice: audio device',
+                    asyncio.ensure_future(open_sink(self.audio_backend, self._pcm_rate))
+                )
+            self.sink = await asyncio.shield(self._sink_opening)
+        return self.sink
+    
+    async def _init_socket(self):
+        """Open the input-streaming WebSocket ahead of the first reply."""
+        from .voice_ws import ElevenLabsSocket
+        
+        self.socket = ElevenLabsSocket(
+            api_key=self.api_key,
+            voice_id=self.voice_id,
+            model=self.model,
+            output_format=self.output_format,
+            voice_settings={
+                'stability': self.stability,
+                'similarity_boost': self.similarity_boost,
+                'style': self.style,
+                'use_speaker_boost': self.use_speaker_boost
+            },
+            base_url=self.ws_url,
+            chunk_length_schedule=self.chunk_length_schedule
+        )
+        try:
+            await self.socket.connect()
         except Exception as e:
-            console.print(f"[red]✗[/red] ElevenLabs error: {e}")
+            # Reconnects on first use; fall back to HTTP only if that fails too
+            console.print(f"[yellow]ElevenLabs WebSocket not connected yet: {e}[/yellow]")
     
-    async def _fetch_subscription_info(self):
+    async def _fetch_subscription_info(self, show: bool = True):
         """Fetch ElevenLabs subscription/usage info."""
         try:
+            await self._get_client()
             loop = asyncio.get_event_loop()
             # Try different API methods based on SDK version
             try:
@@ -154,28 +324,32 @@ class Voice:
                 except:
                     pass
             
-            if self.subscription_info:
+            if self.subscription_info and self.tts_router is not None:
+                used, limit, _ = self._subscription_counts()
+                self.tts_router.set_quota(used, limit)
+            if self.subscription_info and show:
                 self._print_credits_status()
         except Exception as e:
             console.print(f"[yellow]Could not fetch subscription info: {e}[/yellow]")
     
+    def _subscription_counts(self):
+        """(characters used, character limit, tier) from the subscription info."""
+        info = self.subscription_info
+        # Handle different SDK response structures
+        if hasattr(info, 'subscription'):
+            info = info.subscription
+        return (
+            getattr(info, 'character_count', 0),
+            getattr(info, 'character_limit', 10000),
+            getattr(info, 'tier', 'unknown')
+        )
+    
     def _print_credits_status(self):
         """Display ElevenLabs credits/usage."""
         if not self.subscription_info:
             return
         
-        info = self.subscription_info
-        
-        # Handle different SDK response structures
-        if hasattr(info, 'subscription'):
-            sub = info.subscription
-            used = getattr(sub, 'character_count', 0)
-            limit = getattr(sub, 'character_limit', 10000)
-            tier = getattr(sub, 'tier', 'unknown')
-        else:
-            used = getattr(info, 'character_count', 0)
-            limit = getattr(info, 'character_limit', 10000)
-            tier = getattr(info, 'tier', 'unknown')
+        used, limit, tier = self._subscription_counts()
         
         remaining = limit - used
         percent_used = (used / limit) * 100 if limit > 0 else 0
@@ -214,22 +388,347 @@ class Voice:
             return
             
         console.print(f"[magenta]Yennefer:[/magenta] {text}")
+        self._spoken = []
         
         if not self.initialized:
             console.print("[yellow]Voice not initialized[/yellow]")
             return
         
         speech_text = clean_for_speech(text)
+        self._spoken.append(text)
+        
+        await self._play(await self._synthesize(speech_text))
+    
+    async def speak_stream(self, chunks: AsyncIterator[str]) -> str:
+        """Speak streamed text sentence by sentence as it is generated.
         
+        Finished sentences are synthesized concurrently, then played in
+        order. A sentence takes one of pipeline_depth slots before its
+        request starts and gives it back once the audio has downloaded, so
+        at most pipeline_depth TTS requests are ever in flight; the
+        producer waits for a free slot. Returns the full text that was
+        received.
+        
+        Cancelling the call stops generation, pending synthesis and
+        playback; spoken_text then holds the sentences that were heard.
+        """
+        if self.socket is not None and self.initialized:
+            return await self._speak_stream_socket(chunks)
+        
+        splitter = SentenceSplitter(self.min_sentence_chars)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.pipeline_depth)
+        slots = asyncio.Semaphore(self.pipeline_depth)
+        received: List[str] = []
+        self._spoken = []
+        position = 0
+        
+        async def synthesize(speech_text: str, position: int):
+            try:
+                audio = await self._synthesize(speech_text, position)
+            except BaseException:
+                slots.release()
+                raise
+            if isinstance(audio, AudioStream):
+                audio.finished.add_done_callback(lambda _: slots.release())
+            else:
+                slots.release()
+            return audio
+        
+        async def enqueue(sentence: str):
+            nonlocal position
+            speech_text = clean_markdown(sentence)
+            if speech_text and self.initialized:
+                await slots.acquire()
+                await queue.put((sentence, asyncio.create_task(synthesize(speech_text, position))))
+                position += 1
+            else:
+                self._spoken.append(sentence)
+        
+        async def produce():
+            try:
+                async for chunk in chunks:
+                    if not received:
+                        console.print("[magenta]Yennefer:[/magenta] ", end='')
+                    received.append(chunk)
+                    console.print(chunk, end='', markup=False, highlight=False)
+                    for sentence in splitter.feed(chunk):
+                        await enqueue(sentence)
+                tail = splitter.flush()
+                if tail:
+                    await enqueue(tail)
+            except Exception as e:
+                console.print(f"\n[yellow]Stream error: {e}[/yellow]")
+            finally:
+                if received:
+                    console.print()
+            await queue.put(None)
+        
+        async def consume():
+            previous = None
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                sentence, task = item
+                utterance = await task
+                if utterance is None:
+                    continue
+                if self.engine != 'elevenlabs':
+                    self._spoken.append(sentence)
+                    await self._play(utterance)
+                    continue
+                try:
+                    done = await self._enqueue_audio(
+                        utterance, on_start=lambda sentence=sentence: self._spoken.append(sentence)
+                    )
+                except Exception as e:
+                    console.print(f"[yellow]TTS error: {e}[/yellow]")
+                    continue
+                # Queue this clip behind the one playing (no gap between
+                # sentences), but don't run further ahead than that
+                if previous is not None:
+                    await previous
+                previous = done
+            if previous is not None:
+                await previous
+        
+        if not self.initialized:
+            console.print("[yellow]Voice not initialized[/yellow]")
+        
+        producer = asyncio.create_task(produce())
+        try:
+            await consume()
+            await producer
+        except asyncio.CancelledError:
+            self.stop()
+            raise
+        finally:
+            if not producer.done():
+                producer.cancel()
+            # Drop anything still queued (interrupted, or playback failed hard)
+            while not queue.empty():
+                item = queue.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+        
+        return ''.join(received)
+    
+    async def _speak_stream_socket(self, chunks: AsyncIterator[str]) -> str:
+        """Stream text into one WebSocket context and play audio as it returns.
+        
+        Sentences are sent as soon as they are complete; audio for the first
+        one starts playing while later text is still being generated, so
+        time-to-first-audio doesn't grow with reply length.
+        """
+        splitter = SentenceSplitter(min_chars=1)
+        received: List[str] = []
+        self._spoken = []
+        
+        try:
+            context = await self.socket.start()
+        except Exception as e:
+            console.print(f"[yellow]WebSocket TTS unavailable ({e}), using HTTP[/yellow]")
+            self.socket = None
+            return await self.speak_stream(chunks)
+        self._streams.add(context.audio)
+        context.audio.finished.add_done_callback(lambda _: self._streams.discard(context.audio))
+        
+        async def send(sentence: str):
+            speech_text = clean_markdown(sentence)
+            if speech_text:
+                self.tracer.mark('tts_request')
+                await context.send(speech_text)
+        
+        async def produce():
+            try:
+                async for chunk in chunks:
+                    if not received:
+                        console.print("[magenta]Yennefer:[/magenta] ", end='')
+                    received.append(chunk)
+                    console.print(chunk, end='', markup=False, highlight=False)
+                    for sentence in splitter.feed(chunk):
+                        await send(sentence)
+                tail = splitter.flush()
+                if tail:
+                    await send(tail)
+            except Exception as e:
+                console.print(f"\n[yellow]Stream error: {e}[/yellow]")
+            finally:
+                if received:
+                    console.print()
+            await context.finish()
+        
+        played = 0
+        
+        def heard(offset: int):
+            nonlocal played
+            played = max(played, offset)
+        
+        producer = asyncio.create_task(produce())
+        try:
+            await self._play(context.audio, heard)
+            await producer
+        finally:
+            self._spoken = [context.spoken_text(played)]
+            self.characters_used_session += context.characters
+            if not producer.done():
+                producer.cancel()
+                context.audio.cancel()
+        
+        return ''.join(received)
+    
+    @property
+    def spoken_text(self) -> str:
+        """Text of the current/last reply whose playback actually started."""
+        return ' '.join(self._spoken)
+    
+    async def _synthesize(self, text: str, position: int = 0):
+        """Turn text into something _play can output for the current engine.
+        
+        position is the sentence's place in its reply, for model routing.
+        """
+        self.tracer.mark('tts_request')
         if self.engine == 'elevenlabs':
-            await self._speak_elevenlabs(speech_text)
-        elif self.engine == 'macos':
-            await self._speak_macos(speech_text)
+            return await self._synthesize_elevenlabs(text, position)
+        # macOS `say` synthesizes and plays in one step
+        return text
     
-    async def _speak_elevenlabs(self, text: str):
-        """Speak using ElevenLabs with voice settings."""
+    async def _play(self, utterance, on_played=None):
+        """Play the output of _synthesize (on_played: see _enqueue_audio)."""
         try:
-            import pygame
+            if self.engine == 'elevenlabs':
+                await self._play_audio(utterance, on_played)
+            elif self.engine == 'macos':
+                await self._speak_macos(utterance)
+        except asyncio.CancelledError:
+            self.stop()
+            raise
+    
+    @property
+    def _pcm_rate(self) -> Optional[int]:
+        """Sample rate for pcm_<rate> output formats, None for encoded audio."""
+        if self.output_format.startswith('pcm_'):
+            return int(self.output_format.split('_', 1)[1])
+        return None
+    
+    def _cache_key(self, text: str, model: Optional[str] = None) -> str:
+        """Cache key covering every setting that changes the audio."""
+        return AudioCache.key(
+            text,
+            voice_id=self.voice_id,
+            model=model or self.model,
+            output_format=self.output_format,
+            stability=self.stability,
+            similarity_boost=self.similarity_boost,
+            style=self.style,
+            use_speaker_boost=self.use_speaker_boost
+        )
+    
+    async def prewarm(self, phrases: List[str]):
+        """Synthesize fixed phrases into the cache ahead of time."""
+        if self.cache is None or self.engine != 'elevenlabs' or not self.initialized:
+            return
+        for phrase in phrases:
+            speech_text = clean_markdown(phrase)
+            route, model = self._route(speech_text, None)
+            cache_key = self._cache_key(speech_text, model)
+            if speech_text and cache_key not in self.cache and cache_key not in self._cache_writes:
+                stream = await self._convert(speech_text, model)
+                if stream is not None:
+                    if route is not None:
+                        self.tts_router.record_request(route, model, len(speech_text))
+                    await stream.finished
+                    # stop() (an interrupt) cuts prewarm downloads short too
+                    if stream.error is None and not stream.cancelled:
+                        await self.cache.put(cache_key, stream.data)
+    
+    async def synthesize(self, text: str, position: int = 0) -> Optional[Audio]:
+        """Start synthesizing text for a caller that plays it elsewhere (server clients).
+        
+        Goes through the cache like speech does; position is the sentence's
+        place in its reply, for model routing. Returns bytes or an
+        AudioStream already downloading, in voice_output.output_format, or
+        None if there is nothing to say or no ElevenLabs.
+        """
+        speech_text = clean_markdown(text)
+        if not speech_text or not self.initialized or self.engine != 'elevenlabs':
+            return None
+        return await self._synthesize_elevenlabs(speech_text, position)
+    
+    def _route(self, text: str, position: Optional[int]) -> Tuple[Optional[str], str]:
+        """(route, model) for text; no route when routing is off."""
+        if self.tts_router is None:
+            return None, self.model
+        return self.tts_router.route(text, position)
+    
+    async def _synthesize_elevenlabs(self, text: str, position: int = 0) -> Optional[Audio]:
+        """Start generating audio for text, from the cache when possible.
+        
+        Returns cached bytes, or an AudioStream that is already downloading
+        so playback can begin with the first chunk.
+        """
+        route, model = self._route(text, position)
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(text, model)
+            lookup = cache_key
+            if route is not None:
+                # A clip from the quality model costs nothing to replay either
+                better = self._cache_key(text, self.tts_router.quality_model)
+                if better in self.cache:
+                    lookup = better
+            audio_bytes = await self.cache.get(lookup, characters=len(text))
+            if audio_bytes is not None:
+                if route is not None:
+                    self.tts_router.record_cached(route)
+                return audio_bytes
+        
+        started = time.perf_counter()
+        stream = await self._convert(text, model)
+        if stream is not None and route is not None:
+            self.tts_router.record_request(route, model, len(text))
+            
+            def record(_):
+                if stream.error is None and stream.first_chunk_at is not None:
+                    self.tts_router.record_first_audio(route, stream.first_chunk_at - started)
+            stream.finished.add_done_callback(record)
+        if stream is not None and cache_key is not None:
+            def store(_):
+                if stream.error is None and not stream.cancelled:
+                    self._store(cache_key, stream.data)
+            stream.finished.add_done_callback(store)
+        return stream
+    
+    def _store(self, cache_key: str, data: bytes):
+        """Write audio to the cache in the background."""
+        task = asyncio.ensure_future(self.cache.put(cache_key, data))
+        self._cache_writes[cache_key] = task
+        
+        def done(_):
+            if self._cache_writes.get(cache_key) is task:
+                del self._cache_writes[cache_key]
+        task.add_done_callback(done)
+    
+    async def _convert(self, text: str, model: Optional[str] = None) -> Optional[AudioStream]:
+        """Start synthesizing text over the configured transport, with model (default: model)."""
+        model = model or self.model
+        if self.socket is not None and model == self.model:
+            try:
+                context = await self.socket.start()
+                await context.send(text)
+                await context.finish()
+                self.characters_used_session += context.characters
+                self._streams.add(context.audio)
+                context.audio.finished.add_done_callback(lambda _: self._streams.discard(context.audio))
+                return context.audio
+            except Exception as e:
+                console.print(f"[yellow]WebSocket TTS error ({e}), using HTTP[/yellow]")
+        return await self._convert_elevenlabs(text, model)
+    
+    async def _convert_elevenlabs(self, text: str, model: Optional[str] = None) -> Optional[AudioStream]:
+        """Start an ElevenLabs synthesis request streaming into an AudioStream."""
+        try:
+            await self._get_client()
             from elevenlabs import VoiceSettings
             
             # Track character usage
@@ -249,44 +748,127 @@ class Voice:
             kwargs = {
                 'text': text,
                 'voice_id': self.voice_id,
-                'model_id': self.model,
+                'model_id': model or self.model,
+                'output_format': self.output_format,
                 'voice_settings': voice_settings
             }
             
-            audio_generator = await loop.run_in_executor(
-                None,
-                lambda: self.client.text_to_speech.convert(**kwargs)
-            )
-            
-            audio_bytes = b''.join(audio_generator)
+            stream = AudioStream()
+            self._streams.add(stream)
+            stream.finished.add_done_callback(lambda _: self._streams.discard(stream))
             
-            with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as f:
-                f.write(audio_bytes)
-                temp_path = f.name
-            
-            pygame.mixer.music.load(temp_path)
-            pygame.mixer.music.play()
-            
-            while pygame.mixer.music.get_busy():
-                await asyncio.sleep(0.1)
+            def download():
+                # The SDK yields chunks as the HTTP response arrives
+                try:
+                    for chunk in self.client.text_to_speech.convert(**kwargs):
+                        if stream.cancelled:
+                            # Leaving the loop closes the generator and its connection
+                            break
+                        if chunk:
+                            stream.feed(chunk)
+                    stream.close()
+                except Exception as e:
+                    stream.close(e)
             
-            pygame.mixer.music.unload()
-            Path(temp_path).unlink(missing_ok=True)
+            loop.run_in_executor(None, download)
+            return stream
             
         except Exception as e:
             console.print(f"[yellow]TTS error: {e}[/yellow]")
+            return None
+    
+    async def _play_audio(self, audio: Audio, on_played=None):
+        """Play audio from memory and wait until it has been heard."""
+        try:
+            done = await self._enqueue_audio(audio, on_played=on_played)
+            if done is not None:
+                await done
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            console.print(f"[yellow]TTS error: {e}[/yellow]")
+    
+    async def _enqueue_audio(self, audio: Audio, on_start=None, on_played=None) -> Optional[asyncio.Future]:
+        """Hand audio to the sink as it arrives, without waiting for playback.
+        
+        PCM goes out in ~200 ms buffers while still downloading; encoded
+        formats (mp3) are queued once complete. on_start runs when the
+        first buffer starts playing; on_played(n) each time a buffer has
+        been heard, n being the bytes of audio played so far. Returns a
+        future that resolves when the last buffer has finished, or None if
+        there was nothing to play.
+        """
+        callback = on_start
+        
+        def on_start():
+            self.tracer.mark('playback_start')
+            if callback is not None:
+                callback()
+        
+        if not self._pcm_rate:
+            if isinstance(audio, AudioStream):
+                await audio.finished
+                if audio.error is not None:
+                    raise audio.error
+                self.tracer.mark('first_audio', at=audio.first_chunk_at)
+                audio = audio.data
+            else:
+                self.tracer.mark('first_audio')
+            done = (await self._get_sink()).enqueue_encoded(audio, on_start)
+            if on_played is not None:
+                done.add_done_callback(lambda future: future.cancelled() or on_played(len(audio)))
+            return done
+        
+        sink = await self._get_sink()
+        # Small enough to start quickly; the sink plays buffers back to back
+        buffer_bytes = int(self._pcm_rate * 0.2) * 2
+        pending = bytearray()
+        done = None
+        submitted = 0
+        
+        def submit(data: bytes):
+            nonlocal done, on_start, submitted
+            done = sink.enqueue(data, on_start)
+            on_start = None
+            submitted += len(data)
+            if on_played is not None:
+                # Not called for buffers dropped by stop()
+                done.add_done_callback(lambda future, offset=submitted: future.cancelled() or on_played(offset))
+        
+        if isinstance(audio, AudioStream):
+            async for chunk in audio:
+                self.tracer.mark('first_audio', at=audio.first_chunk_at)
+                pending += chunk
+                # buffer_bytes is even, so 16-bit samples stay whole
+                while len(pending) >= buffer_bytes:
+                    submit(bytes(pending[:buffer_bytes]))
+                    del pending[:buffer_bytes]
+            if audio.error is not None:
+                raise audio.error
+        else:
+            # Cached: the audio is already here
+            self.tracer.mark('first_audio')
+            pending += audio
+        
+        if len(pending) >= 2:
+            submit(bytes(pending[:len(pending) - (len(pending) % 2)]))
+        return done
     
     async def _speak_macos(self, text: str):
         """Speak using macOS native TTS."""
         try:
-            escaped_text = text.replace('"', '\\"')
-            cmd = f'say -v {self.macos_voice} -r {self.rate} "{escaped_text}"'
-            
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(
-                None,
-                lambda: subprocess.run(cmd, shell=True, check=True)
+            # Run as a child process so an interrupt can kill it mid-sentence
+            process = await asyncio.create_subprocess_exec(
+                'say', '-v', self.macos_voice, '-r', str(self.rate), text
             )
+            # `say` synthesizes and plays in one step
+            self.tracer.mark('first_audio')
+            self.tracer.mark('playback_start')
+            try:
+                await process.wait()
+            except asyncio.CancelledError:
+                process.terminate()
+                raise
             
         except Exception as e:
             console.print(f"[yellow]TTS error: {e}[/yellow]")
@@ -294,25 +876,16 @@ class Voice:
     def status(self):
         """Print detailed voice status."""
         if self.engine == 'elevenlabs':
-            info = self.subscription_info
-            
-            # Extract info based on SDK response structure
-            if info:
-                if hasattr(info, 'subscription'):
-                    sub = info.subscription
-                    used = getattr(sub, 'character_count', 0)
-                    limit = getattr(sub, 'character_limit', 10000)
-                    tier = getattr(sub, 'tier', 'unknown')
-                else:
-                    used = getattr(info, 'character_count', 0)
-                    limit = getattr(info, 'character_limit', 10000)
-                    tier = getattr(info, 'tier', 'unknown')
+            if self.subscription_info:
+                used, limit, tier = self._subscription_counts()
                 
                 console.print(Panel(
                     f"[cyan]Tier:[/cyan] {tier}\n"
                     f"[cyan]Characters used:[/cyan] {used:,} / {limit:,}\n"
                     f"[cyan]Remaining:[/cyan] {limit - used:,}\n"
                     f"[cyan]This session:[/cyan] {self.characters_used_session:,} chars\n"
+                    f"{self._cache_status()}"
+                    f"{self._routing_status()}"
                     f"[cyan]Voice settings:[/cyan]\n"
                     f"  Stability: {self.stability}\n"
                     f"  Similarity: {self.similarity_boost}\n"
@@ -322,6 +895,8 @@ class Voice:
             else:
                 console.print(Panel(
                     f"[cyan]This session:[/cyan] {self.characters_used_session:,} chars\n"
+                    f"{self._cache_status()}"
+                    f"{self._routing_status()}"
                     f"[cyan]Voice settings:[/cyan]\n"
                     f"  Stability: {self.stability}\n"
                     f"  Similarity: {self.similarity_boost}\n"
@@ -331,25 +906,56 @@ class Voice:
         else:
             console.print(f"[dim]Engine: {self.engine}[/dim]")
     
+    def _routing_status(self) -> str:
+        """Model routing lines for the status panel."""
+        if self.tts_router is None:
+            return ""
+        return self.tts_router.status_lines()
+    
+    def _cache_status(self) -> str:
+        """Audio cache lines for the status panel."""
+        if self.cache is None:
+            return ""
+        cache = self.cache
+        return (
+            f"[cyan]Audio cache:[/cyan] {cache.hit_rate:.0%} hit rate "
+            f"({cache.hits} hits / {cache.misses} misses)\n"
+            f"  Saved: {cache.bytes_saved / 1024:,.0f} KB, {cache.characters_saved:,} chars\n"
+            f"  Size: {cache.size / (1024 * 1024):.1f} / {cache.max_bytes / (1024 * 1024):.0f} MB "
+            f"({cache.entries} clips)\n"
+        )
+    
     async def refresh_credits(self):
         """Refresh ElevenLabs credit info."""
         if self.engine == 'elevenlabs':
             await self._fetch_subscription_info()
     
     def stop(self):
-        """Stop current speech."""
+        """Stop current speech and abandon any downloads in flight."""
+        for stream in list(self._streams):
+            stream.cancel()
         try:
-            if self._pygame_initialized:
-                import pygame
-                pygame.mixer.music.stop()
+            if self.sink is not None:
+                self.sink.stop()
         except:
             pass
     
+    async def close(self):
+        """Close the TTS WebSocket, if one is open."""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        # Let clips that finished downloading reach the disk
+        await asyncio.gather(*self._cache_writes.values(), return_exceptions=True)
+        if self.socket is not None:
+            await self.socket.close()
+    
     def cleanup(self):
         """Clean up resources."""
         try:
-            if self._pygame_initialized:
-                import pygame
-                pygame.mixer.quit()
+            if self.sink is not None:
+                self.sink.close()
+                self.sink = None
         except:
             pass
+
@@ -0,0 +1,208 @@
+"""
+Voice WebSocket - ElevenLabs Input-Streaming TTS
+
+Text is sent over a WebSocket while the reply is still being generated,
+and audio comes back on the same socket. One connection is kept open
+across turns; each reply gets its own context on it (multi-context API).
+"""
+
+import asyncio
+import base64
+import json
+import re
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from rich.console import Console
+
+from .voice import AudioStream
+
+console = Console()
+
+DEFAULT_WS_BASE = "wss://api.elevenlabs.io/v1"
+
+
+class TTSContext:
+    """One reply's worth of text in, audio out."""
+    
+    def __init__(self, session: 'ElevenLabsSocket', context_id: str):
+        self.session = session
+        self.context_id = context_id
+        self.audio = AudioStream(on_cancel=self._on_cancel)
+        self.characters = 0
+        # (byte offset in audio where it starts, character), from alignment data
+        self._aligned: List[Tuple[int, str]] = []
+        self._received = 0
+        self._closed = False
+    
+    def spoken_text(self, played: int) -> str:
+        """Text whose audio lies within the first `played` bytes.
+        
+        A word cut off mid-way is left out, so an interrupted reply keeps
+        only what was actually heard.
+        """
+        heard = [char for offset, char in self._aligned if offset < played]
+        text = ''.join(heard)
+        if len(heard) < len(self._aligned) and not self._aligned[len(heard)][1].isspace():
+            text = re.sub(r'\S+$', '', text)
+        return text.strip()
+    
+    def _feed(self, audio: bytes, alignment: Optional[dict], bytes_per_ms: Optional[float]):
+        """Take one message's audio and the characters aligned to it.
+        
+        Character start times are relative to the message's audio; without
+        them (or for encoded formats) characters are spread evenly over it.
+        """
+        start = self._received
+        if audio:
+            self.audio.feed(audio)
+            self._received += len(audio)
+        chars = (alignment or {}).get('chars') or []
+        times = (alignment or {}).get('charStartTimesMs')
+        for i, char in enumerate(chars):
+            if times and bytes_per_ms and i < len(times):
+                offset = start + min(int(times[i] * bytes_per_ms), len(audio))
+            else:
+                offset = start + len(audio) * i // len(chars)
+            self._aligned.append((offset, char))
+    
+    async def send(self, text: str):
+        """Queue text for synthesis; the server decides when to generate."""
+        if self._closed or not text:
+            return
+        self.characters += len(text)
+        # The API expects text chunks to end with a space
+        await self.session._send({'text': text if text.endswith(' ') else text + ' ',
+                                  'context_id': self.context_id})
+    
+    async def finish(self):
+        """No more text: generate whatever is buffered and end the context."""
+        if self._closed:
+            return
+        self._closed = True
+        await self.session._send({'context_id': self.context_id, 'flush': True})
+        await self.session._send({'context_id': self.context_id, 'close_context': True})
+    
+    def _on_cancel(self):
+        """Abandon the context (interrupt)."""
+        if not self._closed:
+            self._closed = True
+            asyncio.ensure_future(self.session._close_context(self.context_id))
+        self.audio.close()
+
+
+class ElevenLabsSocket:
+    """Persistent connection to the ElevenLabs multi-context stream-input API."""
+    
+    def __init__(self, api_key: str, voice_id: str, model: str, output_format: str,
+                 voice_settings: dict, base_url: Optional[str] = None,
+                 chunk_length_schedule: Optional[List[int]] = None,
+                 inactivity_timeout: int = 180):
+        self.api_key = api_key
+        self.voice_id = voice_id
+        self.model = model
+        self.output_format = output_format
+        self.voice_settings = voice_settings
+        self.base_url = (base_url or DEFAULT_WS_BASE).rstrip('/')
+        self.chunk_length_schedule = chunk_length_schedule
+        self.inactivity_timeout = inactivity_timeout
+        
+        self._ws = None
+        self._receiver: Optional[asyncio.Task] = None
+        self._contexts: Dict[str, TTSContext] = {}
+        self._connect_lock = asyncio.Lock()
+        self.connects = 0
+        # 16-bit mono PCM: bytes per millisecond of audio; None for encoded formats
+        rate = output_format.split('_')[1] if output_format.startswith('pcm_') else ''
+        self._bytes_per_ms = int(rate) * 2 / 1000 if rate.isdigit() else None
+    
+    @property
+    def url(self) -> str:
+        query = urlencode({
+            'model_id': self.model,
+            'output_format': self.output_format,
+            'inactivity_timeout': self.inactivity_timeout,
+            'sync_alignment': 'true',
+        })
+        return f"{self.base_url}/text-to-speech/{self.voice_id}/multi-stream-input?{query}"
+    
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and self._receiver is not None and not self._receiver.done()
+    
+    async def connect(self):
+        """Open the socket if it isn't already (idempotent)."""
+        async with self._connect_lock:
+            if self.connected:
+                return
+            import websockets
+            
+            headers = {'xi-api-key': self.api_key}
+            try:
+                self._ws = await websockets.connect(self.url, additional_headers=headers)
+            except TypeError:
+                # websockets < 14 names the argument differently
+                self._ws = await websockets.connect(self.url, extra_headers=headers)
+            self._receiver = asyncio.create_task(self._receive(self._ws))
+            self.connects += 1
+    
+    async def start(self) -> TTSContext:
+        """Begin a new reply on the shared connection."""
+        await self.connect()
+        context = TTSContext(self, uuid.uuid4().hex)
+        self._contexts[context.context_id] = context
+        
+        message = {'text': ' ', 'context_id': context.context_id,
+                   'voice_settings': self.voice_settings}
+        if self.chunk_length_schedule:
+            message['generation_config'] = {'chunk_length_schedule': self.chunk_length_schedule}
+        await self._send(message)
+        return context
+    
+    async def _send(self, message: dict):
+        await self._ws.send(json.dumps(message))
+    
+    async def _close_context(self, context_id: str):
+        self._contexts.pop(context_id, None)
+        try:
+            await self._send({'context_id': context_id, 'close_context': True})
+        except Exception:
+            pass
+    
+    async def _receive(self, ws):
+        """Route incoming audio to its context until the socket closes."""
+        error: Optional[Exception] = None
+        try:
+            async for raw in ws:
+                data = json.loads(raw)
+                context = self._contexts.get(data.get('contextId') or data.get('context_id'))
+                if context is None:
+                    continue
+                audio = base64.b64decode(data['audio']) if data.get('audio') else b''
+                context._feed(audio, data.get('alignment') or data.get('normalizedAlignment'),
+                              self._bytes_per_ms)
+                if data.get('isFinal') or data.get('is_final'):
+                    self._contexts.pop(context.context_id, None)
+                    context.audio.close()
+        except Exception as e:
+            error = e
+        finally:
+            # Anything still open will never get more audio on this socket
+            for context in list(self._contexts.values()):
+                context.audio.close(error)
+            self._contexts.clear()
+            self._ws = None
+    
+    async def close(self):
+        """Close the socket."""
+        ws = self._ws
+        if ws is None:
+            return
+        try:
+            await ws.send(json.dumps({'close_socket': True}))
+            await ws.close()
+        except Exception:
+            pass
+        if self._receiver is not None:
+            await asyncio.gather(self._receiver, return_exceptions=True)
@@ -1,5 +1,5 @@
 @echo off
 cd /d "%~dp0"
 call .venv\Scripts\activate
-python -m jarvis.main
+python -m jarvis.main %*
 pause
@@ -3,4 +3,4 @@
 
 cd "$(dirname "$0")"
 source .venv/bin/activate
-python -m jarvis.main
+python -m jarvis.main "$@"